@@ -0,0 +1,70 @@
+import pathlib
+
+import pytest
+from cpymad.madx import Madx
+from loguru import logger
+
+from pyhdtoolkit.cpymadtools import lhc
+from pyhdtoolkit.cpymadtools._generators import LatticeGenerator
+
+CURRENT_DIR = pathlib.Path(__file__).parent
+INPUTS_DIR = CURRENT_DIR.parent / "tests" / "inputs"
+LHC_SEQUENCE = INPUTS_DIR / "madx" / "lhc_as-built.seq"
+LHC_OPTICS = INPUTS_DIR / "madx" / "opticsfile.22"
+BASE_LATTICE = LatticeGenerator.generate_base_cas_lattice()
+ONESEXT_LATTICE = LatticeGenerator.generate_onesext_cas_lattice()
+# Number of cells of the CAS lattice (about 400, 4000 and 40000 elements) for the
+# benchmarks of functions whose cost scales with the number of elements in the sequence
+CAS_CELLS: list[int] = [24, 240, 2_400]
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _silence_logging():
+    """Debug logs would otherwise be included in the timings."""
+    logger.disable("pyhdtoolkit")
+    yield
+    logger.enable("pyhdtoolkit")
+
+
+# ----- Lattice Fixtures ----- #
+
+
+@pytest.fixture(scope="module")
+def _base_cas_madx() -> Madx:
+    """Base CAS lattice, not matched, in use."""
+    with Madx(stdout=False) as madx:
+        madx.input(BASE_LATTICE)
+        madx.use(sequence="CAS3")
+        yield madx
+
+
+@pytest.fixture(scope="module")
+def _sliced_lhc_madx() -> Madx:
+    """LHC beam 1 sequence and optics, sliced (slicefactor 4) and in use."""
+    with Madx(stdout=False) as madx:
+        madx.call(str(LHC_SEQUENCE.absolute()))
+        madx.call(str(LHC_OPTICS.absolute()))  # opticsfile.22
+        lhc.make_lhc_beams(madx, nemitt_x=3.75e-6, nemitt_y=3.75e-6, energy=6500)
+        lhc.make_lhc_thin(madx, sequence="lhcb1", slicefactor=4)
+        madx.use(sequence="lhcb1")
+        yield madx
+
+
+@pytest.fixture(scope="module")
+def _onesext_cas_madx() -> Madx:
+    """CAS lattice with sextupoles (thin elements) in use."""
+    with Madx(stdout=False) as madx:
+        madx.input(ONESEXT_LATTICE)
+        madx.use(sequence="CAS3")
+        madx.command.select(flag="interpolate", clear=True)
+        yield madx
+
+
+@pytest.fixture(scope="module", params=CAS_CELLS, ids=lambda ncells: f"{ncells}-cells")
+def _scaled_cas_madx(request) -> Madx:
+    """CAS lattice with sextupoles (thin elements) in use, with the parametrized number of cells."""
+    with Madx(stdout=False) as madx:
+        madx.input(ONESEXT_LATTICE.replace("ncell = 24;", f"ncell = {request.param};"))
+        madx.use(sequence="CAS3")
+        madx.command.select(flag="interpolate", clear=True)
+        yield madx
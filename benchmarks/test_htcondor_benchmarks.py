@@ -0,0 +1,24 @@
+import pytest
+
+from pyhdtoolkit.utils.htcondor import read_condor_q
+
+SCHEDD_LINE: str = "-- Schedd: bigbird08.cern.ch : <188.185.72.155:9618?... @ 04/22/21 12:26:02"
+HEADER_LINE: str = "OWNER    BATCH_NAME     SUBMITTED   DONE   RUN    IDLE  TOTAL JOB_IDS"
+TASK_LINE: str = "fesoubel ID: {cluster}   4/21 21:04      7     14      _     21 {cluster}.0-20"
+SUMMARY_LINES: str = """Total for query: 63 jobs; 0 completed, 0 removed, 1 idle, 62 running, 0 held, 0 suspended
+Total for fesoubel: 63 jobs; 0 completed, 0 removed, 1 idle, 62 running, 0 held, 0 suspended
+Total for all users: 7279 jobs; 1 completed, 1 removed, 3351 idle, 3724 running, 202 held, 0 suspended"""
+
+
+def _condor_q_report(ntasks: int) -> str:
+    """A 'condor_q' output as the one in the tests, with the given number of task lines."""
+    tasks = [TASK_LINE.format(cluster=8_489_182 + index) for index in range(ntasks)]
+    return "\n".join([SCHEDD_LINE, HEADER_LINE, *tasks, "", SUMMARY_LINES])
+
+
+@pytest.mark.benchmark(group="read_condor_q")
+@pytest.mark.parametrize("ntasks", [0, 10, 100, 1_000, 10_000])
+def test_read_condor_q(benchmark, ntasks):
+    report = _condor_q_report(ntasks)
+    tasks, _ = benchmark(read_condor_q, report)
+    assert len(tasks) == ntasks
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules a worker only doing twiss / table exports imports, see tests/test_lazy.py for what they should not load
+LIGHT_IMPORTS: list[str] = [
+    "pyhdtoolkit",
+    "pyhdtoolkit.cpymadtools",
+    "pyhdtoolkit.cpymadtools.twiss",
+    "pyhdtoolkit.plotting",
+    "pyhdtoolkit.utils",
+]
+
+
+def _import_time_us(module: str) -> int:
+    """Cumulative import time of the module in a fresh interpreter, in microseconds, from ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines are 'import time: self [us] | cumulative | imported package', the top module is reported last
+    for line in reversed(result.stderr.splitlines()):
+        _, _self_us, cumulative_us, name = (field.strip() for field in line.replace(":", "|", 1).split("|"))
+        if name == module:
+            return int(cumulative_us)
+    msg = f"Could not find '{module}' in the importtime report"
+    raise RuntimeError(msg)
+
+
+@pytest.mark.benchmark(group="import-time")
+@pytest.mark.parametrize("module", LIGHT_IMPORTS)
+def test_import_time(benchmark, module):
+    cumulative_us = benchmark.pedantic(_import_time_us, args=(module,), rounds=5, iterations=1)
+    benchmark.extra_info["cumulative_import_us"] = cumulative_us
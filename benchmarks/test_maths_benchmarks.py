@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import scipy.stats as st
+
+from pyhdtoolkit.maths import frequency, stats_fitting
+
+# Restricted set of candidates, fitting all the default ones takes minutes
+CANDIDATE_DISTRIBUTIONS: dict[st.rv_continuous, str] = {
+    st.chi: "Chi",
+    st.expon: "Exponential",
+    st.laplace: "Laplace",
+    st.lognorm: "LogNorm",
+    st.norm: "Normal",
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _candidate_distributions():
+    original = stats_fitting.DISTRIBUTIONS.copy()
+    stats_fitting.set_distributions_dict(CANDIDATE_DISTRIBUTIONS)
+    yield
+    stats_fitting.set_distributions_dict(original)
+
+
+@pytest.mark.benchmark(group="best_fit_distribution")
+@pytest.mark.parametrize("size", [1_000, 10_000, 100_000])
+def test_best_fit_distribution(benchmark, size):
+    data = np.random.default_rng(seed=42).normal(size=size)
+    distribution, _ = benchmark.pedantic(stats_fitting.best_fit_distribution, args=(data,), rounds=3)
+    assert distribution is st.norm
+
+
+@pytest.mark.benchmark(group="best_fit_distribution-bins")
+@pytest.mark.parametrize("bins", [50, 200, 1_000])
+def test_best_fit_distribution_bins(benchmark, bins):
+    data = np.random.default_rng(seed=42).normal(size=10_000)
+    distribution, _ = benchmark.pedantic(stats_fitting.best_fit_distribution, args=(data, bins), rounds=3)
+    assert distribution is st.norm
+
+
+@pytest.mark.benchmark(group="frequency_analysis")
+@pytest.mark.parametrize("function", [frequency.interpolated_fft, frequency.naff])
+def test_frequency_analysis(benchmark, function):
+    tunes = np.random.default_rng(seed=42).uniform(0.25, 0.35, size=(1_000, 1))
+    signals = np.cos(2 * np.pi * tunes * np.arange(10_000))
+    benchmark.pedantic(function, args=(signals,), rounds=3)
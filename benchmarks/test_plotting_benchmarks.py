@@ -0,0 +1,52 @@
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from pyhdtoolkit.plotting.layout import plot_machine_layout
+from pyhdtoolkit.plotting.tune import get_nearest_resonances, plot_tune_diagram
+
+mpl.use("Agg")
+
+
+@pytest.mark.benchmark(group="plot_machine_layout")
+@pytest.mark.parametrize("plot_bpms", [False, True])
+def test_plot_machine_layout(benchmark, _scaled_cas_madx, plot_bpms):
+    """Drawing the patches dominates, a few rounds are enough."""
+
+    def draw_layout():
+        plt.figure()
+        plot_machine_layout(_scaled_cas_madx, plot_bpms=plot_bpms)
+        plt.close("all")
+
+    benchmark.pedantic(draw_layout, rounds=3)
+
+
+@pytest.mark.benchmark(group="plot_machine_layout-lhc")
+def test_plot_machine_layout_sliced_lhc(benchmark, _sliced_lhc_madx):
+    def draw_layout():
+        plt.figure()
+        plot_machine_layout(_sliced_lhc_madx, xlimits=(-500, 500))
+        plt.close("all")
+
+    benchmark.pedantic(draw_layout, rounds=3)
+
+
+@pytest.mark.benchmark(group="plot_tune_diagram")
+@pytest.mark.parametrize("max_order", [6, 12])
+def test_plot_tune_diagram(benchmark, max_order):
+    def draw_diagram():
+        plt.figure()
+        plot_tune_diagram(max_order=max_order, differentiate_orders=True)
+        plt.gcf().canvas.draw()  # the lines are only rasterised when drawing
+        plt.close("all")
+
+    benchmark.pedantic(draw_diagram, rounds=3)
+
+
+@pytest.mark.benchmark(group="get_nearest_resonances")
+@pytest.mark.parametrize("npoints", [10_000, 1_000_000])
+def test_get_nearest_resonances(benchmark, npoints):
+    tunes = np.random.default_rng(seed=42).uniform(0.25, 0.35, size=(2, npoints))
+    distances, _ = benchmark(get_nearest_resonances, tunes[0], tunes[1], max_order=12)
+    assert distances.shape == (npoints, 12)
@@ -0,0 +1,88 @@
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+import tfs
+
+from pyhdtoolkit.cpymadtools.utils import get_table_tfs
+
+# The largest cases take minutes and gigabytes of memory, only run them when asked to
+RUN_LARGE_BENCHMARKS: bool = os.environ.get("PYHDTOOLKIT_LARGE_BENCHMARKS", "0") == "1"
+# (particles, turns) giving tracking tables of about 1e5, 1e6 and 1e7 rows
+TABLE_SIZES: dict[str, tuple[int, int]] = {
+    "1e5": (100, 1_000),
+    "1e6": (1_000, 1_000),
+    "1e7": (1_000, 10_000),
+}
+
+
+def _previous_get_table_tfs(madx, table_name: str, headers_table: str = "SUMM") -> tfs.TfsDataFrame:
+    """The dict-based conversion, as it was done before the bulk converter."""
+    dframe = pd.DataFrame.from_dict(dict(madx.table[table_name]))
+    dframe = tfs.TfsDataFrame(dframe)
+    dframe.columns = dframe.columns.str.upper()
+    if "NAME" in dframe.columns:
+        dframe.NAME = dframe.NAME.str.upper()
+    dframe.headers = {var.upper(): madx.table[headers_table][var][0] for var in madx.table[headers_table]}
+    return dframe
+
+
+def _peak_memory_mb(func, *args, **kwargs) -> float:
+    """Peak memory allocated while running the function once, in MB."""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+CONVERTERS = {
+    "previous": _previous_get_table_tfs,
+    "bulk": get_table_tfs,
+    "bulk-downcast": lambda madx, table_name: get_table_tfs(madx, table_name, downcast=True, categorical=True),
+}
+
+
+@pytest.fixture(
+    scope="module",
+    params=[
+        "1e5",
+        "1e6",
+        pytest.param(
+            "1e7", marks=pytest.mark.skipif(not RUN_LARGE_BENCHMARKS, reason="PYHDTOOLKIT_LARGE_BENCHMARKS=1")
+        ),
+    ],
+)
+def _tracked_cas_madx(request, _base_cas_madx):
+    """CAS lattice with a 'trackone' table of the parametrized size."""
+    madx = _base_cas_madx
+    nparticles, nturns = TABLE_SIZES[request.param]
+    madx.command.track(onetable=True, onepass=True)
+    for index in range(nparticles):
+        madx.command.start(x=1e-7 * index, y=1e-7 * index)
+    madx.command.run(turns=nturns)
+    madx.command.endtrack()
+    return madx
+
+
+@pytest.mark.benchmark(group="table-conversion-trackone")
+@pytest.mark.parametrize("converter", CONVERTERS.keys())
+def test_trackone_conversion(benchmark, _tracked_cas_madx, converter):
+    func = CONVERTERS[converter]
+    benchmark.extra_info["peak_memory_mb"] = _peak_memory_mb(func, _tracked_cas_madx, "trackone")
+    dframe = benchmark(func, _tracked_cas_madx, "trackone")
+    assert len(dframe) >= 1e5  # noqa: PLR2004
+
+
+@pytest.mark.benchmark(group="table-conversion-twiss-lhc")
+@pytest.mark.parametrize("converter", CONVERTERS.keys())
+def test_twiss_conversion_sliced_lhc(benchmark, _sliced_lhc_madx, converter):
+    """Sliced LHC TWISS table: many columns and string NAME / KEYWORD columns."""
+    func = CONVERTERS[converter]
+    _sliced_lhc_madx.command.twiss()
+    benchmark.extra_info["peak_memory_mb"] = _peak_memory_mb(func, _sliced_lhc_madx, "twiss")
+    dframe = benchmark(func, _sliced_lhc_madx, "twiss")
+    assert len(dframe) > 20_000  # noqa: PLR2004
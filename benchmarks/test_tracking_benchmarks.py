@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from pyhdtoolkit.cpymadtools.ptc import ptc_track_particle
+from pyhdtoolkit.cpymadtools.thintrack import get_thin_lattice, track_thin_lattice
+from pyhdtoolkit.cpymadtools.track import track_single_particle
+
+INITIAL_COORDINATES: tuple[float, ...] = (1e-4, 0, 1e-4, 0, 0, 0)
+
+
+@pytest.mark.benchmark(group="track_single_particle")
+@pytest.mark.parametrize("nturns", [100, 1_000])
+def test_track_single_particle(benchmark, _scaled_cas_madx, nturns):
+    tracks = benchmark(track_single_particle, _scaled_cas_madx, initial_coordinates=INITIAL_COORDINATES, nturns=nturns)
+    assert len(tracks["observation_point_1"]) == nturns + 1
+
+
+@pytest.mark.benchmark(group="track_single_particle")
+def test_track_single_particle_observation_points(benchmark, _scaled_cas_madx):
+    tracks = benchmark(
+        track_single_particle,
+        _scaled_cas_madx,
+        initial_coordinates=INITIAL_COORDINATES,
+        nturns=100,
+        observation_points=["qf", "qd", "msf", "msd"],
+    )
+    assert len(tracks) == 5  # noqa: PLR2004
+
+
+@pytest.mark.benchmark(group="ptc_track_particle")
+@pytest.mark.parametrize("onetable", [False, True])
+def test_ptc_track_particle(benchmark, _scaled_cas_madx, onetable):
+    """PTC is much slower than TRACK, a few rounds are enough."""
+    tracks = benchmark.pedantic(
+        ptc_track_particle,
+        args=(_scaled_cas_madx,),
+        kwargs={"initial_coordinates": INITIAL_COORDINATES, "nturns": 100, "onetable": onetable},
+        rounds=3,
+    )
+    assert len(tracks) == 1
+
+
+@pytest.mark.benchmark(group="track_thin_lattice")
+@pytest.mark.parametrize("jit", [False, True])
+def test_track_thin_lattice(benchmark, _scaled_cas_madx, jit):
+    lattice = get_thin_lattice(_scaled_cas_madx)
+    initial_coordinates = np.tile(INITIAL_COORDINATES, (1_000, 1))
+    track_thin_lattice(lattice, initial_coordinates, nturns=1, jit=jit)  # compilation outside of the timings
+    tracks = benchmark(track_thin_lattice, lattice, initial_coordinates, nturns=100, record_turns=False, jit=jit)
+    assert tracks.survived.all()
@@ -0,0 +1,58 @@
+import pathlib
+
+import numpy as np
+import pytest
+import tfs
+
+from pyhdtoolkit.cpymadtools.tune import get_footprint_lines, get_footprint_patches, make_footprint_table
+
+INPUTS_DIR = pathlib.Path(__file__).parent.parent / "tests" / "inputs"
+# Up to which bunch sigma the footprint starting amplitudes go, which sets the number of particles
+SIGMAS: list[float] = [1, 2, 5]
+# Number of amplitudes and angles of synthetic footprints, for 10 000 to 40 000 particles
+FOOTPRINT_GRIDS: list[tuple[int, int]] = [(101, 100), (201, 200)]
+
+
+@pytest.mark.benchmark(group="make_footprint_table")
+def test_make_footprint_table(benchmark, _scaled_cas_madx):
+    """DYNAP tracks over 1024 turns, a few rounds are enough."""
+    footprint = benchmark.pedantic(make_footprint_table, args=(_scaled_cas_madx,), kwargs={"sigma": 1}, rounds=3)
+    assert not footprint.empty
+
+
+@pytest.mark.benchmark(group="make_footprint_table-sigma")
+@pytest.mark.parametrize("sigma", SIGMAS)
+@pytest.mark.parametrize("dense", [False, True])
+def test_make_footprint_table_amplitudes(benchmark, _onesext_cas_madx, sigma, dense):
+    footprint = benchmark.pedantic(
+        make_footprint_table, args=(_onesext_cas_madx,), kwargs={"sigma": sigma, "dense": dense}, rounds=3
+    )
+    assert not footprint.empty
+
+
+@pytest.mark.benchmark(group="get_footprint_lines")
+@pytest.mark.parametrize("sigma", SIGMAS)
+def test_get_footprint_lines(benchmark, _onesext_cas_madx, sigma):
+    dynap_dframe = make_footprint_table(_onesext_cas_madx, sigma=sigma)
+    qxs, qys = benchmark(get_footprint_lines, dynap_dframe)
+    assert qxs.shape == qys.shape
+
+
+@pytest.mark.benchmark(group="get_footprint_lines")
+def test_get_footprint_lines_lhc(benchmark):
+    """From the LHC footprint used in the tests (sigma 5, not dense), obtained with make_footprint_table."""
+    dynap_dframe = tfs.read(INPUTS_DIR / "cpymadtools" / "dynap.tfs")
+    qxs, qys = benchmark(get_footprint_lines, dynap_dframe)
+    assert qxs.shape == qys.shape
+
+
+@pytest.mark.benchmark(group="footprint_geometry")
+@pytest.mark.parametrize(("amplitude", "angle"), FOOTPRINT_GRIDS)
+@pytest.mark.parametrize("function", [get_footprint_lines, get_footprint_patches])
+def test_footprint_geometry_dense(benchmark, function, amplitude, angle):
+    nparticles = 1 + (amplitude - 1) * angle
+    tunes = np.random.default_rng(seed=42).uniform(0.28, 0.32, size=(nparticles, 2))
+    dynap_dframe = tfs.TfsDataFrame(
+        {"tunx": tunes[:, 0], "tuny": tunes[:, 1]}, headers={"AMPLITUDE": amplitude, "ANGLE": angle, "DSIGMA": 1}
+    )
+    assert benchmark(function, dynap_dframe) is not None
@@ -0,0 +1,69 @@
+import pytest
+import tfs
+
+from pyhdtoolkit.cpymadtools.cache import _read_twiss_table, twiss_cache
+from pyhdtoolkit.cpymadtools.constants import DEFAULT_TWISS_COLUMNS
+from pyhdtoolkit.cpymadtools.twiss import _twiss_data_to_tfs, get_pattern_twiss, get_twiss_tfs
+
+# Used to compare the full table export against the column-selective path
+FEW_COLUMNS: list[str] = ["s", "betx", "bety", "dx"]
+
+
+@pytest.mark.benchmark(group="get_twiss_tfs-lhc")
+@pytest.mark.parametrize("columns", [None, DEFAULT_TWISS_COLUMNS, FEW_COLUMNS], ids=["all", "default", "few"])
+def test_get_twiss_tfs_sliced_lhc(benchmark, _sliced_lhc_madx, columns):
+    twiss_tfs = benchmark(get_twiss_tfs, _sliced_lhc_madx, columns=columns)
+    assert len(twiss_tfs) > 20_000  # noqa: PLR2004
+
+
+@pytest.mark.benchmark(group="twiss-table-export-lhc")
+@pytest.mark.parametrize("columns", [None, DEFAULT_TWISS_COLUMNS, FEW_COLUMNS], ids=["all", "default", "few"])
+def test_twiss_table_export_sliced_lhc(benchmark, _sliced_lhc_madx, columns):
+    """Only the export from the MAD-X process, without the TWISS call itself."""
+    madx = _sliced_lhc_madx
+    madx.command.twiss()
+    columns = None if columns is None else ["name", *(column.lower() for column in columns)]
+    twiss_tfs = benchmark(lambda: _twiss_data_to_tfs(_read_twiss_table(madx, columns)))
+    assert len(twiss_tfs) > 20_000  # noqa: PLR2004
+
+
+@pytest.mark.benchmark(group="get_twiss_tfs-lhc")
+@pytest.mark.parametrize("columns", [None, DEFAULT_TWISS_COLUMNS, FEW_COLUMNS], ids=["all", "default", "few"])
+def test_get_twiss_tfs_sliced_lhc_cached(benchmark, _sliced_lhc_madx, columns):
+    """Repeated calls on an unchanged machine, served from the TWISS cache."""
+    with twiss_cache(_sliced_lhc_madx):
+        twiss_tfs = benchmark(get_twiss_tfs, _sliced_lhc_madx, columns=columns)
+    assert len(twiss_tfs) > 20_000  # noqa: PLR2004
+
+
+@pytest.mark.benchmark(group="twiss-table-export-lhc")
+def test_twiss_table_export_sliced_lhc_dframe_reference(benchmark, _sliced_lhc_madx):
+    """Reference: the full dframe export then slicing, as was done before column selection."""
+    madx = _sliced_lhc_madx
+    madx.command.twiss()
+
+    def export_table():
+        twiss_tfs = tfs.TfsDataFrame(madx.table.twiss.dframe())
+        twiss_tfs.columns = twiss_tfs.columns.str.upper()
+        return twiss_tfs.set_index("NAME")[[column.upper() for column in FEW_COLUMNS]]
+
+    benchmark(export_table)
+
+
+@pytest.mark.benchmark(group="get_pattern_twiss-lhc")
+def test_get_pattern_twiss_sliced_lhc(benchmark, _sliced_lhc_madx):
+    twiss_tfs = benchmark(get_pattern_twiss, _sliced_lhc_madx, columns=DEFAULT_TWISS_COLUMNS, patterns=["^BPM", "^IP"])
+    assert not twiss_tfs.empty
+
+
+@pytest.mark.benchmark(group="get_twiss_tfs-cas")
+@pytest.mark.parametrize("columns", [None, FEW_COLUMNS], ids=["all", "few"])
+def test_get_twiss_tfs_scaled_cas(benchmark, _scaled_cas_madx, columns):
+    twiss_tfs = benchmark(get_twiss_tfs, _scaled_cas_madx, columns=columns)
+    assert not twiss_tfs.empty
+
+
+@pytest.mark.benchmark(group="get_pattern_twiss-cas")
+def test_get_pattern_twiss_scaled_cas(benchmark, _scaled_cas_madx):
+    twiss_tfs = benchmark(get_pattern_twiss, _scaled_cas_madx, columns=DEFAULT_TWISS_COLUMNS, patterns=["^QF", "^QD"])
+    assert not twiss_tfs.empty
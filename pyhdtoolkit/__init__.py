@@ -10,7 +10,13 @@ accelerator physics studies and plotting.
 :license: MIT, see LICENSE for more details.
 """
 
-from . import cpymadtools, maths, models, optics, plotting, utils, version  # noqa: F401, TID252
+from typing import TYPE_CHECKING
+
+from . import version  # noqa: TID252
+from ._lazy import attach  # noqa: TID252
+
+if TYPE_CHECKING:
+    from . import cpymadtools, maths, models, optics, plotting, utils  # noqa: F401, TID252
 
 __title__ = "pyhdtoolkit"
 __description__ = "An all-in-one toolkit package to easy my Python work in my PhD."
@@ -19,3 +25,5 @@ __version__ = version.VERSION
 __author__ = "Felix Soubelet"
 __author_email__ = "felix.soubelet@cern.ch"
 __license__ = "MIT"
+
+__getattr__, __dir__ = attach(__name__, submodules=["cpymadtools", "maths", "models", "optics", "plotting", "utils"])
@@ -0,0 +1,76 @@
+"""
+.. _lazy:
+
+Lazy Loading
+------------
+
+Private helper to load the submodules of a package, and the attributes
+they provide, only when they are first accessed. Packages use it so that
+importing one of their modules does not import all of their siblings,
+and their heavy dependencies (``matplotlib``, ``scipy`` etc), up front.
+
+.. versionadded:: 1.9.0
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+
+
+def attach(
+    package_name: str, submodules: Iterable[str] = (), attributes: Mapping[str, str] | None = None
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """
+    .. versionadded:: 1.9.0
+
+    Creates the module-level ``__getattr__`` and ``__dir__`` functions of a
+    package whose submodules (and attributes of these) are imported when
+    first accessed.
+
+    Parameters
+    ----------
+    package_name : str
+        The name of the package, usually given as ``__name__``.
+    submodules : Iterable[str]
+        The names of the submodules to make available as attributes.
+    attributes : Mapping[str, str], optional
+        A mapping of attribute names to the name of the submodule they
+        are imported from, to make available at the package level.
+
+    Returns
+    -------
+    tuple[Callable, Callable]
+        The ``__getattr__`` and ``__dir__`` functions to set in the package's
+        ``__init__`` module.
+
+    Example
+    -------
+        .. code-block:: python
+
+            __all__ = ["coupling", "phase"]
+            __getattr__, __dir__ = attach(__name__, submodules=__all__)
+    """
+    submodules = set(submodules)
+    attributes = dict(attributes or {})
+    public = sorted(submodules | set(attributes))
+
+    def __getattr__(name: str) -> Any:  # noqa: N807
+        if name in submodules:
+            return importlib.import_module(f"{package_name}.{name}")
+        if name in attributes:
+            submodule = importlib.import_module(f"{package_name}.{attributes[name]}")
+            value = getattr(submodule, name)
+            setattr(sys.modules[package_name], name, value)  # next accesses skip this function
+            return value
+        msg = f"module {package_name!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+
+    def __dir__() -> list[str]:  # noqa: N807
+        return sorted(set(vars(sys.modules[package_name])) | set(public))
+
+    return __getattr__, __dir__
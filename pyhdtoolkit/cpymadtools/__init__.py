@@ -1,3 +1,40 @@
-from . import constants, coupling, lhc, matching, ptc, track, tune, twiss, utils  # noqa: TID252
+from typing import TYPE_CHECKING
 
-__all__ = ["constants", "coupling", "lhc", "matching", "ptc", "track", "tune", "twiss", "utils"]
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import (  # noqa: TID252
+        cache,
+        constants,
+        coupling,
+        da,
+        fma,
+        lhc,
+        matching,
+        pool,
+        ptc,
+        thintrack,
+        track,
+        tune,
+        twiss,
+        utils,
+    )
+
+__all__ = [
+    "cache",
+    "constants",
+    "coupling",
+    "da",
+    "fma",
+    "lhc",
+    "matching",
+    "pool",
+    "ptc",
+    "thintrack",
+    "track",
+    "tune",
+    "twiss",
+    "utils",
+]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
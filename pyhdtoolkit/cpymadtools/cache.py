@@ -0,0 +1,525 @@
+"""
+.. _cpymadtools-cache:
+
+TWISS Caching
+-------------
+
+Module with an opt-in cache layer for the results of the ``MAD-X``
+``TWISS`` command, through a `~cpymad.madx.Madx` object.
+
+Once enabled on a given `~cpymad.madx.Madx` instance, the ``TWISS``
+results requested through `~.cpymadtools.twiss.get_twiss_tfs`,
+`~.cpymadtools.cache.get_twiss_dframe` and the functions of the
+`~pyhdtoolkit.plotting` subpackage are stored, keyed on a fingerprint
+of the ``MAD-X`` state. Repeated calls on an unchanged machine then
+reuse the stored result and skip the ``MAD-X`` call entirely.
+
+The fingerprint is made of the sequence in use, the values of the global
+variables changed since the cache was enabled, a generation counter and
+the ``TWISS`` keyword arguments. The generation counter is bumped by any
+input sent to ``MAD-X`` which could alter the machine in a way that can
+not be tracked by value (``USE``, ``CALL``, element definitions or
+attributes changes, error assignments such as ``EALIGN`` or ``EFCOMP``,
+``MATCH`` blocks etc), as well as by explicit invalidation through
+`~.cpymadtools.cache.invalidate_twiss_cache`.
+
+Note
+----
+    Only the input going through `~cpymad.madx.Madx.input` (which is what
+    all of `cpymad` and `pyhdtoolkit` use) is tracked. Changes done by calling
+    the low-level ``madx._libmadx`` functions directly are not seen: in that
+    case, call `~.cpymadtools.cache.invalidate_twiss_cache` yourself.
+
+Warning
+-------
+    When a result is served from the cache, no ``TWISS`` is run and the
+    internal ``MAD-X`` tables (``madx.table.twiss`` and ``madx.table.summ``)
+    are left untouched. They may hold the results of a different, later
+    ``TWISS`` call.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, NamedTuple, ParamSpec, TypeVar
+
+import pandas as pd
+from cpymad.madx import TwissFailed
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    import numpy as np
+    from cpymad.madx import Madx
+
+P = ParamSpec("P")  # for params
+R = TypeVar("R")  # for returns
+
+# Statements which do not alter the machine, and hence the TWISS results
+_READ_ONLY_COMMANDS: frozenset[str] = frozenset(
+    {
+        "aperture",
+        "dynap",
+        "emit",
+        "endtrack",
+        "esave",
+        "help",
+        "observe",
+        "plot",
+        "print",
+        "printf",
+        "run",
+        "select",
+        "set",
+        "show",
+        "start",
+        "survey",
+        "system",
+        "title",
+        "track",
+        "twiss",
+        "value",
+        "write",
+    }
+)
+_ASSIGNMENT = re.compile(r"^(?:(?:const|real|int)\s+)*([a-z_][\w.$]*)\s*:?=(?!=)")
+_COMMAND = re.compile(r"^(?:[\w.$]+\s*:(?!=)\s*)?([a-z_][\w.$]*)")
+_COMMENTS = re.compile(r"(?://|!)[^\n]*")
+_MAX_TRACKED_GLOBALS: int = 512
+
+_CACHES: weakref.WeakKeyDictionary[Madx, _TwissCache] = weakref.WeakKeyDictionary()
+
+
+class _TwissData(NamedTuple):
+    """Raw data of a ``TWISS`` table: lowercase column names to values, row names and ``SUMM`` table."""
+
+    columns: dict[str, np.ndarray]
+    row_names: list[str]
+    summ: dict[str, float]
+
+
+# ----- Public API ----- #
+
+
+def enable_twiss_cache(madx: Madx, /, maxsize: int = 16) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Enables the caching of ``TWISS`` results for the provided
+    `~cpymad.madx.Madx` instance. If caching is already enabled,
+    the stored results are kept and only *maxsize* is updated.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    maxsize : int
+        The maximum number of ``TWISS`` results to keep in memory for
+        this instance. The least recently used results are discarded
+        first. Defaults to 16.
+
+    Example
+    -------
+        .. code-block:: python
+
+            enable_twiss_cache(madx)
+            twiss_df = get_twiss_tfs(madx)  # runs TWISS
+            plot_latwiss(madx, title="LHC")  # reuses the result, no TWISS run
+    """
+    if maxsize < 1:
+        logger.error(f"The cache size should be a positive integer, not {maxsize}")
+        msg = "Invalid 'maxsize' argument."
+        raise ValueError(msg)
+
+    if madx in _CACHES:
+        logger.debug(f"TWISS cache already enabled, setting its size to {maxsize}")
+        _CACHES[madx].resize(maxsize)
+        return
+
+    logger.debug(f"Enabling TWISS cache with a maximum of {maxsize} entries")
+    cache = _TwissCache(maxsize, command_log=madx._command_log)
+    madx._command_log = cache  # hook called with every statement sent to MAD-X
+    _CACHES[madx] = cache
+
+
+def disable_twiss_cache(madx: Madx, /) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Disables the caching of ``TWISS`` results for the provided
+    `~cpymad.madx.Madx` instance, and discards all stored results.
+    Does nothing if the cache is not enabled.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+
+    Example
+    -------
+        .. code-block:: python
+
+            disable_twiss_cache(madx)
+    """
+    cache = _CACHES.pop(madx, None)
+    if cache is None:
+        return
+
+    logger.debug("Disabling TWISS cache")
+    if madx._command_log is cache:
+        madx._command_log = cache.command_log  # restore whatever was there before
+
+
+def invalidate_twiss_cache(madx: Madx, /) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Discards all stored ``TWISS`` results for the provided `~cpymad.madx.Madx`
+    instance, so that the next request runs the ``TWISS`` command again. Does
+    nothing if the cache is not enabled. This is called by the `pyhdtoolkit`
+    functions changing the machine, and should be called by the user after
+    changing the machine without going through `~cpymad.madx.Madx.input`.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+
+    Example
+    -------
+        .. code-block:: python
+
+            invalidate_twiss_cache(madx)
+    """
+    cache = _CACHES.get(madx)
+    if cache is not None:
+        logger.trace("Invalidating TWISS cache")
+        cache.invalidate()
+
+
+def invalidates_twiss_cache(func: Callable[P, R]) -> Callable[P, R]:
+    """
+    .. versionadded:: 1.9.0
+
+    Decorator for functions changing the machine of the `~cpymad.madx.Madx`
+    instance given as their first argument. The ``TWISS`` cache of this
+    instance, if enabled, is invalidated once the function has run.
+
+    Parameters
+    ----------
+    func : Callable
+        The function to decorate, which takes the `~cpymad.madx.Madx`
+        instance as its first argument.
+
+    Returns
+    -------
+    Callable
+        The decorated function.
+
+    Example
+    -------
+        .. code-block:: python
+
+            @invalidates_twiss_cache
+            def power_my_knob(madx: Madx, /, value: float) -> None:
+                madx.input(f"my_knob_function({value});")
+    """
+
+    @functools.wraps(func)
+    def function_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_twiss_cache(args[0])
+
+    return function_wrapper
+
+
+@contextmanager
+def twiss_cache(madx: Madx, /, maxsize: int = 16) -> Iterator[None]:
+    """
+    .. versionadded:: 1.9.0
+
+    Context manager to enable the caching of ``TWISS`` results for the
+    provided `~cpymad.madx.Madx` instance only within its scope. If the
+    cache was already enabled before entering, it is left enabled.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    maxsize : int
+        The maximum number of ``TWISS`` results to keep in memory. See
+        `~.cpymadtools.cache.enable_twiss_cache`. Defaults to 16.
+
+    Example
+    -------
+        .. code-block:: python
+
+            with twiss_cache(madx):
+                plot_latwiss(madx, title="Full LHC")
+                plot_latwiss(madx, title="IR5", xlimits=(ip5 - 500, ip5 + 500))
+    """
+    already_enabled = madx in _CACHES
+    enable_twiss_cache(madx, maxsize=maxsize)
+    try:
+        yield
+    finally:
+        if not already_enabled:
+            disable_twiss_cache(madx)
+
+
+def get_twiss_dframe(
+    madx: Madx, /, columns: Sequence[str] | None = None, *, raise_on_failure: bool = True, **kwargs
+) -> pd.DataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Runs the ``TWISS`` command and returns the resulting table as a
+    `~pandas.DataFrame`, exactly as ``madx.twiss(**kwargs).dframe()``
+    would. If the cache is enabled for *madx* and holds a result for
+    the current state and the given *kwargs*, no ``TWISS`` is run.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    columns : Sequence[str], optional
+        If given, only these columns are returned. Defaults to `None`,
+        which returns all columns of the ``TWISS`` table.
+    raise_on_failure : bool
+        Whether to raise a `~cpymad.madx.TwissFailed` if the ``TWISS``
+        command fails, as ``madx.twiss`` does. If `False`, the current
+        table is returned as is, as would ``madx.command.twiss`` followed
+        by ``madx.table.twiss.dframe()``. Defaults to `True`.
+    **kwargs
+        Any keyword argument that can be given to the ``MAD-X`` ``TWISS``
+        command, such as `chrom`, `ripken`, `centre`; or starting values
+        for `betx`, `bety` etc.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The ``TWISS`` table with lowercase column names and the
+        table's row names as index.
+
+    Raises
+    ------
+    cpymad.madx.TwissFailed
+        If the ``TWISS`` command fails and *raise_on_failure* is `True`.
+
+    Example
+    -------
+        .. code-block:: python
+
+            twiss_df = get_twiss_dframe(madx, centre=True)
+    """
+    data = _get_twiss_data(madx, columns, raise_on_failure=raise_on_failure, **kwargs)
+    return pd.DataFrame(data.columns, index=data.row_names)
+
+
+# ----- Helpers ----- #
+
+
+def _get_twiss_data(
+    madx: Madx, /, columns: Sequence[str] | None = None, *, raise_on_failure: bool = False, **kwargs
+) -> _TwissData:
+    """
+    .. versionadded:: 1.9.0
+
+    Runs the ``TWISS`` command with the provided *kwargs* and returns the
+    requested *columns* of its table, or gets them from the cache if it is
+    enabled for *madx* and holds a result for the current state. The returned
+    arrays are always copies, which the caller is free to modify.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    columns : Sequence[str], optional
+        The columns to get, case-insensitive. Defaults to `None`,
+        which gets all columns of the ``TWISS`` table.
+    raise_on_failure : bool
+        Whether to raise a `~cpymad.madx.TwissFailed` if the ``TWISS``
+        command fails. Defaults to `False`, in which case the current
+        table is returned as is, and not cached.
+    **kwargs
+        Any keyword argument that can be given to the ``MAD-X`` ``TWISS`` command.
+
+    Returns
+    -------
+    _TwissData
+        The requested columns, the row names and the ``SUMM`` table.
+    """
+    columns = None if columns is None else [column.lower() for column in columns]
+    cache = _CACHES.get(madx)
+
+    if cache is None:
+        _run_twiss(madx, raise_on_failure=raise_on_failure, **kwargs)
+        return _read_twiss_table(madx, columns)
+
+    return cache.get(madx, columns, raise_on_failure=raise_on_failure, **kwargs)
+
+
+def _run_twiss(madx: Madx, /, raise_on_failure: bool = False, **kwargs) -> bool:
+    """Runs the ``TWISS`` command, returns whether it succeeded and raises if asked to."""
+    logger.trace("Running TWISS in MAD-X")
+    success = madx.command.twiss(**kwargs)
+    if not success and raise_on_failure:
+        raise TwissFailed
+    return success
+
+
+def _read_twiss_table(madx: Madx, /, columns: Sequence[str] | None = None) -> _TwissData:
+    """Reads the given lowercase *columns* (all if `None`) from the internal ``TWISS`` table."""
+    table = madx.table.twiss
+    columns = list(table) if columns is None else columns
+    return _TwissData(
+        columns={column: table.column(column) for column in columns},
+        row_names=table.row_names(),
+        summ={var: values[0] for var, values in madx.table.summ.items() if len(values)},  # empty if TWISS failed
+    )
+
+
+def _active_sequence_name(madx: Madx, /) -> str | None:
+    """Name of the sequence in use, `None` if there is none."""
+    try:
+        return madx._libmadx.get_active_sequence_name()
+    except RuntimeError:
+        return None
+
+
+class _CacheEntry:
+    """A stored ``TWISS`` result. Columns can be added while its table is live in ``MAD-X``."""
+
+    __slots__ = ("all_columns", "data")
+
+    def __init__(self, data: _TwissData, all_columns: list[str]) -> None:
+        self.data = data
+        self.all_columns = all_columns
+
+    def missing(self, columns: Sequence[str] | None) -> list[str]:
+        columns = self.all_columns if columns is None else columns
+        return [column for column in columns if column not in self.data.columns]
+
+    def copy(self, columns: Sequence[str] | None) -> _TwissData:
+        columns = self.all_columns if columns is None else columns
+        return _TwissData(
+            columns={column: self.data.columns[column].copy() for column in columns},
+            row_names=list(self.data.row_names),
+            summ=dict(self.data.summ),
+        )
+
+
+class _TwissCache:
+    """
+    Per-instance ``TWISS`` results cache. An instance of this class replaces the
+    `~cpymad.madx.Madx` command log, which is called with each statement before it
+    is sent to ``MAD-X``, in order to keep track of the changes to the machine. The
+    previous command log, if any, is still called.
+    """
+
+    def __init__(self, maxsize: int, command_log: Callable[[str], None] | None = None) -> None:
+        self.maxsize = maxsize
+        self.command_log = command_log
+        self.entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self.generation: int = 0
+        self.changed_globals: set[str] = set()
+        self.live: tuple | None = None  # key of the entry matching the internal TWISS table
+        self._running: bool = False  # set while the cache runs TWISS itself
+
+    # ----- Command log hooks ----- #
+
+    def __call__(self, text: str) -> None:
+        if self.command_log is not None:
+            self.command_log(text)
+        self.record(text)
+
+    def close(self) -> None:
+        """Called by `~cpymad.madx.Madx.quit`, forwarded to the previous command log."""
+        if hasattr(self.command_log, "close"):
+            self.command_log.close()
+
+    def record(self, text: str) -> None:
+        """Classifies each statement in *text* and updates the tracked state accordingly."""
+        for statement in _COMMENTS.sub("", text.lower()).split(";"):
+            statement = statement.strip()  # noqa: PLW2901
+            if not statement:
+                continue
+
+            if (assignment := _ASSIGNMENT.match(statement)) is not None:
+                self.changed_globals.add(assignment.group(1))
+                if len(self.changed_globals) > _MAX_TRACKED_GLOBALS:
+                    self.invalidate()  # too many to fingerprint cheaply
+                continue
+
+            command = _COMMAND.match(statement)
+            name = command.group(1) if command is not None else ""
+            if name == "twiss" and not self._running:
+                self.live = None  # table overwritten by another TWISS
+            elif name == "select" and "interpolate" in statement:
+                self.invalidate()  # changes the rows of the TWISS table
+            elif name not in _READ_ONLY_COMMANDS and not name.startswith("ptc_"):
+                self.invalidate()
+
+    # ----- Cache handling ----- #
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+        self.changed_globals.clear()
+        self.live = None
+
+    def resize(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def fingerprint(self, madx: Madx, /, **kwargs) -> tuple:
+        """Key identifying the ``TWISS`` result for the current state and the given *kwargs*."""
+        changed_globals = []
+        for name in sorted(self.changed_globals):
+            try:
+                changed_globals.append((name, madx.globals[name]))
+            except KeyError:  # e.g. constants are not part of the globals
+                changed_globals.append((name, None))
+        twiss_kwargs = tuple(sorted((key.lower(), repr(value)) for key, value in kwargs.items()))
+        return (_active_sequence_name(madx), self.generation, tuple(changed_globals), twiss_kwargs)
+
+    def get(
+        self, madx: Madx, /, columns: Sequence[str] | None, *, raise_on_failure: bool = False, **kwargs
+    ) -> _TwissData:
+        key = self.fingerprint(madx, **kwargs)
+        entry = self.entries.get(key)
+
+        if entry is not None and (not entry.missing(columns) or key == self.live):
+            logger.trace("Using TWISS results from cache")
+            self.entries.move_to_end(key)
+            if missing := entry.missing(columns):
+                logger.trace(f"Fetching {len(missing)} additional columns from the TWISS table")
+                entry.data.columns.update(_read_twiss_table(madx, missing).columns)
+            return entry.copy(columns)
+
+        self._running = True
+        try:
+            success = _run_twiss(madx, raise_on_failure=raise_on_failure, **kwargs)
+        finally:
+            self._running = False
+
+        if not success:  # do not cache, behave as without a cache
+            self.live = None
+            self.entries.pop(key, None)
+            return _read_twiss_table(madx, columns)
+
+        all_columns = list(madx.table.twiss)
+        entry = _CacheEntry(_read_twiss_table(madx, columns), all_columns)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self.live = key
+        self.resize(self.maxsize)
+        return entry.copy(columns)
@@ -16,8 +16,6 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 from loguru import logger
-from optics_functions.coupling import check_resonance_relation, closest_tune_approach, coupling_via_cmatrix
-from scipy import stats
 
 from pyhdtoolkit.cpymadtools.constants import MONITOR_TWISS_COLUMNS
 from pyhdtoolkit.cpymadtools.lhc import get_lhc_tune_and_chroma_knobs
@@ -236,6 +234,12 @@ def get_cminus_from_coupling_rdts(
 
             complex_cminus = get_cminus_from_coupling_rdts(madx, patterns=["^BPM.*B[12]$"])
     """
+    from optics_functions.coupling import (  # noqa: PLC0415
+        check_resonance_relation,
+        closest_tune_approach,
+        coupling_via_cmatrix,
+    )
+
     logger.debug("Getting coupling RDTs at selected elements thoughout the machine")
     twiss_with_rdts = get_pattern_twiss(madx, patterns=patterns, columns=MONITOR_TWISS_COLUMNS)
     twiss_with_rdts.columns = twiss_with_rdts.columns.str.upper()  # optics_functions needs capitalized names
@@ -345,6 +349,8 @@ def get_coupling_rdts(madx: Madx, /, **kwargs) -> TfsDataFrame:
 
             twiss_rdts = get_coupling_rdts(madx)
     """
+    from optics_functions.coupling import coupling_via_cmatrix  # noqa: PLC0415
+
     twiss_tfs = get_twiss_tfs(madx, **kwargs)
     twiss_tfs[["F1001", "F1010"]] = coupling_via_cmatrix(twiss_tfs, output=["rdts"])
     return twiss_tfs
@@ -396,6 +402,8 @@ def _filter_outlier_bpms_from_coupling_rdts(twiss_df: TfsDataFrame, stdev: float
     TfsDataFrame
         The `~tfs.TfsDataFrame` with the filtered BPMs.
     """
+    from scipy import stats  # noqa: PLC0415
+
     logger.debug("Filtering out outlier BPMs based on coupling RDTs")
     twiss_df: TfsDataFrame = twiss_df.copy(deep=True)
     original_len: int = len(twiss_df)
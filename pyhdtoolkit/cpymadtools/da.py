@@ -0,0 +1,224 @@
+"""
+.. _cpymadtools-da:
+
+Dynamic Aperture
+----------------
+
+Module with functions to determine the dynamic aperture of a machine
+through the ``TRACK`` command of a `~cpymad.madx.Madx` object, scanning
+angles in the transverse amplitude space across worker processes.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import tfs
+from loguru import logger
+
+from pyhdtoolkit.cpymadtools.track import _get_lost_turns, _run_track_block, _tracking_pool
+from pyhdtoolkit.cpymadtools.tune import _get_initial_coordinates
+
+if TYPE_CHECKING:
+    from cpymad.madx import Madx
+
+
+def make_da_table(
+    madx: Madx,
+    /,
+    nturns: int = 1000,
+    file: str | None = None,
+    *,
+    n_angles: int = 7,
+    max_amplitude: float = 20,
+    step: float = 2,
+    tolerance: float = 0.1,
+    processes: int | None = None,
+    **kwargs,
+) -> tfs.TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Determines the dynamic aperture of the machine in use, as the amplitude in
+    bunch :math:`\\sigma` up to which particles survive *nturns* along each of
+    *n_angles* angles between the horizontal and vertical planes. For each angle,
+    particles on a coarse grid of amplitudes up to *max_amplitude* are first
+    tracked together, then the amplitude range between the last surviving and the
+    first lost particles is bisected down to *tolerance*. Angles are spread across
+    the worker processes of a `~.cpymadtools.pool.MadxPool`, one at a time.
+
+    Lost particles are not tracked any further by ``MAD-X``, and a ``TRACK`` with
+    all its particles lost stops early: unstable amplitudes, usually lost in a few
+    turns, cost very little compared to the surviving ones.
+
+    Warning
+    -------
+        Since tracking is used, your sequence needs to be sliced before calling
+        this function. The beam of the sequence in use should have realistic
+        emittances, as they set the starting coordinates of the particles.
+
+    Note
+    ----
+        The ``APERTURE`` option of ``TRACK`` is set by default, so that particles
+        are lost when outside of the ``MAXAPER`` of elements without an aperture
+        definition. Give ``aperture=False`` to disable it, in which case particles
+        are only lost on numerical overflow.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    nturns : int
+        The number of turns particles should survive for. Defaults to 1000.
+    file : str, optional
+        If given, the resulting table will be exported as a ``TFS`` file with
+        the provided name.
+    n_angles : int
+        The number of angles to scan, evenly spaced from the horizontal (0 degrees)
+        to the vertical (90 degrees) planes. Defaults to 7. Keyword only.
+    max_amplitude : float
+        The maximum amplitude to scan, in bunch :math:`\\sigma`. Defaults to 20.
+        Keyword only.
+    step : float
+        The spacing of the coarse grid of amplitudes, in bunch :math:`\\sigma`.
+        Defaults to 2. Keyword only.
+    tolerance : float
+        The precision to which the dynamic aperture is bisected, in bunch
+        :math:`\\sigma`. Defaults to 0.1. Keyword only.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses the number
+        of CPUs of the machine. No more workers than angles are started. Keyword only.
+    **kwargs
+        Any keyword argument will be transmitted to the ``TRACK`` command in ``MAD-X``.
+
+    Returns
+    -------
+    tfs.TfsDataFrame
+        A `~tfs.frame.TfsDataFrame` with, for each ``ANGLE`` in degrees, the dynamic
+        aperture ``DA`` and its horizontal and vertical components ``DA_X`` and ``DA_Y``,
+        the amplitude ``LOST_AMPLITUDE`` of the closest lost particle and the number of
+        turns ``SURVIVAL`` it survived, all amplitudes in bunch :math:`\\sigma`. If no
+        particle is lost up to *max_amplitude*, the ``DA`` is *max_amplitude*, the
+        ``LOST_AMPLITUDE`` is `NaN` and the ``SURVIVAL`` is *nturns*. The minimum and
+        mean dynamic aperture are given in the headers.
+
+    Example
+    -------
+        .. code-block:: python
+
+            da_dframe = make_da_table(madx, nturns=10_000, n_angles=19, processes=16)
+            da_dframe.headers["MIN_DA"]
+    """
+    if step <= 0 or tolerance <= 0 or max_amplitude < step:
+        logger.error(
+            f"Invalid amplitudes scan with 'max_amplitude={max_amplitude}', 'step={step}' and 'tolerance={tolerance}'"
+        )
+        msg = "The 'step' and 'tolerance' should be positive, and 'max_amplitude' at least 'step'"
+        raise ValueError(msg)
+
+    angles = np.linspace(0, 90, n_angles)
+    amplitudes = np.arange(step, max_amplitude + step / 2, step)
+    # Coordinates of 1 sigma horizontal and vertical amplitudes, which scale linearly
+    unit_coordinates = _get_initial_coordinates(madx, np.array([1.0, 0.0]), np.array([0.0, 1.0]))
+
+    processes = min(multiprocessing.cpu_count() if processes is None else processes, n_angles)
+    logger.debug(f"Scanning dynamic aperture over {nturns} turns for {n_angles} angles on {processes} processes")
+    job = partial(
+        _scan_angle,
+        unit_coordinates=unit_coordinates,
+        amplitudes=amplitudes,
+        nturns=nturns,
+        tolerance=tolerance,
+        **({"aperture": True} | kwargs),
+    )
+    with _tracking_pool(madx, processes) as pool:
+        results = np.array(pool.map(job, np.deg2rad(angles)))
+
+    dynamic_aperture, lost_amplitude, survival = results.T
+    da_dframe = tfs.TfsDataFrame(
+        data={
+            "ANGLE": angles,
+            "DA": dynamic_aperture,
+            "DA_X": dynamic_aperture * np.cos(np.deg2rad(angles)),
+            "DA_Y": dynamic_aperture * np.sin(np.deg2rad(angles)),
+            "LOST_AMPLITUDE": lost_amplitude,
+            "SURVIVAL": survival.astype(int),
+        },
+        headers={
+            "NAME": "DA",
+            "TYPE": "DA",
+            "TITLE": "DYNAMIC APERTURE",
+            "MADX_VERSION": str(madx.version).upper(),
+            "ORIGIN": "pyhdtoolkit.cpymadtools.da.make_da_table() function",
+            "NTURNS": nturns,
+            "MAX_AMPLITUDE": max_amplitude,
+            "TOLERANCE": tolerance,
+            "MIN_DA": float(dynamic_aperture.min()),
+            "MEAN_DA": float(dynamic_aperture.mean()),
+            "NTURNS_MEANING": "Number of turns particles should survive for",
+            "TOLERANCE_MEANING": "Precision of the dynamic aperture determination, in bunch sigma",
+        },
+    )
+
+    if file is not None:
+        tfs.write(Path(file).absolute(), da_dframe)
+
+    return da_dframe
+
+
+# ----- Helpers ----- #
+
+
+def _scan_angle(
+    madx: Madx,
+    /,
+    angle: float,
+    *,
+    unit_coordinates: np.ndarray,
+    amplitudes: np.ndarray,
+    nturns: int,
+    tolerance: float,
+    **kwargs,
+) -> tuple[float, float, int]:
+    """
+    .. versionadded:: 1.9.0
+
+    Job of the workers of `~.cpymadtools.da.make_da_table`: tracks the coarse grid
+    of *amplitudes* along the given *angle* (in radians), then bisects between the
+    last surviving and first lost amplitudes. Returns the dynamic aperture, the
+    amplitude of the closest lost particle and the number of turns it survived.
+    """
+    direction = np.cos(angle) * unit_coordinates[0] + np.sin(angle) * unit_coordinates[1]
+    lost_turns = _track_amplitudes(madx, amplitudes, direction, nturns, **kwargs)
+    unstable = np.flatnonzero(lost_turns >= 0)
+    if not unstable.size:
+        return float(amplitudes[-1]), np.nan, nturns
+
+    first = unstable[0]
+    stable, lost, survival = (amplitudes[first - 1] if first else 0.0), amplitudes[first], lost_turns[first]
+    while lost - stable > tolerance:
+        middle = (stable + lost) / 2
+        lost_turn = _track_amplitudes(madx, np.array([middle]), direction, nturns, **kwargs)[0]
+        if lost_turn < 0:
+            stable = middle
+        else:
+            lost, survival = middle, lost_turn
+    return float(stable), float(lost), int(survival)
+
+
+def _track_amplitudes(
+    madx: Madx, /, amplitudes: np.ndarray, direction: np.ndarray, nturns: int, **kwargs
+) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks particles at the given *amplitudes* along the coordinates *direction*
+    and returns the turn at which each was lost, or -1 if it survived. Coordinates
+    are only recorded on the last turn, as only the losses are needed.
+    """
+    _run_track_block(madx, np.outer(amplitudes, direction), nturns, observation_points=[], ffile=nturns, **kwargs)
+    return _get_lost_turns(madx, len(amplitudes))
@@ -0,0 +1,231 @@
+"""
+.. _cpymadtools-fma:
+
+Frequency Map Analysis
+----------------------
+
+Module with functions to perform Frequency Map Analysis (FMA) through
+a `~cpymad.madx.Madx` object: particles are tracked over two consecutive
+windows of turns, the tunes are determined in each window and their
+variation gives the diffusion index of each particle.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import tfs
+from loguru import logger
+
+from pyhdtoolkit.cpymadtools.track import _run_track_block, _tracked_particles_from_tables, _tracking_pool
+from pyhdtoolkit.cpymadtools.tune import (
+    _get_default_amplitudes,
+    _get_footprint_amplitudes,
+    _get_footprint_grid_headers,
+    _get_initial_coordinates,
+)
+from pyhdtoolkit.cpymadtools.utils import _SIDECAR_FORMATS, _write_npz_sidecar, _write_parquet_sidecar
+from pyhdtoolkit.maths.frequency import get_tunes_from_tracking
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
+
+# Lower bound of the tune variation, to keep the diffusion index finite for perfectly regular particles
+_MIN_TUNE_VARIATION: float = 1e-15
+
+
+def make_fma_table(
+    madx: Madx,
+    /,
+    sigma: float = 5,
+    dense: bool = False,
+    file: str | None = None,
+    *,
+    amplitudes: ArrayLike | None = None,
+    spacing: str = "linear",
+    n_angles: int = 7,
+    grid: str = "cartesian",
+    nturns: int = 1024,
+    processes: int | None = None,
+    method: str = "naff",
+    sidecars: Sequence[str] = (),
+    **kwargs,
+) -> tfs.TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Performs a Frequency Map Analysis of the machine in use. Particles are
+    started on a grid of amplitudes up to the desired bunch :math:`\\sigma`,
+    as for `~.cpymadtools.tune.make_footprint_table`, and tracked for two
+    consecutive windows of *nturns* with the ``TRACK`` command, spread across
+    worker processes. The tunes of each particle are determined in each window,
+    and the diffusion index is computed from their variation as
+
+    .. math::
+
+        D = \\log_{10} \\sqrt{(Q_{x,2} - Q_{x,1})^2 + (Q_{y,2} - Q_{y,1})^2}.
+
+    Regular particles have a very negative diffusion index, while chaotic ones
+    close to resonances have a higher index. Only the determined tunes are sent
+    back from the workers, not the turn-by-turn coordinates.
+
+    Warning
+    -------
+        Since tracking is used, your sequence needs to be sliced before calling
+        this function. The beam of the sequence in use should have realistic
+        emittances, as they set the starting coordinates of the particles.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    sigma : float
+        The maximum amplitude of the tracked particles, in bunch :math:`\\sigma`.
+        Defaults to 5.
+    dense : bool
+        If set to `True`, the amplitudes are increased by 0.5 instead of 1 bunch
+        :math:`\\sigma`. Defaults to `False`.
+    file : str, optional
+        If given, the table will be exported as a ``TFS`` file with the provided
+        name.
+    amplitudes : ArrayLike, optional
+        The starting amplitudes of the particles, in bunch :math:`\\sigma`, in
+        increasing order. If given, *sigma*, *dense* and *spacing* are ignored.
+        Keyword only.
+    spacing : str
+        How to space the default amplitudes up to *sigma*, either ``linear`` or
+        ``log``, see `~.cpymadtools.tune.make_footprint_table`. Defaults to
+        ``linear``. Keyword only.
+    n_angles : int
+        The number of starting angles for each amplitude, for a ``polar`` grid.
+        Defaults to 7. Keyword only.
+    grid : str
+        The kind of particles grid, either ``cartesian`` for particles at each
+        pair of horizontal and vertical amplitudes, ``polar`` for particles at
+        *n_angles* angles for each amplitude, or ``legacy`` for the footprint
+        grid of versions before 1.9.0, see `~.cpymadtools.tune.make_footprint_table`.
+        Defaults to ``cartesian``, which is the usual layout of frequency maps.
+        Keyword only.
+    nturns : int
+        The number of turns of each of the two windows, the particles being
+        tracked for twice as many turns. Defaults to 1024. Keyword only.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses the number
+        of CPUs of the machine. Keyword only.
+    method : str
+        The method to determine the tunes, either ``naff`` or ``fft``, see
+        `~pyhdtoolkit.maths.frequency.get_tunes_from_tracking`. Defaults to
+        ``naff``. Keyword only.
+    sidecars : Sequence[str]
+        Binary formats to also export the table to, next to the **TFS** *file*,
+        either ``parquet`` (requires the `pyarrow` package) or ``npz``. Only used
+        if *file* is given. Defaults to an empty tuple. Keyword only.
+    **kwargs
+        Any keyword argument will be transmitted to the ``TRACK`` command in ``MAD-X``.
+
+    Returns
+    -------
+    tfs.TfsDataFrame
+        A `~tfs.frame.TfsDataFrame` with, for each particle, its starting amplitudes
+        ``FX`` and ``FY`` in bunch :math:`\\sigma` and positions ``X`` and ``Y``,
+        its tunes ``QX1``, ``QY1`` in the first window and ``QX2``, ``QY2`` in the
+        second one, and its ``DIFFUSION`` index. Tunes and diffusion index are `NaN`
+        for particles lost during the tracking.
+
+    Example
+    -------
+        .. code-block:: python
+
+            fma_dframe = make_fma_table(madx, sigma=6, dense=True, nturns=2048, processes=16)
+            axis = plot_tune_diagram(max_order=5)
+            plot_frequency_map(fma_dframe, ax=axis)
+    """
+    if method not in ("naff", "fft"):
+        logger.error(f"Invalid method '{method}' for tunes determination, options are 'naff' and 'fft'")
+        msg = "Invalid tunes determination method"
+        raise ValueError(msg)
+    sidecars = [sidecar.lower() for sidecar in sidecars]
+    for sidecar in sidecars:
+        if sidecar not in _SIDECAR_FORMATS:
+            logger.error(f"Sidecar format '{sidecar}' is not accepted, should be one of {_SIDECAR_FORMATS}.")
+            msg = "Invalid 'sidecars' parameter"
+            raise ValueError(msg)
+
+    dsigma = 1 if not dense else 0.5
+    if amplitudes is not None:
+        amplitudes = np.asarray(amplitudes, dtype=float)
+        sigma = float(amplitudes.max())
+    else:
+        amplitudes = _get_default_amplitudes(sigma, dsigma, spacing, grid)
+    fx, fy = _get_footprint_amplitudes(amplitudes, n_angles, grid)
+    initial_coordinates = _get_initial_coordinates(madx, fx, fy)
+
+    nparticles = len(initial_coordinates)
+    processes = min(multiprocessing.cpu_count() if processes is None else processes, nparticles)
+    logger.debug(f"Frequency Map Analysis of {nparticles} particles over 2 x {nturns} turns on {processes} processes")
+    job = partial(_fma_block, nturns=nturns, method=method, **kwargs)
+    with _tracking_pool(madx, processes) as pool:
+        tunes = np.concatenate(pool.map(job, np.array_split(initial_coordinates, processes)))
+
+    variation = np.hypot(tunes[:, 2] - tunes[:, 0], tunes[:, 3] - tunes[:, 1])
+    fma_dframe = tfs.TfsDataFrame(
+        data={
+            "FX": fx,
+            "FY": fy,
+            "X": initial_coordinates[:, 0],
+            "Y": initial_coordinates[:, 2],
+            "QX1": tunes[:, 0],
+            "QY1": tunes[:, 1],
+            "QX2": tunes[:, 2],
+            "QY2": tunes[:, 3],
+            "DIFFUSION": np.log10(np.maximum(variation, _MIN_TUNE_VARIATION)),  # NaN stays NaN
+        },
+        headers={
+            "NAME": "FMA",
+            "TYPE": "FMA",
+            "TITLE": "FREQUENCY MAP ANALYSIS",
+            "MADX_VERSION": str(madx.version).upper(),
+            "ORIGIN": "pyhdtoolkit.cpymadtools.fma.make_fma_table() function",
+            "NTURNS": nturns,
+            "METHOD": method.upper(),
+            **_get_footprint_grid_headers(amplitudes, sigma, dsigma, n_angles, grid),
+            "NTURNS_MEANING": "Number of turns of each of the two windows the tunes are determined in",
+            "DIFFUSION_MEANING": "Log10 of the tune variation between the two windows",
+        },
+    )
+
+    if file is not None:
+        file_path = Path(file).absolute()
+        tfs.write(file_path, fma_dframe)
+        if "parquet" in sidecars:
+            _write_parquet_sidecar(file_path.with_suffix(".parquet"), [fma_dframe], fma_dframe.headers)
+        if "npz" in sidecars:
+            columns = ((column, [fma_dframe[column].to_numpy()]) for column in fma_dframe.columns)
+            _write_npz_sidecar(file_path.with_suffix(".npz"), columns, nrows=len(fma_dframe))
+
+    return fma_dframe
+
+
+# ----- Helpers ----- #
+
+
+def _fma_block(madx: Madx, /, initial_coordinates: np.ndarray, nturns: int, method: str, **kwargs) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Job of the workers of `~.cpymadtools.fma.make_fma_table`: tracks the given
+    particles for two windows of *nturns* and returns an array of shape ``(N, 4)``
+    with their ``QX1, QY1, QX2, QY2`` tunes, so the coordinates never leave the worker.
+    """
+    _run_track_block(madx, initial_coordinates, 2 * nturns, observation_points=[], **kwargs)
+    coordinates = _tracked_particles_from_tables(madx, len(initial_coordinates), 2 * nturns, []).coordinates[0]
+    first_qx, first_qy = get_tunes_from_tracking(coordinates[:, 1 : nturns + 1], method=method)
+    second_qx, second_qy = get_tunes_from_tracking(coordinates[:, nturns + 1 :], method=method)
+    return np.stack([first_qx, first_qy, second_qx, second_qy], axis=-1)
@@ -33,42 +33,132 @@ Important
                 # use this now
 """
 
-from ._coupling import get_lhc_bpms_twiss_and_rdts
-from ._elements import add_markers_around_lhc_ip, install_ac_dipole_as_kicker, install_ac_dipole_as_matrix
-from ._errors import misalign_lhc_ir_quadrupoles, misalign_lhc_triplets
-from ._misc import (
-    get_lhc_bpms_list,
-    get_lhc_tune_and_chroma_knobs,
-    get_sizes_at_ip,
-    make_sixtrack_output,
-    reset_lhc_bump_flags,
-)
-from ._powering import (
-    apply_lhc_colinearity_knob,
-    apply_lhc_colinearity_knob_delta,
-    apply_lhc_coupling_knob,
-    apply_lhc_rigidity_waist_shift_knob,
-    carry_colinearity_knob_over,
-    deactivate_lhc_arc_sextupoles,
-    power_landau_octupoles,
-    switch_magnetic_errors,
-    vary_independent_ir_quadrupoles,
-)
-from ._queries import (
-    get_current_orbit_setup,
-    get_magnets_powering,
-    query_arc_correctors_powering,
-    query_triplet_correctors_powering,
-)
-from ._routines import correct_lhc_global_coupling, correct_lhc_orbit, do_kmodulation
-from ._setup import (
-    LHCSetup,
-    lhc_orbit_variables,
-    make_lhc_beams,
-    make_lhc_thin,
-    prepare_lhc_run2,
-    prepare_lhc_run3,
-    re_cycle_sequence,
-    setup_lhc_orbit,
-)
-from ._twiss import get_ips_twiss, get_ir_twiss
+from typing import TYPE_CHECKING
+
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from ._coupling import get_lhc_bpms_twiss_and_rdts
+    from ._elements import add_markers_around_lhc_ip, install_ac_dipole_as_kicker, install_ac_dipole_as_matrix
+    from ._errors import misalign_lhc_ir_quadrupoles, misalign_lhc_triplets
+    from ._misc import (
+        get_lhc_bpms_list,
+        get_lhc_tune_and_chroma_knobs,
+        get_sizes_at_ip,
+        make_sixtrack_output,
+        reset_lhc_bump_flags,
+    )
+    from ._powering import (
+        apply_lhc_colinearity_knob,
+        apply_lhc_colinearity_knob_delta,
+        apply_lhc_coupling_knob,
+        apply_lhc_rigidity_waist_shift_knob,
+        carry_colinearity_knob_over,
+        deactivate_lhc_arc_sextupoles,
+        power_landau_octupoles,
+        switch_magnetic_errors,
+        vary_independent_ir_quadrupoles,
+    )
+    from ._queries import (
+        get_current_orbit_setup,
+        get_magnets_powering,
+        query_arc_correctors_powering,
+        query_triplet_correctors_powering,
+    )
+    from ._routines import correct_lhc_global_coupling, correct_lhc_orbit, do_kmodulation
+    from ._setup import (
+        LHCSetup,
+        clear_lhc_machine_cache,
+        lhc_orbit_variables,
+        make_lhc_beams,
+        make_lhc_thin,
+        prepare_lhc_run2,
+        prepare_lhc_run3,
+        re_cycle_sequence,
+        setup_lhc_orbit,
+    )
+    from ._twiss import get_ips_twiss, get_ir_twiss
+
+_ATTRIBUTES: dict[str, str] = {
+    "get_lhc_bpms_twiss_and_rdts": "_coupling",
+    "add_markers_around_lhc_ip": "_elements",
+    "install_ac_dipole_as_kicker": "_elements",
+    "install_ac_dipole_as_matrix": "_elements",
+    "misalign_lhc_ir_quadrupoles": "_errors",
+    "misalign_lhc_triplets": "_errors",
+    "get_lhc_bpms_list": "_misc",
+    "get_lhc_tune_and_chroma_knobs": "_misc",
+    "get_sizes_at_ip": "_misc",
+    "make_sixtrack_output": "_misc",
+    "reset_lhc_bump_flags": "_misc",
+    "apply_lhc_colinearity_knob": "_powering",
+    "apply_lhc_colinearity_knob_delta": "_powering",
+    "apply_lhc_coupling_knob": "_powering",
+    "apply_lhc_rigidity_waist_shift_knob": "_powering",
+    "carry_colinearity_knob_over": "_powering",
+    "deactivate_lhc_arc_sextupoles": "_powering",
+    "power_landau_octupoles": "_powering",
+    "switch_magnetic_errors": "_powering",
+    "vary_independent_ir_quadrupoles": "_powering",
+    "get_current_orbit_setup": "_queries",
+    "get_magnets_powering": "_queries",
+    "query_arc_correctors_powering": "_queries",
+    "query_triplet_correctors_powering": "_queries",
+    "correct_lhc_global_coupling": "_routines",
+    "correct_lhc_orbit": "_routines",
+    "do_kmodulation": "_routines",
+    "LHCSetup": "_setup",
+    "clear_lhc_machine_cache": "_setup",
+    "lhc_orbit_variables": "_setup",
+    "make_lhc_beams": "_setup",
+    "make_lhc_thin": "_setup",
+    "prepare_lhc_run2": "_setup",
+    "prepare_lhc_run3": "_setup",
+    "re_cycle_sequence": "_setup",
+    "setup_lhc_orbit": "_setup",
+    "get_ips_twiss": "_twiss",
+    "get_ir_twiss": "_twiss",
+}
+
+__all__ = [
+    "LHCSetup",
+    "add_markers_around_lhc_ip",
+    "apply_lhc_colinearity_knob",
+    "apply_lhc_colinearity_knob_delta",
+    "apply_lhc_coupling_knob",
+    "apply_lhc_rigidity_waist_shift_knob",
+    "carry_colinearity_knob_over",
+    "clear_lhc_machine_cache",
+    "correct_lhc_global_coupling",
+    "correct_lhc_orbit",
+    "deactivate_lhc_arc_sextupoles",
+    "do_kmodulation",
+    "get_current_orbit_setup",
+    "get_ips_twiss",
+    "get_ir_twiss",
+    "get_lhc_bpms_list",
+    "get_lhc_bpms_twiss_and_rdts",
+    "get_lhc_tune_and_chroma_knobs",
+    "get_magnets_powering",
+    "get_sizes_at_ip",
+    "install_ac_dipole_as_kicker",
+    "install_ac_dipole_as_matrix",
+    "lhc_orbit_variables",
+    "make_lhc_beams",
+    "make_lhc_thin",
+    "make_sixtrack_output",
+    "misalign_lhc_ir_quadrupoles",
+    "misalign_lhc_triplets",
+    "power_landau_octupoles",
+    "prepare_lhc_run2",
+    "prepare_lhc_run3",
+    "query_arc_correctors_powering",
+    "query_triplet_correctors_powering",
+    "re_cycle_sequence",
+    "reset_lhc_bump_flags",
+    "setup_lhc_orbit",
+    "switch_magnetic_errors",
+    "vary_independent_ir_quadrupoles",
+]
+
+__getattr__, __dir__ = attach(__name__, attributes=_ATTRIBUTES)
@@ -13,6 +13,8 @@ from typing import TYPE_CHECKING
 
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.cache import invalidates_twiss_cache
+
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
@@ -34,6 +36,7 @@ LHC_IR_QUADS_PATTERNS: dict[int, list[str]] = {
 }
 
 
+@invalidates_twiss_cache
 def misalign_lhc_triplets(
     madx: Madx, /, ip: int, sides: Sequence[str] = ("r", "l"), table: str = "triplet_errors", **kwargs
 ) -> None:
@@ -80,6 +83,7 @@ def misalign_lhc_triplets(
     misalign_lhc_ir_quadrupoles(madx, ips=[ip], beam=None, quadrupoles=(1, 2, 3), sides=sides, table=table, **kwargs)
 
 
+@invalidates_twiss_cache
 def misalign_lhc_ir_quadrupoles(
     madx: Madx,
     /,
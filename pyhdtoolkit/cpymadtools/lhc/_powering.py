@@ -12,6 +12,8 @@ from typing import TYPE_CHECKING
 
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.cache import invalidates_twiss_cache
+
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
@@ -22,6 +24,7 @@ _QUAD_CIRCUIT_HAS_B: int = 7  # Q7 has a .b in the circuit name
 _MAX_IR_QUAD_NUMBER: int = 11  # beyond Q11 are MQTs etc
 
 
+@invalidates_twiss_cache
 def apply_lhc_colinearity_knob(madx: Madx, /, colinearity_knob_value: float = 0, ir: int | None = None) -> None:
     """
     .. versionadded:: 0.15.0
@@ -74,6 +77,7 @@ def apply_lhc_colinearity_knob(madx: Madx, /, colinearity_knob_value: float = 0,
     logger.debug(f"Set '{left_knob}' to {madx.globals[left_knob]}")
 
 
+@invalidates_twiss_cache
 def apply_lhc_colinearity_knob_delta(madx: Madx, /, colinearity_knob_delta: float = 0, ir: int | None = None) -> None:
     """
     .. versionadded:: 0.21.0
@@ -127,6 +131,7 @@ def apply_lhc_colinearity_knob_delta(madx: Madx, /, colinearity_knob_delta: floa
     logger.debug(f"Set '{left_knob}' to {madx.globals[left_knob]}")
 
 
+@invalidates_twiss_cache
 def apply_lhc_rigidity_waist_shift_knob(
     madx: Madx, /, rigidty_waist_shift_value: float = 0, ir: int | None = None, side: str = "left"
 ) -> None:
@@ -206,6 +211,7 @@ def apply_lhc_rigidity_waist_shift_knob(
     logger.debug(f"Set '{left_knob}' to {madx.globals[left_knob]}")
 
 
+@invalidates_twiss_cache
 def apply_lhc_coupling_knob(
     madx: Madx, /, coupling_knob: float = 0, beam: int = 1, telescopic_squeeze: bool = True
 ) -> None:
@@ -248,6 +254,7 @@ def apply_lhc_coupling_knob(
     logger.debug(f"Set '{knob_name}' to {madx.globals[knob_name]}")
 
 
+@invalidates_twiss_cache
 def carry_colinearity_knob_over(madx: Madx, /, ir: int, to_left: bool = True) -> None:
     """
     .. versionadded:: 0.20.0
@@ -288,6 +295,7 @@ def carry_colinearity_knob_over(madx: Madx, /, ir: int, to_left: bool = True) ->
     logger.debug("New powerings applied")
 
 
+@invalidates_twiss_cache
 def power_landau_octupoles(madx: Madx, /, beam: int, mo_current: float, defective_arc: bool = False) -> None:
     """
     .. versionadded:: 0.15.0
@@ -333,6 +341,7 @@ def power_landau_octupoles(madx: Madx, /, beam: int, mo_current: float, defectiv
         madx.globals["KOD.A56B1"] = strength * 4.65 / 6  # defective MO group
 
 
+@invalidates_twiss_cache
 def deactivate_lhc_arc_sextupoles(madx: Madx, /, beam: int) -> None:
     """
     .. versionadded:: 0.15.0
@@ -440,6 +449,7 @@ def vary_independent_ir_quadrupoles(
             )
 
 
+@invalidates_twiss_cache
 def switch_magnetic_errors(madx: Madx, /, **kwargs) -> None:
     """
     .. versionadded:: 0.7.0
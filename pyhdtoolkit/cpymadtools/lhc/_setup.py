@@ -9,21 +9,34 @@ to easily get simulations ready.
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 from pathlib import Path
 
 from cpymad.madx import Madx
 from loguru import logger
 
 from pyhdtoolkit.cpymadtools.constants import LHC_CROSSING_SCHEMES
+from pyhdtoolkit.cpymadtools.utils import load_madx_machine, save_madx_machine
 
 _BEAM_FOR_B4: int = 2  # LHC beam 4 uses lhcb2 sequence
 _RUN2: int = 2
+_MACHINE_CACHE_FORMAT: int = 1  # bump when the content of cached machines changes
+_MAX_CACHED_MACHINES: int = 16
 
 # ----- Setup Utilities ----- #
 
 
 def prepare_lhc_run2(
-    opticsfile: str, beam: int = 1, use_b4: bool = False, energy: float = 6500, slicefactor: int | None = None, **kwargs
+    opticsfile: str,
+    beam: int = 1,
+    use_b4: bool = False,
+    energy: float = 6500,
+    slicefactor: int | None = None,
+    *,
+    cache: bool | str | Path = False,
+    **kwargs,
 ) -> Madx:
     """
     .. versionadded:: 1.0.0
@@ -47,6 +60,19 @@ def prepare_lhc_run2(
         of by the user, but the working point should be set by the definitions in
         the *opticsfile*.
 
+    Tip
+    ---
+        With the *cache* option, the prepared machine is saved with
+        `~.cpymadtools.utils.save_madx_machine` and later setups load it back
+        instead of doing all the preparation steps again. Cached machines are
+        identified by the run, the content of the sequence and optics files, and
+        the *beam*, *use_b4*, *energy* and *slicefactor* parameters. The least
+        recently used machines are evicted when the cache directory holds too
+        many of them, and `~.lhc._setup.clear_lhc_machine_cache` empties it.
+        Files called by the optics file are not part of the identification:
+        clear the cache if these change. For a sliced machine, only the sliced
+        sequence is cached.
+
     Parameters
     ----------
     opticsfile : str
@@ -63,6 +89,15 @@ def prepare_lhc_run2(
     slicefactor : int, optional
         If provided, the sequence will be sliced and made thin. Defaults to
         `None`, which leads to an unsliced sequence.
+    cache : bool | str | Path
+        If given, the prepared machine is saved to (or loaded from, if already
+        there) an on-disk cache, which makes later setups with the same
+        parameters much faster. Can be `True` to use the default cache
+        directory, or the path to a cache directory. Defaults to `False`,
+        which does not use a cache. Keyword only. See the tip about the
+        machine cache above.
+
+        .. versionadded:: 1.9.0
     **kwargs
         If `echo` or `warn` are found in the keyword arguments they will be
         transmitted as options to ``MAD-X`` (by default these two are given
@@ -99,13 +134,21 @@ def prepare_lhc_run2(
             raise ValueError(msg)
         return seqfile_path
 
-    logger.debug("Creating Run 2 setup MAD-X instance")
     echo, warn = kwargs.pop("echo", False), kwargs.pop("warn", False)
+    sequence_file = _run2_sequence_from_opticsfile(Path(opticsfile))
+    cache_file = None
+    if cache:
+        cache_file = _lhc_machine_cache_file(
+            cache, 2, sequence_file, Path(opticsfile), beam, use_b4=use_b4, energy=energy, slicefactor=slicefactor
+        )
+        if cache_file.is_file():
+            return _load_cached_lhc_machine(cache_file, beam, echo=echo, warn=warn, **kwargs)
 
+    logger.debug("Creating Run 2 setup MAD-X instance")
     madx = Madx(**kwargs)
     madx.option(echo=echo, warn=warn)
     logger.debug("Calling sequence")
-    madx.call(_fullpath(_run2_sequence_from_opticsfile(Path(opticsfile))))
+    madx.call(_fullpath(sequence_file))
     make_lhc_beams(madx, energy=energy, b4=use_b4, nemitt_x=3.75e-6, nemitt_y=3.75e-6)
 
     if slicefactor:
@@ -120,11 +163,21 @@ def prepare_lhc_run2(
 
     make_lhc_beams(madx, energy=energy, b4=use_b4, nemitt_x=3.75e-6, nemitt_y=3.75e-6)
     madx.command.use(sequence=f"lhcb{beam:d}")
+
+    if cache_file is not None:
+        _store_lhc_machine(madx, cache_file, beam, sliced=bool(slicefactor))
     return madx
 
 
 def prepare_lhc_run3(
-    opticsfile: str, beam: int = 1, use_b4: bool = False, energy: float = 6800, slicefactor: int | None = None, **kwargs
+    opticsfile: str,
+    beam: int = 1,
+    use_b4: bool = False,
+    energy: float = 6800,
+    slicefactor: int | None = None,
+    *,
+    cache: bool | str | Path = False,
+    **kwargs,
 ) -> Madx:
     """
     .. versionadded:: 1.0.0
@@ -147,6 +200,19 @@ def prepare_lhc_run3(
         of by the user, but the working point should be set by the definitions in
         the *opticsfile*.
 
+    Tip
+    ---
+        With the *cache* option, the prepared machine is saved with
+        `~.cpymadtools.utils.save_madx_machine` and later setups load it back
+        instead of doing all the preparation steps again. Cached machines are
+        identified by the run, the content of the sequence and optics files, and
+        the *beam*, *use_b4*, *energy* and *slicefactor* parameters. The least
+        recently used machines are evicted when the cache directory holds too
+        many of them, and `~.lhc._setup.clear_lhc_machine_cache` empties it.
+        Files called by the optics file are not part of the identification:
+        clear the cache if these change. For a sliced machine, only the sliced
+        sequence is cached.
+
     Parameters
     ----------
     opticsfile : str
@@ -163,6 +229,15 @@ def prepare_lhc_run3(
     slicefactor : int, optional
         If provided, the sequence will be sliced and made thin. Defaults to
         `None`, which leads to an unsliced sequence.
+    cache : bool | str | Path
+        If given, the prepared machine is saved to (or loaded from, if already
+        there) an on-disk cache, which makes later setups with the same
+        parameters much faster. Can be `True` to use the default cache
+        directory, or the path to a cache directory. Defaults to `False`,
+        which does not use a cache. Keyword only. See the tip about the
+        machine cache above.
+
+        .. versionadded:: 1.9.0
     **kwargs
         If `echo` or `warn` are found in the keyword arguments they will be
         transmitted as options to ``MAD-X`` (by default these two are given
@@ -188,13 +263,32 @@ def prepare_lhc_run3(
         msg = "Cannot use beam 4 sequence file for beam 1"
         raise ValueError(msg)
 
-    logger.debug("Creating Run 3 setup MAD-X instance")
     echo, warn = kwargs.pop("echo", False), kwargs.pop("warn", False)
+    sequence = "lhc.seq" if not use_b4 else "lhcb4.seq"
+    optics_path = (
+        Path(opticsfile)
+        if Path(opticsfile).is_file()
+        else Path("acc-models-lhc/operation/optics") / Path(opticsfile).with_suffix(".madx")
+    )
+    cache_file = None
+    if cache:
+        cache_file = _lhc_machine_cache_file(
+            cache,
+            3,
+            Path(f"acc-models-lhc/{sequence}"),
+            optics_path,
+            beam,
+            use_b4=use_b4,
+            energy=energy,
+            slicefactor=slicefactor,
+        )
+        if cache_file.is_file():
+            return _load_cached_lhc_machine(cache_file, beam, echo=echo, warn=warn, **kwargs)
 
+    logger.debug("Creating Run 3 setup MAD-X instance")
     madx = Madx(**kwargs)
     madx.option(echo=echo, warn=warn)
 
-    sequence = "lhc.seq" if not use_b4 else "lhcb4.seq"
     logger.debug(f"Calling sequence file '{sequence}'")
     madx.call(f"acc-models-lhc/{sequence}")
     make_lhc_beams(madx, energy=energy, b4=use_b4)
@@ -207,13 +301,13 @@ def prepare_lhc_run3(
     re_cycle_sequence(madx, sequence=f"lhcb{beam:d}", start=f"MSIA.EXIT.B{beam:d}")
 
     logger.debug("Calling optics file from the 'operation/optics' folder")
-    if Path(opticsfile).is_file():
-        madx.call(opticsfile)
-    else:
-        madx.call(f"acc-models-lhc/operation/optics/{Path(opticsfile).with_suffix('.madx')}")
+    madx.call(str(optics_path))
 
     make_lhc_beams(madx, energy=energy, b4=use_b4)
     madx.command.use(sequence=f"lhcb{beam:d}")
+
+    if cache_file is not None:
+        _store_lhc_machine(madx, cache_file, beam, sliced=bool(slicefactor))
     return madx
 
 
@@ -264,6 +358,15 @@ class LHCSetup:
     slicefactor : int, optional
         If provided, the sequence will be sliced and made thin. Defaults to
         `None`, which leads to an unsliced sequence.
+    cache : bool | str | Path
+        If given, the prepared machine is saved to (or loaded from, if already
+        there) an on-disk cache, which makes later setups with the same
+        parameters much faster. Can be `True` to use the default cache
+        directory, or the path to a cache directory. Defaults to `False`,
+        which does not use a cache. Keyword only. See `~prepare_lhc_run3`
+        for details about the machine cache.
+
+        .. versionadded:: 1.9.0
     **kwargs
         If `echo` or `warn` are found in the keyword arguments they will be
         transmitted as options to ``MAD-X`` (by default these two are given
@@ -304,6 +407,20 @@ class LHCSetup:
                 stdout=False,
             ) as madx:
                 pass  # do some stuff
+
+        Get the same setup from the on-disk machine cache, which is much faster
+        after the first time:
+
+        .. code-block:: python
+
+            with LHCSetup(
+                run=3,
+                opticsfile="R2022a_A30cmC30cmA10mL200cm.madx",
+                slicefactor=4,
+                cache=True,
+                stdout=False,
+            ) as madx:
+                pass  # do some stuff
     """
 
     def __init__(
@@ -314,6 +431,8 @@ class LHCSetup:
         use_b4: bool = False,
         energy: float = 6800,
         slicefactor: int | None = None,
+        *,
+        cache: bool | str | Path = False,
         **kwargs,
     ):
         if opticsfile is None:  # don't want to move arg and mess users code
@@ -329,11 +448,23 @@ class LHCSetup:
             raise NotImplementedError(msg)
         if run == _RUN2:
             self.madx = prepare_lhc_run2(
-                opticsfile=opticsfile, beam=beam, use_b4=use_b4, energy=energy, slicefactor=slicefactor, **kwargs
+                opticsfile=opticsfile,
+                beam=beam,
+                use_b4=use_b4,
+                energy=energy,
+                slicefactor=slicefactor,
+                cache=cache,
+                **kwargs,
             )
         else:
             self.madx = prepare_lhc_run3(
-                opticsfile=opticsfile, beam=beam, use_b4=use_b4, energy=energy, slicefactor=slicefactor, **kwargs
+                opticsfile=opticsfile,
+                beam=beam,
+                use_b4=use_b4,
+                energy=energy,
+                slicefactor=slicefactor,
+                cache=cache,
+                **kwargs,
             )
 
     def __enter__(self):
@@ -649,6 +780,32 @@ def setup_lhc_orbit(madx: Madx, /, scheme: str = "flat", **kwargs) -> dict[str,
     return final_scheme
 
 
+def clear_lhc_machine_cache(cache_dir: str | Path | None = None) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Removes all machines saved in the on-disk cache used by the *cache*
+    option of `~.lhc._setup.prepare_lhc_run2`, `~.lhc._setup.prepare_lhc_run3`
+    and `~.lhc._setup.LHCSetup`.
+
+    Parameters
+    ----------
+    cache_dir : str | Path, optional
+        The cache directory to clear. Defaults to `None`, which clears
+        the default cache directory.
+
+    Example
+    -------
+        .. code-block:: python
+
+            clear_lhc_machine_cache()
+    """
+    cache_path = Path(cache_dir) if cache_dir is not None else _default_machine_cache_dir()
+    logger.debug(f"Clearing LHC machine cache at '{cache_path.absolute()}'")
+    for machine_file in cache_path.glob("lhc_*.madx"):
+        machine_file.unlink(missing_ok=True)
+
+
 # ----- Helpers ----- #
 
 
@@ -659,3 +816,88 @@ def _fullpath(filepath: Path) -> str:
     Returns the full string path to the provided *filepath*.
     """
     return str(filepath.absolute())
+
+
+def _default_machine_cache_dir() -> Path:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the default directory for cached machines, following the
+    ``XDG_CACHE_HOME`` convention.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "pyhdtoolkit" / "lhc_machines"
+
+
+def _lhc_machine_cache_file(
+    cache: bool | str | Path,
+    run: int,
+    sequence_file: Path,
+    opticsfile: Path,
+    beam: int,
+    *,
+    use_b4: bool,
+    energy: float,
+    slicefactor: int | None,
+) -> Path:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the path of the cache file for a prepared machine, identified
+    by a hash of the setup parameters and of the sequence and optics files
+    contents.
+    """
+    cache_dir = _default_machine_cache_dir() if cache is True else Path(cache)
+    key = {
+        "format": _MACHINE_CACHE_FORMAT,
+        "run": run,
+        "sequence": hashlib.sha256(sequence_file.read_bytes()).hexdigest(),
+        "optics": hashlib.sha256(opticsfile.read_bytes()).hexdigest(),
+        "beam": beam,
+        "use_b4": use_b4,
+        "energy": float(energy),
+        "slicefactor": slicefactor or None,
+    }
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:20]
+    return cache_dir / f"lhc_run{run:d}_b{4 if use_b4 else beam:d}_{digest}.madx"
+
+
+def _load_cached_lhc_machine(cache_file: Path, beam: int, echo: bool = False, warn: bool = False, **kwargs) -> Madx:
+    """
+    .. versionadded:: 1.9.0
+
+    Creates a `~cpymad.madx.Madx` instance with the machine from the
+    cache file, and ``USE``-s the sequence for the given beam.
+    """
+    logger.debug(f"Loading prepared machine from cache file '{cache_file}'")
+    cache_file.touch()  # marks it as recently used, for eviction
+    madx = Madx(**kwargs)
+    madx.option(echo=echo, warn=warn)
+    load_madx_machine(madx, cache_file)
+    madx.command.use(sequence=f"lhcb{beam:d}")
+    return madx
+
+
+def _store_lhc_machine(madx: Madx, /, cache_file: Path, beam: int, sliced: bool = False) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Saves the prepared machine to the cache file, then evicts the least
+    recently used machines if there are too many in the cache directory.
+    The file is written under a temporary name and then moved, so that
+    concurrent processes never load a partially written machine.
+    """
+    logger.debug(f"Saving prepared machine to cache file '{cache_file}'")
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    sequences = [f"lhcb{beam:d}"] if sliced else None  # other sequence shares classes with the thin one
+    temporary_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        save_madx_machine(madx, temporary_file, sequences=sequences)
+        temporary_file.replace(cache_file)
+    finally:
+        temporary_file.unlink(missing_ok=True)
+
+    cached_machines = sorted(cache_file.parent.glob("lhc_*.madx"), key=lambda path: path.stat().st_mtime)
+    for machine_file in cached_machines[:-_MAX_CACHED_MACHINES]:
+        logger.debug(f"Evicting cached machine '{machine_file.name}'")
+        machine_file.unlink(missing_ok=True)
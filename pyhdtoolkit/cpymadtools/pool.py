@@ -0,0 +1,405 @@
+"""
+.. _cpymadtools-pool:
+
+MAD-X Process Pool
+------------------
+
+Module with a pool of pre-configured `~cpymad.madx.Madx` instances, each
+living in its own worker process, to run embarrassingly parallel studies
+(scans over seeds, knobs, tunes etc) on all cores of a machine.
+
+Each worker creates its `~cpymad.madx.Madx` instance once, by calling the
+same setup callable, and then runs the jobs dispatched to it on this instance.
+Workers crashing (or ``MAD-X`` itself crashing) are restarted, and jobs can be
+given a timeout after which their worker is killed and restarted.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import TYPE_CHECKING, Any, Self
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from multiprocessing.connection import Connection
+    from multiprocessing.context import BaseContext
+    from multiprocessing.process import BaseProcess
+
+    from cpymad.madx import Madx
+
+# ----- Exceptions ----- #
+
+
+class WorkerSetupError(ChildProcessError):
+    """Raised when the setup callable fails in a worker of a `~.cpymadtools.pool.MadxPool`."""
+
+    def __init__(self, details: str) -> None:
+        errmsg = f"Setting up the MAD-X instance of a pool worker failed:\n{details}"
+        super().__init__(errmsg)
+
+
+class WorkerCrashedError(ChildProcessError):
+    """Raised for a job whose worker process died while running it."""
+
+    def __init__(self, exitcode: int | None) -> None:
+        errmsg = f"The pool worker running this job died unexpectedly (exit code {exitcode})"
+        super().__init__(errmsg)
+
+
+class JobTimeoutError(TimeoutError):
+    """Raised for a job which did not complete within the given timeout."""
+
+    def __init__(self, timeout: float) -> None:
+        errmsg = f"The job did not complete within {timeout} seconds, its worker was restarted"
+        super().__init__(errmsg)
+
+
+# ----- Pool ----- #
+
+
+class MadxPool:
+    """
+    .. versionadded:: 1.9.0
+
+    A pool of worker processes, each holding a `~cpymad.madx.Madx` instance
+    created by the same *setup* callable, to which jobs are dispatched. A job
+    is a callable taking the worker's `~cpymad.madx.Madx` instance as first
+    argument, whose returned value (for instance a `~tfs.frame.TfsDataFrame`)
+    is sent back to the main process.
+
+    Workers whose process dies, or whose ``MAD-X`` process stops working, are
+    restarted (which means their instance is set up again) and the job they were
+    running fails with a `~.cpymadtools.pool.WorkerCrashedError`. Jobs running for
+    longer than the given timeout fail with a `~.cpymadtools.pool.JobTimeoutError`
+    and their worker is restarted.
+
+    Important
+    ---------
+        The *setup* callable, the jobs and their arguments and returned values
+        are sent between processes and must be picklable: use module-level
+        functions or `functools.partial` objects rather than lambdas. Since
+        each job runs on an instance which has run previous jobs, jobs should
+        restore any state they change, or not depend on it.
+
+    Parameters
+    ----------
+    setup : Callable[[], cpymad.madx.Madx]
+        A callable taking no argument and returning a ready-to-use
+        `~cpymad.madx.Madx` instance, called once in each worker.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses
+        the number of CPUs of the machine.
+    timeout : float, optional
+        The default timeout for each job, in seconds. Can be overridden
+        for each call to `~.cpymadtools.pool.MadxPool.map`. Defaults to
+        `None`, for no timeout.
+    mp_context : str, optional
+        The `multiprocessing` start method to use, such as ``fork`` or
+        ``spawn``. Defaults to `None`, which uses the platform's default.
+
+    Raises
+    ------
+    WorkerSetupError
+        If the *setup* callable fails in a worker.
+
+    Examples
+    --------
+        Get the coupling for different knob values, on 16 cores:
+
+        .. code-block:: python
+
+            from functools import partial
+
+
+            def coupling_with_knob(madx: Madx, knob_value: float) -> tfs.TfsDataFrame:
+                apply_lhc_coupling_knob(madx, coupling_knob=knob_value, beam=1)
+                return get_cminus_from_coupling_rdts(madx)
+
+
+            setup = partial(prepare_lhc_run3, opticsfile="R2022a_A30cmC30cmA10mL200cm.madx", stdout=False)
+            with MadxPool(setup, processes=16, timeout=600) as pool:
+                results = pool.map(coupling_with_knob, np.linspace(-1e-3, 1e-3, 64))
+
+        Keeping failed jobs as exceptions in the results instead of raising:
+
+        .. code-block:: python
+
+            with MadxPool(setup, processes=16) as pool:
+                results = pool.map(run_seed, range(60), timeout=300, return_exceptions=True)
+            failed = [seed for seed, result in enumerate(results) if isinstance(result, Exception)]
+    """
+
+    def __init__(
+        self,
+        setup: Callable[[], Madx],
+        processes: int | None = None,
+        timeout: float | None = None,
+        mp_context: str | None = None,
+    ) -> None:
+        if processes is not None and processes < 1:
+            logger.error(f"The number of processes should be a positive integer, not {processes}")
+            msg = "Invalid 'processes' argument."
+            raise ValueError(msg)
+
+        self.setup = setup
+        self.processes: int = processes or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self._context: BaseContext = multiprocessing.get_context(mp_context)
+        self._workers: list[_Worker] = []
+
+        logger.debug(f"Starting {self.processes} pool workers")
+        self._workers = [self._start_worker() for _ in range(self.processes)]
+        try:
+            for worker in self._workers:
+                self._wait_ready(worker)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def map(
+        self,
+        func: Callable[..., Any],
+        iterable: Iterable[Any],
+        timeout: float | None = None,
+        return_exceptions: bool = False,
+    ) -> list[Any]:
+        """
+        .. versionadded:: 1.9.0
+
+        Runs ``func(madx, item)`` for each item of *iterable* on the pool
+        workers, and returns the results in the order of *iterable*.
+
+        Parameters
+        ----------
+        func : Callable
+            The job to run, taking a `~cpymad.madx.Madx` instance as first
+            argument and an item of *iterable* as second argument.
+        iterable : Iterable
+            The items to run the job for.
+        timeout : float, optional
+            The timeout for each job, in seconds. Defaults to `None`,
+            which uses the timeout given at the pool's creation.
+        return_exceptions : bool
+            If `True`, the exception raised by a failed job is placed in the
+            results at its position. Otherwise, the first failure stops the
+            dispatch of the remaining jobs and its exception is raised once
+            running jobs have completed. Defaults to `False`.
+
+        Returns
+        -------
+        list
+            The values returned by each job, in order.
+
+        Example
+        -------
+            .. code-block:: python
+
+                with MadxPool(setup, processes=8) as pool:
+                    twiss_dfs = pool.map(get_twiss_for_seed, range(100))
+        """
+        if not self._workers:
+            msg = "The pool has been closed."
+            raise RuntimeError(msg)
+
+        timeout = self.timeout if timeout is None else timeout
+        pending = list(enumerate(iterable))[::-1]  # pop from the end for the first items
+        results: list[Any] = [None] * len(pending)
+        first_error: BaseException | None = None
+        logger.debug(f"Dispatching {len(pending)} jobs to {len(self._workers)} pool workers")
+
+        while pending or any(worker.job is not None for worker in self._workers):
+            # Dispatch jobs to idle workers, unless we stop at the first error
+            for worker in self._workers:
+                if worker.job is None and worker.ready and pending and first_error is None:
+                    index, item = pending.pop()
+                    worker.dispatch(index, func, item, timeout)
+
+            if first_error is not None and all(worker.job is None for worker in self._workers):
+                break
+
+            # Wait for a result, a worker death or the nearest job deadline
+            deadlines = [worker.deadline for worker in self._workers if worker.deadline is not None]
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait([handle for worker in self._workers for handle in worker.handles], timeout=wait_time)
+
+            for position, worker in enumerate(self._workers):
+                outcome = self._collect(worker, ready)
+                if outcome is not None:
+                    index, success, value = outcome
+                    if not success:
+                        logger.warning(f"Job #{index} failed: {value!r}")
+                        if not return_exceptions and first_error is None:
+                            first_error = value
+                    results[index] = value
+                if worker.job is None and not worker.process.is_alive():  # crashed or killed, replace it
+                    logger.debug("Restarting a pool worker")
+                    worker.stop(force=True)
+                    self._workers[position] = self._start_worker()
+
+        if first_error is not None:
+            raise first_error
+        return results
+
+    def close(self) -> None:
+        """
+        .. versionadded:: 1.9.0
+
+        Stops all workers, quitting their `~cpymad.madx.Madx` instances.
+        Called automatically when leaving the context manager.
+        """
+        logger.debug("Closing pool workers")
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    # ----- Workers Handling ----- #
+
+    def _start_worker(self) -> _Worker:
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(self.setup, child_connection), daemon=True)
+        process.start()
+        child_connection.close()  # only used by the child
+        return _Worker(process, parent_connection)
+
+    def _wait_ready(self, worker: _Worker) -> None:
+        """Blocks until the worker has set up its instance, raises if it failed to do so."""
+        try:
+            message = worker.connection.recv()
+        except EOFError:
+            worker.process.join()
+            details = f"Worker died during setup (exit code {worker.process.exitcode})"
+            raise WorkerSetupError(details) from None
+        _check_ready_message(message)
+        worker.ready = True
+
+    def _collect(self, worker: _Worker, ready: list) -> tuple[int, bool, Any] | None:
+        """
+        Handles what happened to the worker: returns (index, success, value) if its
+        job completed, failed, crashed or timed out, otherwise `None`.
+        """
+        if worker.connection in ready:
+            try:
+                message = worker.connection.recv()
+            except EOFError:  # died, handled below with its exit code
+                message = None
+            if message is not None and not worker.ready:  # restarted worker is now set up
+                _check_ready_message(message)
+                worker.ready = True
+                return None
+            if message is not None:
+                _, index, success, value = message
+                worker.job, worker.deadline = None, None
+                return index, success, value
+
+        if worker.process.sentinel in ready or not worker.process.is_alive():
+            worker.process.join()
+            if worker.job is None and not worker.ready:
+                details = f"Worker died during setup (exit code {worker.process.exitcode})"
+                raise WorkerSetupError(details)
+            if worker.job is not None:
+                index, worker.job = worker.job, None
+                return index, False, WorkerCrashedError(worker.process.exitcode)
+
+        if worker.deadline is not None and time.monotonic() >= worker.deadline:
+            logger.warning(f"Job #{worker.job} timed out, restarting its worker")
+            index, timeout = worker.job, worker.timeout
+            worker.stop(force=True)
+            return index, False, JobTimeoutError(timeout)
+        return None
+
+
+class _Worker:
+    """Bookkeeping of a pool worker process and the job it is running, from the main process side."""
+
+    def __init__(self, process: BaseProcess, connection: Connection) -> None:
+        self.process = process
+        self.connection = connection
+        self.ready: bool = False
+        self.job: int | None = None  # index of the running job
+        self.timeout: float | None = None
+        self.deadline: float | None = None
+
+    @property
+    def handles(self) -> list:
+        return [self.connection, self.process.sentinel]
+
+    def dispatch(self, index: int, func: Callable, item: Any, timeout: float | None) -> None:
+        self.connection.send((index, func, item))
+        self.job, self.timeout = index, timeout
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def stop(self, force: bool = False) -> None:
+        if not force and self.process.is_alive():
+            try:
+                self.connection.send(None)  # asks the worker to quit MAD-X and exit
+                self.process.join(timeout=10)
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+        self.job, self.deadline = None, None
+
+
+# ----- Worker Process ----- #
+
+
+def _check_ready_message(message: tuple) -> None:
+    """Raises if the first message of a worker reports a setup failure."""
+    if message[0] == "setup_error":
+        raise WorkerSetupError(message[1])
+
+
+def _worker_main(setup: Callable[[], Madx], connection: Connection) -> None:
+    """
+    Entry point of worker processes: sets up the `~cpymad.madx.Madx` instance then
+    runs received jobs until told to stop. Exits if ``MAD-X`` stops working, so that
+    the worker is restarted by the pool.
+    """
+    try:
+        madx = setup()
+    except Exception:  # noqa: BLE001
+        connection.send(("setup_error", traceback.format_exc()))
+        return
+    connection.send(("ready", None))
+
+    try:
+        for message in iter(connection.recv, None):
+            index, func, item = message
+            try:
+                outcome = ("result", index, True, func(madx, item))
+            except Exception as error:  # noqa: BLE001
+                error.add_note(traceback.format_exc())
+                outcome = ("result", index, False, error)
+            _send_result(connection, outcome)
+            if not madx:  # MAD-X stopped working, exit and let the pool restart us
+                return
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        madx.quit()
+
+
+def _send_result(connection: Connection, message: tuple) -> None:
+    """Sends the result message, replacing the job's outcome by an error if it can not be pickled."""
+    try:
+        connection.send(message)
+    except Exception as error:  # noqa: BLE001
+        _, index, _, _ = message
+        failure = RuntimeError(f"The outcome of job #{index} could not be sent back: {error!r}")
+        connection.send(("result", index, False, failure))
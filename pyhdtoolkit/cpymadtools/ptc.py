@@ -5,27 +5,81 @@ PTC Routines
 ------------
 
 Module with functions to manipulate ``MAD-X`` ``PTC`` functionality
-through a `~cpymad.madx.Madx` object.
+through a `~cpymad.madx.Madx` object. Each function creates and ends its
+own ``PTC`` universe, while a `~.cpymadtools.ptc.PTCSession` shares one
+universe between several calculations on the same machine.
 """
 
 from __future__ import annotations
 
+import multiprocessing
+import tempfile
+from functools import partial
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple, Self
 
+import numpy as np
+import pandas as pd
 import tfs
 from loguru import logger
 
-from pyhdtoolkit.cpymadtools.utils import get_table_tfs
+from pyhdtoolkit.cpymadtools.pool import MadxPool
+from pyhdtoolkit.cpymadtools.track import (
+    COORDINATES,
+    TrackedParticles,
+    _tracked_particles_from_tables,
+    _tracking_pool,
+    _validate_tracking_inputs,
+)
+from pyhdtoolkit.cpymadtools.utils import get_table_tfs, load_madx_machine, save_madx_errors, save_madx_machine
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Mapping, Sequence
 
-    import pandas as pd
     from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
 
 _MAX_PTC_AMPDET_ORDER: int = 2
 _MIN_PTC_AMPDET_ORDER: int = 1
+_PTC_SCAN_QUANTITIES: tuple[str, ...] = ("ampdet", "rdts")
+
+
+class PTCScan(NamedTuple):
+    """
+    .. versionadded:: 1.9.0
+
+    Results of a scan of ``PTC`` calculations over settings of the machine,
+    obtained with `~.cpymadtools.ptc.ptc_scan`, as a dense array with its
+    labelled axes.
+
+    Attributes
+    ----------
+    results : numpy.ndarray
+        A `float` array of shape ``(n_settings, n_elements, n_terms)`` with the
+        value of each term at each element, for each setting.
+    settings : dict[str, numpy.ndarray]
+        The value of each scanned global variable, as an array of shape
+        ``(n_settings,)``.
+    elements : numpy.ndarray
+        The names of the elements, of shape ``(n_elements,)``. For amplitude
+        detuning, which is a one-turn quantity, this holds only the name of
+        the sequence.
+    terms : numpy.ndarray
+        The names of the terms, of shape ``(n_terms,)``. For amplitude detuning,
+        these are the ``NAME`` of each entry of the ``normal_results`` table and
+        its orders, for instance ``ANHX_1_0_0_0`` for :math:`dQ_x / d\\epsilon_x`.
+        For RDTs, these are the ``GNF*`` columns of the ``twissrdt`` table, for
+        instance ``GNFA_3_0_0_0_0_0``.
+    """
+
+    results: np.ndarray
+    settings: dict[str, np.ndarray]
+    elements: np.ndarray
+    terms: np.ndarray
+
+    def get(self, term: str) -> np.ndarray:
+        """Values of the given *term*, as an array of shape ``(n_settings, n_elements)``."""
+        return self.results[:, :, list(self.terms).index(term)]
 
 
 def get_amplitude_detuning(
@@ -98,75 +152,22 @@ def get_amplitude_detuning(
                 madx, order=3, model=3, exact=True, icase=5, no=6
             )
     """
-    if order > _MAX_PTC_AMPDET_ORDER:
-        logger.error(f"Maximum amplitude detuning order in PTC is 2, but {order:d} was requested")
-        msg = "PTC amplitude detuning is not implemented for order > 2"
-        raise NotImplementedError(msg)
-
+    _check_amplitude_detuning_order(order)
     logger.debug("Looking for PTC universe parameters in keyword arguments")
-    model = kwargs.pop("model", 3)
-    method = kwargs.pop("method", 4)
-    nst = kwargs.pop("nst", 3)
-    exact = kwargs.pop("exact", True)
-
-    logger.debug("Looking for PTC_NORMAL parameters in keyword arguments")
-    icase = kwargs.pop("icase", 6)
-    no = kwargs.pop("no", 5)
-    closed_orbit = kwargs.pop("closed_orbit", True)
-    normal = kwargs.pop("normal", True)
-
-    logger.debug("Creating PTC universe")
-    madx.ptc_create_universe()
-
-    logger.trace("Creating PTC layout")
-    madx.ptc_create_layout(model=model, method=method, nst=nst, exact=exact)
-
-    logger.trace("Incorporating MAD-X alignment errors")
-    madx.ptc_align()  # use madx alignment errors
-    madx.ptc_setswitch(fringe=fringe)
-
-    logger.trace("Selecting tune orders")
-    madx.select_ptc_normal(q1="0", q2="0")
-    for ii in range(1, order + 1):  # These are d^iQ/ddp^i
-        madx.select_ptc_normal(dq1=f"{ii:d}", dq2=f"{ii:d}")
-
-    # ANH = anharmonicities (ex, ey, deltap), works only with parameters as full strings
-    # could be done nicer with permutations ...
-    logger.trace("Selecting anharmonicities")
-    if order >= _MIN_PTC_AMPDET_ORDER:
-        # madx.select_ptc_normal('anhx=0, 0, 1')  # dQx/ddp
-        # madx.select_ptc_normal('anhy=0, 0, 1')  # dQy/ddp
-        madx.select_ptc_normal("anhx=1, 0, 0")  # dQx/dex
-        madx.select_ptc_normal("anhx=0, 1, 0")  # dQx/dey
-        madx.select_ptc_normal("anhy=1, 0, 0")  # dQy/dex
-        madx.select_ptc_normal("anhy=0, 1, 0")  # dQy/dey
-
-    if order >= _MAX_PTC_AMPDET_ORDER:
-        # madx.select_ptc_normal('anhx=0, 0, 2')  # d^2Qx/ddp^2
-        # madx.select_ptc_normal('anhy=0, 0, 2')  # d^2Qy/ddp^2
-        madx.select_ptc_normal("anhx=2, 0, 0")  # d^2Qx/dex^2
-        madx.select_ptc_normal("anhx=1, 1, 0")  # d^2Qx/dexdey
-        madx.select_ptc_normal("anhx=0, 2, 0")  # d^2Qx/dey^2
-        madx.select_ptc_normal("anhy=2, 0, 0")  # d^2Qy/dex^2
-        madx.select_ptc_normal("anhy=1, 1, 0")  # d^2Qy/dexdey
-        madx.select_ptc_normal("anhy=0, 2, 0")  # d^2Qy/dey^2
-
-    logger.debug("Executing PTC Normal")
-    madx.ptc_normal(icase=icase, no=no, closed_orbit=closed_orbit, normal=normal, **kwargs)
-    madx.ptc_end()
-
-    dframe = get_table_tfs(madx, table_name="normal_results")
-    dframe.index = range(len(dframe.NAME))  # table has a weird index
-
-    if file is not None:
-        logger.debug(f"Exporting results to disk at '{Path(file).absolute()}'")
-        tfs.write(file, dframe)
-
-    return dframe
+    layout = _pop_layout_parameters(kwargs)
+    with PTCSession(madx, fringe=fringe, **layout) as session:
+        return session.get_amplitude_detuning(order=order, file=file, **kwargs)
 
 
 def get_rdts(
-    madx: Madx, /, order: int = 4, file: Path | str | None = None, fringe: bool = False, **kwargs
+    madx: Madx,
+    /,
+    order: int = 4,
+    file: Path | str | None = None,
+    fringe: bool = False,
+    *,
+    as_complex: bool = False,
+    **kwargs,
 ) -> tfs.TfsDataFrame:
     """
     .. versionadded:: 0.7.0
@@ -206,6 +207,13 @@ def get_rdts(
     fringe : bool
         Boolean flag to include fringe field effects in the calculation.
         Defaults to `False`.
+    as_complex : bool
+        If `True`, the RDTs are returned as complex columns named after their
+        indices, such as ``F1001``, instead of the separate amplitude, cosine
+        and sine columns of ``PTC``, see `~.cpymadtools.ptc.rdts_to_complex`.
+        Defaults to `False`. Keyword only.
+
+        .. versionadded:: 1.9.0
     **kwargs
         Some parameters for the ``PTC`` universe creation can be given as
         keyword arguments. They are `model`, `method`, `nst` and `exact`
@@ -225,6 +233,13 @@ def get_rdts(
 
             rdts_df = get_rdts(madx, order=3, fringe=True)
 
+        The RDTs can be obtained directly as complex columns indexed by element:
+
+        .. code-block:: python
+
+            rdts_df = get_rdts(madx, order=2, as_complex=True)
+            f1001 = rdts_df.F1001  # complex128 Series
+
         One can also specify parameters for the ``PTC`` universe and the
         ``PTC_TWISS`` command:
 
@@ -235,36 +250,53 @@ def get_rdts(
             )
     """
     logger.debug("Looking for PTC universe parameters in keyword arguments")
-    model = kwargs.pop("model", 3)
-    method = kwargs.pop("method", 4)
-    nst = kwargs.pop("nst", 3)
-    exact = kwargs.pop("exact", True)
-
-    logger.debug("Looking for PTC_TWISS parameters in keyword arguments")
-    icase = kwargs.pop("icase", 6)
-    normal = kwargs.pop("normal", True)
+    layout = _pop_layout_parameters(kwargs)
+    with PTCSession(madx, fringe=fringe, **layout) as session:
+        return session.get_rdts(order=order, file=file, as_complex=as_complex, **kwargs)
 
-    logger.debug("Creating PTC universe")
-    madx.ptc_create_universe()
 
-    logger.trace("Creating PTC layout")
-    madx.ptc_create_layout(model=model, method=method, nst=nst, exact=exact)
+def rdts_to_complex(rdts_dframe: tfs.TfsDataFrame, /) -> tfs.TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
 
-    logger.trace("Incorporating MAD-X alignment errors")
-    madx.ptc_align()  # use madx alignment errors
-    madx.ptc_setswitch(fringe=fringe)
+    Turns the RDTs table from ``PTC``, as returned by `~.cpymadtools.ptc.get_rdts`,
+    into a table of complex RDTs indexed by element name. ``PTC`` gives each RDT
+    :math:`f_{jklmno}` as three columns, its amplitude ``GNFA_j_k_l_m_n_o``, real
+    part ``GNFC_j_k_l_m_n_o`` and imaginary part ``GNFS_j_k_l_m_n_o``, which are
+    combined here into a single ``complex128`` column. Columns are named after the
+    transverse indices, as ``F1001`` for :math:`f_{1001}`, and the longitudinal
+    indices are only appended when not zero, as ``F100010`` for :math:`f_{100010}`.
+    The conversion is done on the whole arrays at once.
 
-    logger.debug("Executing PTC Twiss")
-    madx.ptc_twiss(icase=icase, no=order, normal=normal, trackrdts=True, **kwargs)
-    madx.ptc_end()
+    Parameters
+    ----------
+    rdts_dframe : tfs.TfsDataFrame
+        The RDTs table from ``PTC``, with a ``NAME`` column and the ``GNFC_*``
+        and ``GNFS_*`` columns of the RDTs. Positional only.
 
-    dframe = get_table_tfs(madx, table_name="twissrdt", headers_table="ptc_twiss_summary")
+    Returns
+    -------
+    tfs.TfsDataFrame
+        A `~tfs.frame.TfsDataFrame` indexed by the ``NAME`` of the elements,
+        with a ``complex128`` column for each RDT and the same headers as the
+        provided table.
 
-    if file is not None:
-        logger.debug(f"Exporting results to disk at '{Path(file).absolute()}'")
-        tfs.write(file, dframe)
+    Example
+    -------
+        .. code-block:: python
 
-    return dframe
+            rdts_df = rdts_to_complex(get_rdts(madx, order=2))
+            coupling = rdts_df[["F1001", "F1010"]]
+    """
+    indices = sorted(column.removeprefix("GNFC_") for column in rdts_dframe.columns if column.startswith("GNFC_"))
+    real = rdts_dframe[[f"GNFC_{index}" for index in indices]].to_numpy(dtype=float)
+    imaginary = rdts_dframe[[f"GNFS_{index}" for index in indices]].to_numpy(dtype=float)
+    return tfs.TfsDataFrame(
+        real + 1j * imaginary,
+        index=pd.Index(rdts_dframe.NAME.to_numpy(), name="NAME"),
+        columns=[_complex_rdt_name(index) for index in indices],
+        headers=rdts_dframe.headers,
+    )
 
 
 def ptc_twiss(
@@ -346,36 +378,9 @@ def ptc_twiss(
             )
     """
     logger.debug("Looking for PTC universe parameters in keyword arguments")
-    model = kwargs.pop("model", 3)
-    method = kwargs.pop("method", 4)
-    nst = kwargs.pop("nst", 3)
-    exact = kwargs.pop("exact", True)
-
-    logger.debug("Looking for PTC_TWISS parameters in keyword arguments")
-    icase = kwargs.pop("icase", 6)
-    normal = kwargs.pop("normal", True)
-
-    logger.debug("Creating PTC universe")
-    madx.ptc_create_universe()
-
-    logger.trace("Creating PTC layout")
-    madx.ptc_create_layout(model=model, method=method, nst=nst, exact=exact)
-
-    logger.trace("Incorporating MAD-X alignment errors")
-    madx.ptc_align()  # use madx alignment errors
-    madx.ptc_setswitch(fringe=fringe)
-
-    logger.debug("Executing PTC Twiss")
-    madx.ptc_twiss(icase=icase, no=order, normal=normal, table=table, **kwargs)
-    madx.ptc_end()
-
-    dframe = get_table_tfs(madx, table_name=table, headers_table="ptc_twiss_summary")
-
-    if file is not None:
-        logger.debug(f"Exporting results to disk at '{Path(file).absolute()}'")
-        tfs.write(file, dframe)
-
-    return dframe
+    layout = _pop_layout_parameters(kwargs)
+    with PTCSession(madx, fringe=fringe, **layout) as session:
+        return session.ptc_twiss(order=order, file=file, table=table, **kwargs)
 
 
 def ptc_track_particle(
@@ -486,15 +491,125 @@ def ptc_track_particle(
                 exact=True,
             )
     """
-    logger.debug("Performing single particle PTC (thick) tracking")
-    start = initial_coordinates or [0, 0, 0, 0, 0, 0]
-    observation_points = observation_points or []
+    logger.debug("Looking for PTC universe parameters in keyword arguments")
+    layout = _pop_layout_parameters(kwargs)
+
+    if isinstance(sequence, str):
+        logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
+        logger.debug(f"Using sequence '{sequence}' for tracking")
+        madx.use(sequence=sequence)
+
+    with PTCSession(madx, fringe=fringe, **layout) as session:
+        return session.ptc_track_particle(
+            initial_coordinates, nturns, observation_points=observation_points, onetable=onetable, **kwargs
+        )
+
+
+def ptc_track_particles(
+    madx: Madx,
+    /,
+    initial_coordinates: ArrayLike,
+    nturns: int,
+    *,
+    processes: int | None = None,
+    sequence: str | None = None,
+    observation_points: Sequence[str] | None = None,
+    fringe: bool = False,
+    **kwargs,
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks an ensemble of particles for *nturns* through ``PTC_TRACK``, spreading
+    the particles across worker processes. The state of the machine (the sequence
+    in use, its beam, the global variables and the alignment and field errors of
+    its elements) is saved once with `~.cpymadtools.utils.save_madx_machine` and
+    `~.cpymadtools.utils.save_madx_errors`, and loaded by each worker of a
+    `~.cpymadtools.pool.MadxPool`, which then creates its ``PTC`` universe and
+    layout once. Each worker tracks its share of the particles in a single
+    ``PTC_TRACK`` block, and the results are merged in the original particle order.
+
+    Important
+    ---------
+        The default values used for the ``PTC_CREATE_LAYOUT`` command are: `model=3`
+        (``SixTrack`` model), `method=4` (integration order), `nst=3` (number of
+        integration steps, a.k.a body slices for elements) and `exact=True` (use an
+        exact Hamiltonian, not an approximated one). These can be provided as keyword
+        arguments to override them.
+
+        The ``PTC_TRACK`` command is explicitely given `ELEMENT_BY_ELEMENT=True` by
+        default to force element by element tracking mode. This can also be provided
+        as keyword argument to override it. The `ONETABLE` and `RECLOSS` options are
+        always set as they are used to retrieve the data.
+
+    Warning
+    -------
+        If the *sequence* parameter is given a string value, the ``USE`` command will
+        be ran on the provided sequence name, in the calling process, before saving
+        the machine. This means the caveats of ``USE`` apply, for instance the erasing
+        of previously defined errors, orbits corrections etc. In this case a warning
+        will be logged but the function will proceed.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    initial_coordinates : ArrayLike
+        An array of shape ``(N, 6)`` with the ``X, PX, Y, PY, T, PT`` starting
+        coordinates of each of the *N* particles to track.
+    nturns : int
+        The number of turns to track for.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses the
+        number of CPUs of the machine. No more workers than particles are
+        started. Keyword only.
+    sequence : str, optional
+        The sequence to use for tracking. If no value is provided, the sequence
+        in use is tracked. Beware of the dangers of giving a sequence that will be
+        ``use``-d by ``MAD-X``, see the warning above for more information.
+        Keyword only.
+    observation_points : Sequence[str], optional
+        A sequence of element names at which to ``PTC_OBSERVE`` during the tracking.
+        Each element should be observed only once. Keyword only.
+    fringe : bool
+        Boolean flag to include fringe field effects in the calculation. Defaults
+        to `False`. Keyword only.
+    **kwargs
+        Some parameters for the ``PTC`` universe creation can be given as
+        keyword arguments. They are `model`, `method`, `nst` and `exact`
+        (case sensitive). Similarly `element_by_element` can be given (case
+        sensitively) for the ``PTC_TRACK`` command. Any remaining keyword
+        argument is transmitted to the ``PTC_TRACK`` command, such as the
+        `closed_orbit` flag to activate closed orbit calculation before any
+        tracking. Refer to the `MAD-X manual
+        <http://madx.web.cern.ch/madx/releases/last-rel/madxuguide.pdf>`_
+        for options.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple with the turn-by-turn
+        coordinates array of shape ``(n_obs, N, nturns + 1, 6)`` and the turn at
+        which each particle was lost. See its documentation for details.
+
+    Example
+    -------
+        .. code-block:: python
+
+            initial_coordinates = np.zeros((1000, 6))
+            initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 1000)
+            tracks = ptc_track_particles(madx, initial_coordinates, nturns=1000, processes=16)
+            x_at_start = tracks.coordinates[0, :, :, 0]  # shape (1000, 1001)
+    """
+    initial_coordinates, observation_points = _validate_tracking_inputs(initial_coordinates, observation_points)
+    nparticles = len(initial_coordinates)
+    processes = min(multiprocessing.cpu_count() if processes is None else processes, nparticles)
+    logger.debug(
+        f"Performing PTC (thick) tracking of {nparticles} particles for {nturns} turns on {processes} processes"
+    )
 
     logger.debug("Looking for PTC universe parameters in keyword arguments")
-    model = kwargs.pop("model", 3)
-    method = kwargs.pop("method", 4)
-    nst = kwargs.pop("nst", 3)
-    exact = kwargs.pop("exact", True)
+    layout = _pop_layout_parameters(kwargs)
 
     logger.debug("Looking for PTC_TRACK parameters in keyword arguments")
     element_by_element = kwargs.pop("element_by_element", True)
@@ -503,32 +618,591 @@ def ptc_track_particle(
         logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
         logger.debug(f"Using sequence '{sequence}' for tracking")
         madx.use(sequence=sequence)
+    sequence_name = madx._libmadx.get_active_sequence_name()  # noqa: SLF001
+
+    with tempfile.TemporaryDirectory(prefix="pyhdtoolkit_ptc_") as temporary_directory:
+        machine_file = Path(temporary_directory) / "machine.madx"
+        errors_file = Path(temporary_directory) / "errors.madx"
+        logger.debug("Saving the machine state for the tracking workers")
+        save_madx_machine(madx, machine_file, sequences=[sequence_name])
+        save_madx_errors(madx, errors_file)
+
+        setup = partial(
+            _ptc_tracking_worker_setup, machine_file, errors_file, sequence_name, observation_points, fringe, **layout
+        )
+        job = partial(
+            _ptc_track_block,
+            nturns=nturns,
+            observation_points=observation_points,
+            element_by_element=element_by_element,
+            **kwargs,
+        )
+        with MadxPool(setup, processes=processes) as pool:
+            blocks = pool.map(job, np.array_split(initial_coordinates, processes))
+
+    logger.debug("Merging tracking results from workers")
+    return TrackedParticles(
+        coordinates=np.concatenate([block.coordinates for block in blocks], axis=1),
+        lost_turn=np.concatenate([block.lost_turn for block in blocks]),
+    )
+
+
+def ptc_scan(
+    madx: Madx,
+    /,
+    settings: Mapping[str, ArrayLike],
+    quantity: str = "ampdet",
+    *,
+    order: int | None = None,
+    processes: int | None = None,
+    fringe: bool = False,
+    **kwargs,
+) -> PTCScan:
+    """
+    .. versionadded:: 1.9.0
+
+    Runs a ``PTC`` calculation, either the amplitude detuning as with
+    `~.cpymadtools.ptc.get_amplitude_detuning` or the RDTs as with
+    `~.cpymadtools.ptc.get_rdts`, for each of the given settings of ``MAD-X``
+    global variables, such as octupole or sextupole knobs. The settings are
+    spread across worker processes of a `~.cpymadtools.pool.MadxPool`, each
+    loading the state of the machine once (see `~.cpymadtools.track.track_particles_parallel`)
+    and running each of its settings in a fresh `~.cpymadtools.ptc.PTCSession`,
+    as the ``PTC`` universe has to be rebuilt when the strengths change. The
+    results are gathered in a single dense array rather than a table per setting.
+
+    Note
+    ----
+        The given `~cpymad.madx.Madx` instance is not modified: the settings are
+        only applied in the workers.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object, with the sequence to use
+        already in use. Positional only.
+    settings : Mapping[str, ArrayLike]
+        A mapping of global variable names to the values they take at each
+        setting, all of the same length. To scan a full grid of several knobs,
+        flatten the outputs of `numpy.meshgrid`.
+    quantity : str
+        The quantity to compute, either ``ampdet`` for the amplitude detuning
+        through ``PTC_NORMAL``, or ``rdts`` for the RDTs through ``PTC_TWISS``.
+        Defaults to ``ampdet``.
+    order : int, optional
+        The order of the calculation. Defaults to `None`, which uses the default
+        of the corresponding function: 2 for amplitude detuning and 4 for RDTs.
+        Keyword only.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses the number
+        of CPUs of the machine. No more workers than settings are started.
+        Keyword only.
+    fringe : bool
+        Boolean flag to include fringe field effects in the calculation. Defaults
+        to `False`. Keyword only.
+    **kwargs
+        The `model`, `method`, `nst` and `exact` parameters for the ``PTC`` universe
+        creation can be given (case sensitively). Any remaining keyword argument is
+        given to the `~.cpymadtools.ptc.PTCSession.get_amplitude_detuning` or
+        `~.cpymadtools.ptc.PTCSession.get_rdts` methods.
+
+    Returns
+    -------
+    PTCScan
+        A `~.cpymadtools.ptc.PTCScan` tuple with the array of shape
+        ``(n_settings, n_elements, n_terms)`` of the results and its labels.
+
+    Example
+    -------
+        .. code-block:: python
+
+            knobs = np.meshgrid(np.linspace(-20, 20, 9), np.linspace(-20, 20, 9))
+            settings = {"kof.a23b1": knobs[0].ravel(), "kod.a23b1": knobs[1].ravel()}
+            scan = ptc_scan(madx, settings, quantity="ampdet", processes=16)
+            dqx_dex = scan.get("ANHX_1_0_0_0")[:, 0]  # shape (81,)
+    """
+    if quantity not in _PTC_SCAN_QUANTITIES:
+        logger.error(f"Invalid PTC scan quantity '{quantity}', options are {_PTC_SCAN_QUANTITIES}")
+        msg = "Invalid 'quantity' parameter"
+        raise ValueError(msg)
+    if quantity == "ampdet" and order is not None:
+        _check_amplitude_detuning_order(order)
+
+    settings = {name: np.atleast_1d(np.asarray(values, dtype=float)) for name, values in settings.items()}
+    lengths = {len(values) for values in settings.values()}
+    if len(lengths) != 1:
+        logger.error(f"All settings should have the same number of values, got {lengths or 'no settings'}")
+        msg = "Invalid 'settings' parameter"
+        raise ValueError(msg)
+    nsettings = lengths.pop()
+    processes = min(multiprocessing.cpu_count() if processes is None else processes, nsettings)
+    logger.debug(f"Running PTC {quantity} calculations for {nsettings} settings on {processes} processes")
+
+    logger.debug("Looking for PTC universe parameters in keyword arguments")
+    layout = _pop_layout_parameters(kwargs)
+    job = partial(_ptc_scan_job, quantity=quantity, order=order, fringe=fringe, layout=layout, **kwargs)
+    points = [{name: float(values[index]) for name, values in settings.items()} for index in range(nsettings)]
+    with _tracking_pool(madx, processes) as pool:
+        results = pool.map(job, points)
+
+    logger.debug("Merging PTC results from workers")
+    _, elements, terms = results[0]
+    return PTCScan(
+        results=np.stack([values for values, _, _ in results]), settings=settings, elements=elements, terms=terms
+    )
+
+
+class PTCSession:
+    """
+    .. versionadded:: 1.9.0
+
+    A context manager sharing a single ``PTC`` universe between several
+    calculations on the same machine. The universe and layout are created,
+    and ``MAD-X`` alignment errors incorporated, once when entering the
+    context, and ``PTC_END`` is called once when leaving it. Its methods
+    are the equivalent of the functions of this module, without the
+    universe creation and teardown: when a workflow needs for instance
+    amplitude detuning, RDTs and twiss on the same machine, the layout is
+    built only once.
+
+    Important
+    ---------
+        The default values used for the ``PTC_CREATE_LAYOUT`` command are: `model=3`
+        (``SixTrack`` model), `method=4` (integration order), `nst=3` (number of
+        integration steps, a.k.a body slices for elements) and `exact=True` (use an
+        exact Hamiltonian, not an approximated one), as for the functions of this
+        module.
+
+    Warning
+    -------
+        The ``PTC`` universe is built from the state of the machine when entering
+        the context. Changes made to the machine while the session is active, such
+        as new errors or knob values, are not seen by ``PTC`` until a new session
+        is started.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object, with the sequence to
+        use already in use. Positional only.
+    fringe : bool
+        Boolean flag to include fringe field effects in the calculations.
+        Defaults to `False`.
+    model : int
+        The ``PTC`` model to use. Defaults to 3. Keyword only.
+    method : int
+        The integration order. Defaults to 4. Keyword only.
+    nst : int
+        The number of integration steps. Defaults to 3. Keyword only.
+    exact : bool
+        Whether to use an exact Hamiltonian. Defaults to `True`. Keyword only.
+
+    Example
+    -------
+        .. code-block:: python
+
+            with PTCSession(madx, fringe=True) as session:
+                ampdet_df = session.get_amplitude_detuning(order=2)
+                rdts_df = session.get_rdts(order=3)
+                twiss_df = session.ptc_twiss()
+    """
+
+    def __init__(
+        self, madx: Madx, /, fringe: bool = False, *, model: int = 3, method: int = 4, nst: int = 3, exact: bool = True
+    ) -> None:
+        self.madx = madx
+        self.fringe = fringe
+        self.layout: dict = {"model": model, "method": method, "nst": nst, "exact": exact}
+        self._active: bool = False
+
+    def __enter__(self) -> Self:
+        _create_ptc_universe(self.madx, fringe=self.fringe, **self.layout)
+        self._active = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        logger.debug("Ending PTC session")
+        self._active = False
+        self.madx.ptc_end()
+
+    def get_amplitude_detuning(self, order: int = 2, file: Path | str | None = None, **kwargs) -> tfs.TfsDataFrame:
+        """
+        .. versionadded:: 1.9.0
+
+        Calculates amplitude detuning coefficients via ``PTC_NORMAL`` in the
+        session's universe, see `~.cpymadtools.ptc.get_amplitude_detuning`. The
+        selections of previous calls are cleared first.
+
+        Parameters
+        ----------
+        order : int
+            Maximum derivative order coefficient (only 0, 1 or 2 are
+            implemented in ``PTC``). Defaults to 2.
+        file : Path | str, optional
+            Path to output file. Defaults to `None`, which will skip writing
+            the resulting table to disk.
+        **kwargs
+            The `icase`, `no`, `closed_orbit` and `normal` parameters of the
+            ``PTC_NORMAL`` command can be given (case sensitively), and any
+            remaining keyword argument is transmitted to it as given.
+
+        Returns
+        -------
+        tfs.TfsDataFrame
+            A `~tfs.frame.TfsDataFrame` with the calculated coefficients, and
+            the ``SUMM`` table as headers.
+        """
+        self._check_active()
+        _check_amplitude_detuning_order(order)
+
+        logger.debug("Looking for PTC_NORMAL parameters in keyword arguments")
+        icase = kwargs.pop("icase", 6)
+        no = kwargs.pop("no", 5)
+        closed_orbit = kwargs.pop("closed_orbit", True)
+        normal = kwargs.pop("normal", True)
+
+        if "normal_results" in self.madx.table:  # selections are rows of this table
+            logger.trace("Clearing previous PTC_NORMAL selections")
+            self.madx.input("delete, table=normal_results;")
+
+        logger.trace("Selecting tune orders")
+        self.madx.select_ptc_normal(q1="0", q2="0")
+        for ii in range(1, order + 1):  # These are d^iQ/ddp^i
+            self.madx.select_ptc_normal(dq1=f"{ii:d}", dq2=f"{ii:d}")
+
+        # ANH = anharmonicities (ex, ey, deltap), works only with parameters as full strings
+        # could be done nicer with permutations ...
+        logger.trace("Selecting anharmonicities")
+        if order >= _MIN_PTC_AMPDET_ORDER:
+            # self.madx.select_ptc_normal('anhx=0, 0, 1')  # dQx/ddp
+            # self.madx.select_ptc_normal('anhy=0, 0, 1')  # dQy/ddp
+            self.madx.select_ptc_normal("anhx=1, 0, 0")  # dQx/dex
+            self.madx.select_ptc_normal("anhx=0, 1, 0")  # dQx/dey
+            self.madx.select_ptc_normal("anhy=1, 0, 0")  # dQy/dex
+            self.madx.select_ptc_normal("anhy=0, 1, 0")  # dQy/dey
+
+        if order >= _MAX_PTC_AMPDET_ORDER:
+            # self.madx.select_ptc_normal('anhx=0, 0, 2')  # d^2Qx/ddp^2
+            # self.madx.select_ptc_normal('anhy=0, 0, 2')  # d^2Qy/ddp^2
+            self.madx.select_ptc_normal("anhx=2, 0, 0")  # d^2Qx/dex^2
+            self.madx.select_ptc_normal("anhx=1, 1, 0")  # d^2Qx/dexdey
+            self.madx.select_ptc_normal("anhx=0, 2, 0")  # d^2Qx/dey^2
+            self.madx.select_ptc_normal("anhy=2, 0, 0")  # d^2Qy/dex^2
+            self.madx.select_ptc_normal("anhy=1, 1, 0")  # d^2Qy/dexdey
+            self.madx.select_ptc_normal("anhy=0, 2, 0")  # d^2Qy/dey^2
+
+        logger.debug("Executing PTC Normal")
+        self.madx.ptc_normal(icase=icase, no=no, closed_orbit=closed_orbit, normal=normal, **kwargs)
+
+        dframe = get_table_tfs(self.madx, table_name="normal_results")
+        dframe.index = range(len(dframe.NAME))  # table has a weird index
+        _maybe_write(dframe, file)
+        return dframe
+
+    def get_rdts(
+        self, order: int = 4, file: Path | str | None = None, *, as_complex: bool = False, **kwargs
+    ) -> tfs.TfsDataFrame:
+        """
+        .. versionadded:: 1.9.0
+
+        Calculates the resonance driving terms up to *order* via ``PTC_TWISS``
+        in the session's universe, see `~.cpymadtools.ptc.get_rdts`.
+
+        Parameters
+        ----------
+        order : int
+            Maximum order of the RDTs. Defaults to 4.
+        file : Path | str, optional
+            Path to output file. Defaults to `None`, which will skip writing
+            the resulting table to disk.
+        as_complex : bool
+            If `True`, returns the RDTs as complex columns indexed by element,
+            see `~.cpymadtools.ptc.rdts_to_complex`. Defaults to `False`.
+            Keyword only.
+        **kwargs
+            The `icase` and `normal` parameters of the ``PTC_TWISS`` command can
+            be given (case sensitively), and any remaining keyword argument is
+            transmitted to it as given.
+
+        Returns
+        -------
+        tfs.TfsDataFrame
+            A `~tfs.frame.TfsDataFrame` with the calculated RDTs, and the
+            ``PTC_TWISS_SUMMARY`` table as headers.
+        """
+        self._check_active()
+        logger.debug("Looking for PTC_TWISS parameters in keyword arguments")
+        icase = kwargs.pop("icase", 6)
+        normal = kwargs.pop("normal", True)
+
+        logger.debug("Executing PTC Twiss")
+        self.madx.ptc_twiss(icase=icase, no=order, normal=normal, trackrdts=True, **kwargs)
+
+        dframe = get_table_tfs(self.madx, table_name="twissrdt", headers_table="ptc_twiss_summary")
+        if as_complex:
+            dframe = rdts_to_complex(dframe)
+        _maybe_write(dframe, file)
+        return dframe
+
+    def ptc_twiss(
+        self, order: int = 4, file: Path | str | None = None, table: str = "ptc_twiss", **kwargs
+    ) -> tfs.TfsDataFrame:
+        """
+        .. versionadded:: 1.9.0
+
+        Calculates the ``TWISS`` parameters via ``PTC_TWISS`` in the session's
+        universe, see `~.cpymadtools.ptc.ptc_twiss`.
+
+        Parameters
+        ----------
+        order : int
+            Map order for the calculation. Defaults to 4.
+        file : Path | str, optional
+            Path to output file. Defaults to `None`, which will skip writing
+            the resulting table to disk.
+        table : str
+            The name of the internal table to store results in. Defaults to
+            ``ptc_twiss``.
+        **kwargs
+            The `icase` and `normal` parameters of the ``PTC_TWISS`` command can
+            be given (case sensitively), and any remaining keyword argument is
+            transmitted to it as given.
+
+        Returns
+        -------
+        tfs.TfsDataFrame
+            A `~tfs.frame.TfsDataFrame` with the calculated ``TWISS`` parameters,
+            and the ``PTC_TWISS_SUMMARY`` table as headers.
+        """
+        self._check_active()
+        logger.debug("Looking for PTC_TWISS parameters in keyword arguments")
+        icase = kwargs.pop("icase", 6)
+        normal = kwargs.pop("normal", True)
+
+        logger.debug("Executing PTC Twiss")
+        self.madx.ptc_twiss(icase=icase, no=order, normal=normal, table=table, **kwargs)
+
+        dframe = get_table_tfs(self.madx, table_name=table, headers_table="ptc_twiss_summary")
+        _maybe_write(dframe, file)
+        return dframe
+
+    def ptc_track_particle(
+        self,
+        initial_coordinates: tuple[float, float, float, float, float, float],
+        nturns: int,
+        observation_points: Sequence[str] | None = None,
+        onetable: bool = False,
+        **kwargs,
+    ) -> dict[str, pd.DataFrame]:
+        """
+        .. versionadded:: 1.9.0
+
+        Tracks a single particle for *nturns* through ``PTC_TRACK`` in the session's
+        universe, see `~.cpymadtools.ptc.ptc_track_particle`. The starting coordinates
+        and observation points are cleared with ``PTC_TRACK_END`` after tracking.
+
+        Parameters
+        ----------
+        initial_coordinates : tuple[float, float, float, float, float, float]
+            A tuple with the ``X, PX, Y, PY, T, PT`` starting coordinates of the
+            particle to track. Defaults to all 0 if `None` given.
+        nturns : int
+            The number of turns to track for.
+        observation_points : Sequence[str], optional
+            A sequence of element names at which to ``OBSERVE`` during the tracking.
+        onetable : bool
+            Flag to combine all observation points data into a single table. Defaults
+            to `False`.
+        **kwargs
+            The `element_by_element` parameter of the ``PTC_TRACK`` command can be
+            given (case sensitively), and any remaining keyword argument is transmitted
+            to it as given.
+
+        Returns
+        -------
+        dict[str, pd.DataFrame]
+            A `dict` with a copy of the track table's dataframe for each observation
+            point, or only the ``trackone`` table if *onetable* is set. See
+            `~.cpymadtools.ptc.ptc_track_particle` for details.
+        """
+        self._check_active()
+        logger.debug("Performing single particle PTC (thick) tracking")
+        start = initial_coordinates or [0, 0, 0, 0, 0, 0]
+        observation_points = observation_points or []
+
+        logger.debug("Looking for PTC_TRACK parameters in keyword arguments")
+        element_by_element = kwargs.pop("element_by_element", True)
+
+        logger.debug(f"Tracking coordinates with initial X, PX, Y, PY, T, PT of '{initial_coordinates}'")
+        self.madx.command.ptc_start(X=start[0], PX=start[1], Y=start[2], PY=start[3], T=start[4], PT=start[5])
+
+        for element in observation_points:
+            logger.trace(f"Setting observation point for tracking with OBSERVE at element '{element}'")
+            self.madx.command.ptc_observe(place=element)
+
+        self.madx.command.ptc_track(turns=nturns, element_by_element=element_by_element, onetable=onetable, **kwargs)
+        self.madx.command.ptc_track_end()
+
+        if onetable:  # there will only be one table 'trackone' given back by MAD-X
+            logger.debug("Because of option ONETABLE only one table 'TRACKONE' exists to be returned.")
+            return {"trackone": self.madx.table.trackone.dframe()}
+        return {
+            f"observation_point_{point:d}": self.madx.table[f"track.obs{point:04d}.p0001"].dframe()
+            for point in range(1, len(observation_points) + 2)  # len(observation_points) + 1 for start of
+            # machine + 1 because MAD-X starts indexing these at 1
+        }
+
+    def _check_active(self) -> None:
+        """Raises if the session's universe has not been created, or has been ended."""
+        if not self._active:
+            logger.error("The PTC session should be used as a context manager, in a 'with' statement")
+            msg = "PTC session is not active"
+            raise RuntimeError(msg)
+
+
+# ----- Helpers ----- #
+
+
+def _pop_layout_parameters(kwargs: dict) -> dict:
+    """
+    .. versionadded:: 1.9.0
+
+    Pops the ``PTC_CREATE_LAYOUT`` parameters `model`, `method`, `nst` and `exact`
+    from the given keyword arguments, with the defaults of this module.
+    """
+    return {
+        "model": kwargs.pop("model", 3),
+        "method": kwargs.pop("method", 4),
+        "nst": kwargs.pop("nst", 3),
+        "exact": kwargs.pop("exact", True),
+    }
 
+
+def _create_ptc_universe(madx: Madx, /, fringe: bool, **layout) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Creates the ``PTC`` universe and layout with the given parameters, incorporates
+    the ``MAD-X`` alignment errors and sets the fringe fields switch.
+    """
     logger.debug("Creating PTC universe")
     madx.ptc_create_universe()
 
     logger.trace("Creating PTC layout")
-    madx.ptc_create_layout(model=model, method=method, nst=nst, exact=exact)
+    madx.ptc_create_layout(**layout)
 
     logger.trace("Incorporating MAD-X alignment errors")
     madx.ptc_align()  # use madx alignment errors
     madx.ptc_setswitch(fringe=fringe)
 
-    logger.debug(f"Tracking coordinates with initial X, PX, Y, PY, T, PT of '{initial_coordinates}'")
-    madx.command.ptc_start(X=start[0], PX=start[1], Y=start[2], PY=start[3], T=start[4], PT=start[5])
 
+def _check_amplitude_detuning_order(order: int) -> None:
+    """Raises if amplitude detuning is requested at an order not implemented in ``PTC``."""
+    if order > _MAX_PTC_AMPDET_ORDER:
+        logger.error(f"Maximum amplitude detuning order in PTC is 2, but {order:d} was requested")
+        msg = "PTC amplitude detuning is not implemented for order > 2"
+        raise NotImplementedError(msg)
+
+
+def _maybe_write(dframe: tfs.TfsDataFrame, file: Path | str | None) -> None:
+    """Writes the given table to *file*, if provided, with its index if it is named."""
+    if file is not None:
+        logger.debug(f"Exporting results to disk at '{Path(file).absolute()}'")
+        tfs.write(file, dframe, save_index=dframe.index.name or False)
+
+
+def _complex_rdt_name(index: str) -> str:
+    """Name of the complex RDT column for the 'j_k_l_m_n_o' indices of a PTC column, e.g. 'F1001'."""
+    indices = index.split("_")
+    longitudinal = indices[4:] if any(int(value) for value in indices[4:]) else []
+    return "F" + "".join(indices[:4] + longitudinal)
+
+
+def _ptc_scan_job(
+    madx: Madx,
+    /,
+    setting: dict[str, float],
+    *,
+    quantity: str,
+    order: int | None,
+    fringe: bool,
+    layout: dict,
+    **kwargs,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Job of the workers of `~.cpymadtools.ptc.ptc_scan`: applies the given setting of
+    global variables and runs the calculation in a fresh `~.cpymadtools.ptc.PTCSession`.
+    Returns the ``(n_elements, n_terms)`` array of the results, and the names of the
+    elements and terms.
+    """
+    for name, value in setting.items():
+        madx.globals[name] = value
+    if quantity == "ampdet":  # the results take the SUMM table as headers, which the workers do not have
+        madx.command.twiss()
+
+    with PTCSession(madx, fringe=fringe, **layout) as session:
+        if quantity == "ampdet":
+            dframe = session.get_amplitude_detuning(order=order or _MAX_PTC_AMPDET_ORDER, **kwargs)
+            orders = dframe.filter(regex=r"^ORDER\d$").to_numpy(dtype=int).astype(str)
+            terms = ["_".join([name, *term_orders]) for name, term_orders in zip(dframe.NAME, orders)]
+            sequence = madx._libmadx.get_active_sequence_name()  # noqa: SLF001
+            return dframe.VALUE.to_numpy(dtype=float)[np.newaxis], np.array([sequence]), np.array(terms)
+
+        dframe = session.get_rdts(order=order or 4, **kwargs)
+        # PTC does not always give the terms in the same order, sorting them lets results be stacked
+        columns = sorted(column for column in dframe.columns if column.startswith("GNF"))
+        return dframe[columns].to_numpy(dtype=float), dframe.NAME.to_numpy(dtype=str), np.array(columns)
+
+
+def _ptc_tracking_worker_setup(
+    machine_file: Path,
+    errors_file: Path,
+    sequence: str,
+    observation_points: Sequence[str],
+    fringe: bool,
+    **layout,
+) -> Madx:
+    """
+    .. versionadded:: 1.9.0
+
+    Setup of the workers of `~.cpymadtools.ptc.ptc_track_particles`: loads the saved
+    machine and errors, then creates the ``PTC`` universe and layout, and sets the
+    observation points, once for all the tracking jobs of the worker.
+    """
+    from cpymad.madx import Madx  # noqa: PLC0415
+
+    madx = Madx(stdout=False)
+    load_madx_machine(madx, machine_file)
+    madx.command.use(sequence=sequence)
+    madx.call(str(errors_file))
+
+    _create_ptc_universe(madx, fringe=fringe, **layout)
     for element in observation_points:
-        logger.trace(f"Setting observation point for tracking with OBSERVE at element '{element}'")
         madx.command.ptc_observe(place=element)
+    return madx
 
-    madx.command.ptc_track(turns=nturns, element_by_element=element_by_element, onetable=onetable, **kwargs)
-    madx.ptc_end()
 
-    if onetable:  # there will only be one table 'trackone' given back by MAD-X
-        logger.debug("Because of option ONETABLE only one table 'TRACKONE' exists to be returned.")
-        return {"trackone": madx.table.trackone.dframe()}
-    return {
-        f"observation_point_{point:d}": madx.table[f"track.obs{point:04d}.p0001"].dframe()
-        for point in range(1, len(observation_points) + 2)  # len(observation_points) + 1 for start of
-        # machine + 1 because MAD-X starts indexing these at 1
-    }
+def _ptc_track_block(
+    madx: Madx, /, initial_coordinates: np.ndarray, nturns: int, observation_points: Sequence[str], **kwargs
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracking job of the workers of `~.cpymadtools.ptc.ptc_track_particles`: issues a
+    ``PTC_TRACK`` block for the given particles in the worker's ``PTC`` universe, and
+    builds their dense coordinates array from the ``TRACKONE`` and ``TRACKLOSS`` tables.
+    """
+    logger.trace(f"Issuing PTC_START commands for {len(initial_coordinates)} particles at once")
+    madx.input(
+        "\n".join(
+            "ptc_start, "
+            + ", ".join(f"{coordinate}={value!r}" for coordinate, value in zip(COORDINATES, particle))
+            + ";"
+            for particle in initial_coordinates.tolist()
+        )
+    )
+    madx.command.ptc_track(turns=nturns, onetable=True, recloss=True, **kwargs)
+    madx.command.ptc_track_end()
+    return _tracked_particles_from_tables(madx, len(initial_coordinates), nturns, observation_points)
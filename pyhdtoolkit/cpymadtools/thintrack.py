@@ -0,0 +1,564 @@
+"""
+.. _cpymadtools-thintrack:
+
+Thin-Lens Tracking Engine
+-------------------------
+
+Module with a tracking engine written with `numpy`, for thin-lens (sliced)
+sequences. The sequence is extracted once from a `~cpymad.madx.Madx` object
+into arrays, after which particle ensembles are tracked turn by turn in the
+Python process, without going through ``MAD-X`` and its ``TRACK`` command.
+
+The kick and drift maps are vectorised over particles with `numpy`. When
+`numba` is installed, a per-particle version of them is compiled instead
+(see `~pyhdtoolkit.utils.decorators.maybe_jit`) and particles are spread
+over the cores of the machine.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from pyhdtoolkit.cpymadtools.track import COORDINATES, TrackedParticles, _validate_tracking_inputs
+from pyhdtoolkit.utils.decorators import maybe_jit
+
+try:
+    from numba import prange
+except ImportError:
+    prange = range
+
+if TYPE_CHECKING:
+    from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
+
+_NUMBA_AVAILABLE: bool = prange is not range
+# Default MAX_APER of the TRACK command, limits on the coordinates beyond which particles are lost
+MAXAPER: tuple[float, ...] = (0.1, 0.01, 0.1, 0.01, 1.0, 0.1)
+# Elements which are drifts for tracking purposes
+_DRIFT_TYPES: frozenset[str] = frozenset(
+    {
+        "drift",
+        "marker",
+        "monitor",
+        "hmonitor",
+        "vmonitor",
+        "instrument",
+        "placeholder",
+        "collimator",
+        "ecollimator",
+        "rcollimator",
+    }
+)
+_IMPLICIT_DRIFT_PREFIX: str = "drift_"  # drifts inserted by MAD-X when expanding a sequence
+_KICKER_TYPES: frozenset[str] = frozenset({"hkicker", "vkicker", "kicker", "tkicker"})
+_CAVITY_TYPES: frozenset[str] = frozenset({"rfcavity", "crabcavity"})
+
+
+class ThinLattice(NamedTuple):
+    """
+    .. versionadded:: 1.9.0
+
+    Arrays describing a thin-lens sequence as a succession of drifts and thin
+    kicks, as extracted by `~.cpymadtools.thintrack.get_thin_lattice`. Kick *i*
+    is preceded by a drift of length ``drifts[i]``, and the last kick is followed
+    by a drift of length ``drifts[-1]``.
+
+    Attributes
+    ----------
+    names : tuple[str, ...]
+        The names of the *M* elements giving a kick.
+    drifts : numpy.ndarray
+        The lengths of the ``M + 1`` drifts, in meters.
+    strengths : numpy.ndarray
+        A `complex` array of shape ``(M, n_orders)``, with the integrated
+        ``KNL + i * KSL`` strengths of each kick (field errors included).
+    orders : numpy.ndarray
+        The highest order with a non-zero strength for each kick, or -1.
+    curvatures : numpy.ndarray
+        The design ``KNL[0] + i * KSL[0]`` of each multipole, bending the
+        reference orbit (zero for kickers and edges).
+    lrads : numpy.ndarray
+        The ``LRAD`` of each multipole, for the weak focusing of thin dipoles.
+    edges : numpy.ndarray
+        An array of shape ``(M, 2)`` with the horizontal and vertical linear
+        focusing of each ``DIPEDGE`` (zero for other elements).
+    offsets : numpy.ndarray
+        The ``DX + i * DY`` alignment errors of each kick.
+    rotations : numpy.ndarray
+        The ``exp(-i * TILT)`` rotation of each kick.
+    beta0 : float
+        The relativistic beta of the reference particle.
+    """
+
+    names: tuple[str, ...]
+    drifts: np.ndarray
+    strengths: np.ndarray
+    orders: np.ndarray
+    curvatures: np.ndarray
+    lrads: np.ndarray
+    edges: np.ndarray
+    offsets: np.ndarray
+    rotations: np.ndarray
+    beta0: float
+
+
+class _Kicks(NamedTuple):
+    """
+    .. versionadded:: 1.9.0
+
+    The arrays of a `~.cpymadtools.thintrack.ThinLattice` the tracking kernels need,
+    with the *coefficients* being the strengths divided by the factorial of their order.
+    Given to the kernels as a single argument, which `numba` supports.
+    """
+
+    drifts: np.ndarray
+    coefficients: np.ndarray
+    orders: np.ndarray
+    curvatures: np.ndarray
+    lrads: np.ndarray
+    edges: np.ndarray
+    offsets: np.ndarray
+    rotations: np.ndarray
+    beta0: float
+
+
+def get_thin_lattice(madx: Madx, /, sequence: str | None = None) -> ThinLattice:
+    """
+    .. versionadded:: 1.9.0
+
+    Extracts the sequence in use, which should be sliced (for instance with
+    ``MAKETHIN``), into a `~.cpymadtools.thintrack.ThinLattice` to be tracked
+    with `~.cpymadtools.thintrack.track_thin_lattice`. Consecutive drifts, and
+    elements acting as drifts, are merged together and elements with no effect
+    are skipped. The field errors (``EFCOMP``), the ``DX`` and ``DY`` alignment
+    errors (``EALIGN``) and the orbit correctors settings of the elements are
+    taken into account, and strengths are multiplied by the ``BV`` flag of the
+    beam.
+
+    Warning
+    -------
+        If the *sequence* parameter is given a string value, the ``USE`` command will
+        be ran on the provided sequence name. This means the caveats of ``USE`` apply,
+        for instance the erasing of previously defined errors, orbits corrections etc.
+        In this case a warning will be logged but the function will proceed. If `None`
+        is given (by default) then the sequence already in use will be extracted.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instantiated `~cpymad.madx.Madx` object. Positional only.
+    sequence : str, optional
+        The sequence to extract. If no value is provided, the sequence in use
+        is extracted. Beware of the dangers of giving a sequence that will be
+        ``use``-d by ``MAD-X``, see the warning above for more information.
+
+    Returns
+    -------
+    ThinLattice
+        A `~.cpymadtools.thintrack.ThinLattice` with the arrays describing the sequence.
+
+    Raises
+    ------
+    ValueError
+        If the sequence has thick elements, or elements not supported by the engine
+        (such as RF cavities with a non-zero voltage, or powered solenoids).
+
+    Example
+    -------
+        .. code-block:: python
+
+            madx.command.makethin(sequence="lhcb1", style="teapot")
+            madx.command.use(sequence="lhcb1")
+            lattice = get_thin_lattice(madx)
+    """
+    if isinstance(sequence, str):
+        logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
+        logger.debug(f"Using sequence '{sequence}' for the extraction")
+        madx.use(sequence=sequence)
+
+    sequence_name = madx._libmadx.get_active_sequence_name()  # noqa: SLF001
+    beam = madx.sequence[sequence_name].beam
+    bv = float(beam.bv)
+    sequence_length = madx.sequence[sequence_name].length
+    element_names = madx._libmadx.get_expanded_element_names(sequence_name)  # noqa: SLF001
+    positions = [*madx._libmadx.get_expanded_element_positions(sequence_name), sequence_length]  # noqa: SLF001
+    logger.debug(f"Extracting the {len(element_names)} elements of sequence '{sequence_name}' into a thin lattice")
+
+    names: list[str] = []
+    drifts: list[float] = []
+    kicks: list[tuple[list[complex], complex, float, tuple[float, float], complex, float]] = []
+    drift_length = 0.0
+    for index, name in enumerate(element_names):
+        if name.startswith(_IMPLICIT_DRIFT_PREFIX):  # no need to query MAD-X for these
+            drift_length += positions[index + 1] - positions[index]
+            continue
+        element = madx._libmadx.get_expanded_element(sequence_name, index)  # noqa: SLF001
+        kick = _element_kick(element, bv)
+        if kick is None:
+            drift_length += element["length"]
+            continue
+        if element["length"] != 0:  # thick kicker, kicks in its middle
+            drift_length += element["length"] / 2
+        names.append(element["name"])
+        drifts.append(drift_length)
+        kicks.append(kick)
+        drift_length = element["length"] / 2
+    drifts.append(drift_length)
+
+    norders = max((len(kick[0]) for kick in kicks), default=1)
+    strengths = np.zeros((len(kicks), norders), dtype=complex)
+    for row, kick in enumerate(kicks):
+        strengths[row, : len(kick[0])] = kick[0]
+    nonzero = strengths != 0
+    orders = np.where(nonzero.any(axis=1), norders - 1 - np.argmax(nonzero[:, ::-1], axis=1), -1)
+    logger.debug(f"Extracted {len(kicks)} kicks, with multipoles up to order {orders.max(initial=0)}")
+
+    return ThinLattice(
+        names=tuple(names),
+        drifts=np.array(drifts),
+        strengths=strengths,
+        orders=orders,
+        curvatures=np.array([kick[1] for kick in kicks], dtype=complex),
+        lrads=np.array([kick[2] for kick in kicks], dtype=float),
+        edges=np.array([kick[3] for kick in kicks], dtype=float).reshape(-1, 2),
+        offsets=np.array([kick[4] for kick in kicks], dtype=complex),
+        rotations=np.exp(-1j * np.array([kick[5] for kick in kicks], dtype=float)),
+        beta0=float(beam.beta),
+    )
+
+
+def track_thin_lattice(
+    lattice: ThinLattice,
+    /,
+    initial_coordinates: ArrayLike,
+    nturns: int,
+    *,
+    record_turns: bool = True,
+    maxaper: ArrayLike = MAXAPER,
+    jit: bool = True,
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks an ensemble of particles for *nturns* through a thin lattice extracted by
+    `~.cpymadtools.thintrack.get_thin_lattice`, with the same maps as the ``TRACK``
+    command of ``MAD-X``: exact drifts and thin multipole kicks. Coordinates are the
+    ``MAD-X`` canonical ones, and are absolute as with the ``ONEPASS`` option of
+    ``TRACK``. Particles are lost when one of their coordinates exceeds *maxaper*
+    at the end of a turn, after which they are no longer tracked.
+
+    Note
+    ----
+        There is no longitudinal motion: ``PT`` is constant since RF cavities are
+        not supported. Alignment errors other than ``DX`` and ``DY`` are ignored.
+        Losses are always checked, as if ``TRACK`` were given the ``APERTURE`` flag
+        with only the *maxaper* limits.
+
+    Parameters
+    ----------
+    lattice : ThinLattice
+        The lattice to track through, from `~.cpymadtools.thintrack.get_thin_lattice`.
+        Positional only.
+    initial_coordinates : ArrayLike
+        An array of shape ``(N, 6)`` with the ``X, PX, Y, PY, T, PT`` starting
+        coordinates of each of the *N* particles to track.
+    nturns : int
+        The number of turns to track for.
+    record_turns : bool
+        If `True`, the coordinates at the end of every turn are returned. Otherwise
+        only the initial and final coordinates are, which bounds memory usage for
+        large ensembles. Defaults to `True`. Keyword only.
+    maxaper : ArrayLike
+        The limits on the absolute value of each of the six coordinates beyond which
+        particles are lost. Defaults to the ``MAXAPER`` default of ``TRACK``. Keyword only.
+    jit : bool
+        If `True` and `numba` is installed, particles are tracked one by one with a
+        compiled kernel, in parallel over the cores of the machine. Otherwise turns
+        are tracked with `numpy` operations over all particles at once, which is
+        much slower. Defaults to `True`. Keyword only.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple with the coordinates at the start
+        of machine, of shape ``(1, N, nturns + 1, 6)`` (or ``(1, N, 2, 6)`` if *record_turns*
+        is `False`), and the turn at which each particle was lost.
+
+    Example
+    -------
+        .. code-block:: python
+
+            lattice = get_thin_lattice(madx)
+            initial_coordinates = np.zeros((100_000, 6))
+            initial_coordinates[:, 0] = np.linspace(1e-5, 1e-3, 100_000)
+            tracks = track_thin_lattice(lattice, initial_coordinates, nturns=10_000, record_turns=False)
+            survivors = np.flatnonzero(tracks.survived)
+    """
+    initial_coordinates, _ = _validate_tracking_inputs(initial_coordinates, None)
+    maxaper = np.asarray(maxaper, dtype=float).reshape(len(COORDINATES), 1)
+    nparticles = len(initial_coordinates)
+    logger.debug(f"Tracking {nparticles} particles for {nturns} turns through {len(lattice.names)} thin kicks")
+
+    coordinates = np.ascontiguousarray(initial_coordinates.T)  # (6, N) so each coordinate is contiguous
+    lost_turn = np.full(nparticles, -1, dtype=int)
+    recorded = np.full((nturns + 1 if record_turns else 2, len(COORDINATES), nparticles), np.nan)
+    recorded[0] = coordinates
+
+    # Kernels evaluate the sum of (KNL + i KSL) z^n / n! as a polynomial of z, without divisions
+    factorials = np.cumprod(np.maximum(np.arange(lattice.strengths.shape[1]), 1))
+    kicks = _Kicks(*lattice._replace(strengths=lattice.strengths / factorials)[1:])
+    if jit and _NUMBA_AVAILABLE:
+        logger.trace("Tracking particles with the compiled kernel")
+        _track_particles(
+            coordinates,
+            nturns,
+            kicks,
+            maxaper=maxaper.ravel(),
+            lost_turn=lost_turn,
+            recorded=recorded,
+            record_turns=record_turns,
+        )
+    else:
+        logger.trace("Tracking particles with the vectorised kernel")
+        _track_vectorised(coordinates, nturns, kicks, maxaper=maxaper, lost_turn=lost_turn, recorded=recorded)
+
+    return TrackedParticles(coordinates=recorded.transpose(2, 0, 1)[np.newaxis], lost_turn=lost_turn)
+
+
+# ----- Helpers ----- #
+
+
+def _element_kick(  # noqa: PLR0911, PLR0912 (one branch per element type)
+    element: dict, bv: float
+) -> tuple[list[complex], complex, float, tuple[float, float], complex, float] | None:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the strengths, curvature, ``LRAD``, edge focusing, offset and tilt of the kick
+    given by an element of the expanded sequence (as returned by ``cpymad``'s low-level
+    interface), or `None` for elements acting as drifts.
+    """
+    base_type = element["base_type"]
+    data = {name: parameter.value for name, parameter in element["data"].items()}
+    field_errors, align_errors = element["field_errors"], element["align_errors"]
+    offset = 0j if align_errors is None else complex(align_errors.dx, align_errors.dy)
+    tilt = data.get("tilt", 0.0)
+
+    if base_type in _DRIFT_TYPES:
+        return None
+    if base_type in _CAVITY_TYPES and data.get("volt", 0.0) == 0:  # only transverse tracking
+        return None
+    if base_type == "solenoid" and data.get("ksi", 0.0) == 0:  # thin solenoid turned off
+        return None
+
+    if base_type == "multipole":
+        knl, ksl = list(data.get("knl", [])), list(data.get("ksl", []))
+        if field_errors is not None:
+            knl = _add_errors(knl, field_errors.dkn)
+            ksl = _add_errors(ksl, field_errors.dks)
+        norders = max(len(knl), len(ksl))
+        knl, ksl = knl + [0.0] * (norders - len(knl)), ksl + [0.0] * (norders - len(ksl))
+        strengths = [bv * complex(normal, skew) for normal, skew in zip(knl, ksl)]
+        curvature = bv * complex(_first(data.get("knl")), _first(data.get("ksl")))
+        if not any(strengths) and curvature == 0:
+            return None
+        return strengths, curvature, data.get("lrad", 0.0), (0.0, 0.0), offset, tilt
+
+    if base_type in _KICKER_TYPES:
+        if base_type == "hkicker":
+            hkick, vkick = data.get("kick", 0.0), 0.0
+        elif base_type == "vkicker":
+            hkick, vkick = 0.0, data.get("kick", 0.0)
+        else:
+            hkick, vkick = data.get("hkick", 0.0), data.get("vkick", 0.0)
+        hkick, vkick = hkick + element["chkick"], vkick + element["cvkick"]
+        if hkick == 0 and vkick == 0:
+            return None
+        return [bv * complex(-hkick, vkick)], 0j, 0.0, (0.0, 0.0), offset, tilt
+
+    if base_type == "dipedge":
+        h, e1 = data.get("h", 0.0), data.get("e1", 0.0)
+        correction = 2 * h * data.get("hgap", 0.0) * data.get("fint", 0.0)
+        horizontal = h * np.tan(e1)
+        vertical = -h * np.tan(e1 - correction / np.cos(e1) * (1 + np.sin(e1) ** 2))
+        if horizontal == 0 and vertical == 0:
+            return None
+        return [0j], 0j, 0.0, (float(horizontal), float(vertical)), offset, tilt
+
+    if element["length"] != 0:
+        logger.error(f"Element '{element['name']}' of type '{base_type}' is thick, the sequence should be sliced")
+    else:
+        logger.error(f"Element '{element['name']}' of type '{base_type}' is not supported by the thin-lens engine")
+    msg = f"Unsupported element '{element['name']}' in sequence"
+    raise ValueError(msg)
+
+
+def _first(values: list[float] | None) -> float:
+    """First value of a (possibly empty or missing) array attribute."""
+    return values[0] if values else 0.0
+
+
+def _add_errors(strengths: list[float], errors: list[float]) -> list[float]:
+    """Adds the field errors of an element to its (possibly shorter) strengths."""
+    size = max(len(strengths), len(errors))
+    strengths = strengths + [0.0] * (size - len(strengths))
+    return [strength + error for strength, error in zip(strengths, list(errors) + [0.0] * (size - len(errors)))]
+
+
+def _track_turn(coordinates: np.ndarray, kicks: _Kicks) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks the ``(6, N)`` coordinates through one turn of the lattice given by *kicks*,
+    in place. Written with array operations over particles only, so that it runs with
+    `numpy` and compiles with `numba` alike.
+    """
+    drifts, coefficients, orders, curvatures, lrads, edges, offsets, rotations, beta0 = kicks
+    x, px, y, py, t, pt = (
+        coordinates[0],
+        coordinates[1],
+        coordinates[2],
+        coordinates[3],
+        coordinates[4],
+        coordinates[5],
+    )
+    one_plus_delta = np.sqrt(1.0 + 2.0 * pt / beta0 + pt * pt)  # constant without RF
+    inverse_beta = (1.0 / beta0 + pt) / one_plus_delta
+
+    for index in range(len(drifts)):
+        length = drifts[index]
+        if length != 0.0:
+            inverse_pz = 1.0 / np.sqrt(one_plus_delta * one_plus_delta - px * px - py * py)
+            x += length * px * inverse_pz
+            y += length * py * inverse_pz
+            t += length * (1.0 / beta0 - (1.0 / beta0 + pt) * inverse_pz)
+        if index == len(orders):  # last drift
+            break
+
+        # Everything is computed in the frame of the element, then rotated back
+        position = (x - offsets[index].real + 1j * (y - offsets[index].imag)) * rotations[index]
+        order = orders[index]
+        field = np.zeros_like(position) + coefficients[index, max(order, 0)]
+        for multipole in range(order - 1, -1, -1):  # Horner scheme
+            field = field * position + coefficients[index, multipole]
+        curvature = curvatures[index]
+        kick = np.conj(curvature * one_plus_delta - field)  # design orbit bending cancels the dipole field
+        if lrads[index] > 0.0:  # weak focusing of thin dipoles
+            kick -= (curvature.real**2 * position.real + 1j * curvature.imag**2 * position.imag) / lrads[index]
+        kick += edges[index, 0] * position.real + 1j * edges[index, 1] * position.imag
+        kick *= np.conj(rotations[index])
+        px += kick.real
+        py += kick.imag
+        t -= (curvature.real * position.real - curvature.imag * position.imag) * inverse_beta
+
+
+def _track_vectorised(
+    coordinates: np.ndarray,
+    nturns: int,
+    kicks: _Kicks,
+    *,
+    maxaper: np.ndarray,
+    lost_turn: np.ndarray,
+    recorded: np.ndarray,
+) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks the ``(6, N)`` coordinates turn by turn with `~.cpymadtools.thintrack._track_turn`,
+    removing lost particles from the arrays as they are lost. Fills *lost_turn* and *recorded*.
+    """
+    alive = np.arange(coordinates.shape[1])
+    record_turns = len(recorded) == nturns + 1
+    for turn in range(1, nturns + 1):
+        _track_turn(coordinates, kicks)
+        lost = ~(np.abs(coordinates) <= maxaper).all(axis=0)  # also catches NaNs
+        if lost.any():
+            logger.trace(f"Lost {lost.sum()} particles at turn {turn}")
+            lost_turn[alive[lost]] = turn
+            coordinates, alive = np.ascontiguousarray(coordinates[:, ~lost]), alive[~lost]
+        if record_turns:
+            recorded[turn][:, alive] = coordinates
+        if not alive.size:
+            logger.debug(f"All particles lost, stopping at turn {turn}")
+            break
+    if not record_turns:
+        recorded[-1][:, alive] = coordinates
+
+
+def _track_particles(  # noqa: PLR0912
+    coordinates: np.ndarray,
+    nturns: int,
+    kicks: _Kicks,
+    *,
+    maxaper: np.ndarray,
+    lost_turn: np.ndarray,
+    recorded: np.ndarray,
+    record_turns: bool,
+) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Same maps as `~.cpymadtools.thintrack._track_turn`, written with scalar operations for each
+    particle and all turns at once, to be compiled with `numba` (particles are spread over cores).
+    A lost particle is no longer tracked. Fills *lost_turn* and *recorded*.
+    """
+    drifts, coefficients, orders, curvatures, lrads, edges, offsets, rotations, beta0 = kicks
+    nkicks = len(orders)
+    for particle in prange(coordinates.shape[1]):
+        x, px, y, py = (
+            coordinates[0, particle],
+            coordinates[1, particle],
+            coordinates[2, particle],
+            coordinates[3, particle],
+        )
+        t, pt = coordinates[4, particle], coordinates[5, particle]
+        one_plus_delta = np.sqrt(1.0 + 2.0 * pt / beta0 + pt * pt)  # constant without RF
+        inverse_beta = (1.0 / beta0 + pt) / one_plus_delta
+
+        for turn in range(1, nturns + 1):
+            for index in range(nkicks + 1):
+                length = drifts[index]
+                if length != 0.0:
+                    inverse_pz = 1.0 / np.sqrt(one_plus_delta * one_plus_delta - px * px - py * py)
+                    x += length * px * inverse_pz
+                    y += length * py * inverse_pz
+                    t += length * (1.0 / beta0 - (1.0 / beta0 + pt) * inverse_pz)
+                if index == nkicks:  # last drift
+                    break
+
+                position = complex(x - offsets[index].real, y - offsets[index].imag) * rotations[index]
+                order = orders[index]
+                field = coefficients[index, max(order, 0)]
+                for multipole in range(order - 1, -1, -1):
+                    field = field * position + coefficients[index, multipole]
+                curvature = curvatures[index]
+                kick = (curvature * one_plus_delta - field).conjugate()
+                if lrads[index] > 0.0:
+                    kick -= complex(curvature.real**2 * position.real, curvature.imag**2 * position.imag) / lrads[index]
+                kick += complex(edges[index, 0] * position.real, edges[index, 1] * position.imag)
+                kick *= rotations[index].conjugate()
+                px += kick.real
+                py += kick.imag
+                t -= (curvature.real * position.real - curvature.imag * position.imag) * inverse_beta
+
+            current = (x, px, y, py, t, pt)
+            lost = False
+            for column in range(6):
+                lost |= not abs(current[column]) <= maxaper[column]  # also catches NaNs
+            if lost:
+                lost_turn[particle] = turn
+                break
+            if record_turns:
+                for column in range(6):
+                    recorded[turn, column, particle] = current[column]
+
+        if not record_turns and lost_turn[particle] < 0:
+            current = (x, px, y, py, t, pt)
+            for column in range(6):
+                recorded[1, column, particle] = current[column]
+
+
+_track_particles = maybe_jit(_track_particles, parallel=True)
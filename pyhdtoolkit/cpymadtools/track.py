@@ -10,15 +10,64 @@ through a `~cpymad.madx.Madx` object.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import hashlib
+import multiprocessing
+import tempfile
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
+import numpy as np
+import pandas as pd
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.pool import MadxPool
+from pyhdtoolkit.cpymadtools.utils import load_madx_machine, save_madx_errors, save_madx_machine
+
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterator, Sequence
 
-    import pandas as pd
     from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
+
+# Coordinates columns of the tracking tables, in the order of the returned arrays
+COORDINATES: tuple[str, ...] = ("x", "px", "y", "py", "t", "pt")
+# Row name of the start of machine observation point in the ONETABLE tracking table
+_START_OBSERVATION_NAME: str = "#e"
+
+
+class TrackedParticles(NamedTuple):
+    """
+    .. versionadded:: 1.9.0
+
+    Turn-by-turn coordinates of a particle ensemble tracked with
+    `~.cpymadtools.track.track_particles`, and survival information.
+
+    Attributes
+    ----------
+    coordinates : numpy.ndarray
+        A `float` array of shape ``(n_obs, N, nturns + 1, 6)``, with the
+        ``X, PX, Y, PY, T, PT`` coordinates of each of the *N* particles at
+        each observation point and turn. The first observation point is the
+        start of machine, the others are the ones given to the function, in
+        order. Index 0 of the turns axis holds the initial coordinates, which
+        ``MAD-X`` only records at the start of machine (this entry is `NaN`
+        at other observation points). Entries after a particle is lost are
+        `NaN`.
+    lost_turn : numpy.ndarray
+        An `int` array of shape ``(N,)`` with the turn at which each particle
+        was lost, or -1 for the particles which survived the tracking.
+    """
+
+    coordinates: np.ndarray
+    lost_turn: np.ndarray
+
+    @property
+    def survived(self) -> np.ndarray:
+        """Boolean mask of the particles which survived the tracking, of shape ``(N,)``."""
+        return self.lost_turn < 0
+
 
 # ----- Utlites ----- #
 
@@ -121,3 +170,594 @@ def track_single_particle(
         for point in range(1, len(observation_points) + 2)  # len(observation_points) + 1 for start of
         # machine + 1 because MAD-X starts indexing these at 1
     }
+
+
+def track_particles(
+    madx: Madx,
+    /,
+    initial_coordinates: ArrayLike,
+    nturns: int,
+    sequence: str | None = None,
+    observation_points: Sequence[str] | None = None,
+    **kwargs,
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks an ensemble of particles for *nturns* through the ``TRACK`` command,
+    based on their initial coordinates. All particles are tracked together in a
+    single ``TRACK`` block, and the results are retrieved at once from the
+    ``ONETABLE`` tracking table into a dense array. This is much faster than
+    calling `~.cpymadtools.track.track_single_particle` for each particle.
+
+    Warning
+    -------
+        If the *sequence* parameter is given a string value, the ``USE`` command will
+        be ran on the provided sequence name. This means the caveats of ``USE`` apply,
+        for instance the erasing of previously defined errors, orbits corrections etc.
+        In this case a warning will be logged but the function will proceed. If `None`
+        is given (by default) then the sequence already in use will be the one tracking
+        is performed with.
+
+    Note
+    ----
+        ``MAD-X`` only checks for particle losses when tracking with the
+        ``APERTURE`` option, which should then be given as a keyword argument
+        for the survival information to be meaningful.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instantiated `~cpymad.madx.Madx` object. Positional only.
+    initial_coordinates : ArrayLike
+        An array of shape ``(N, 6)`` with the ``X, PX, Y, PY, T, PT`` starting
+        coordinates of each of the *N* particles to track.
+    nturns : int
+        The number of turns to track for.
+    sequence : str, optional
+        The sequence to use for tracking. If no value is provided, it is assumed
+        that a sequence is already defined and in use, and this one will be picked
+        up by ``MAD-X``. Beware of the dangers of giving a sequence that will be
+        ``use``-d by ``MAD-X``, see the warning above for more information.
+    observation_points : Sequence[str], optional
+        A sequence of element names at which to ``OBSERVE`` during the tracking.
+        Each element should be observed only once.
+    **kwargs
+        Any keyword argument will be given to the ``TRACK`` command, for instance
+        `APERTURE`, `ONEPASS` etc. The `ONETABLE` and `RECLOSS` options are always
+        set as they are used to retrieve the data. Refer to the `MAD-X manual
+        <http://madx.web.cern.ch/madx/releases/last-rel/madxuguide.pdf>`_ for options.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple with the turn-by-turn
+        coordinates array of shape ``(n_obs, N, nturns + 1, 6)`` and the turn at
+        which each particle was lost. See its documentation for details.
+
+    Example
+    -------
+        .. code-block:: python
+
+            amplitudes = np.linspace(1e-4, 1e-3, 100)
+            initial_coordinates = np.zeros((100, 6))
+            initial_coordinates[:, 0] = initial_coordinates[:, 2] = amplitudes
+            tracks = track_particles(madx, initial_coordinates, nturns=1000, aperture=True)
+            x_at_start = tracks.coordinates[0, :, :, 0]  # shape (100, 1001)
+    """
+    initial_coordinates, observation_points = _validate_tracking_inputs(initial_coordinates, observation_points)
+    nparticles = len(initial_coordinates)
+    logger.debug(f"Performing MAD-X (thin) tracking of {nparticles} particles for {nturns} turns")
+
+    if isinstance(sequence, str):
+        logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
+        logger.debug(f"Using sequence '{sequence}' for tracking")
+        madx.use(sequence=sequence)
+
+    _run_track_block(madx, initial_coordinates, nturns, observation_points, **kwargs)
+    return _tracked_particles_from_tables(madx, nparticles, nturns, observation_points)
+
+
+def track_particles_parallel(
+    madx: Madx,
+    /,
+    initial_coordinates: ArrayLike,
+    nturns: int,
+    *,
+    processes: int | None = None,
+    sequence: str | None = None,
+    observation_points: Sequence[str] | None = None,
+    **kwargs,
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks an ensemble of particles for *nturns* through the ``TRACK`` command,
+    spreading the particles across worker processes. The state of the machine (the
+    sequence in use, its beam, the global variables and the alignment and field
+    errors of its elements) is saved once with `~.cpymadtools.utils.save_madx_machine`
+    and `~.cpymadtools.utils.save_madx_errors`, and loaded by each worker of a
+    `~.cpymadtools.pool.MadxPool`. Each worker tracks its share of the particles
+    as `~.cpymadtools.track.track_particles` would, and the results are merged in
+    the original particle order.
+
+    Warning
+    -------
+        If the *sequence* parameter is given a string value, the ``USE`` command will
+        be ran on the provided sequence name, in the calling process, before saving
+        the machine. This means the caveats of ``USE`` apply, for instance the erasing
+        of previously defined errors, orbits corrections etc. In this case a warning
+        will be logged but the function will proceed.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instantiated `~cpymad.madx.Madx` object. Positional only.
+    initial_coordinates : ArrayLike
+        An array of shape ``(N, 6)`` with the ``X, PX, Y, PY, T, PT`` starting
+        coordinates of each of the *N* particles to track.
+    nturns : int
+        The number of turns to track for.
+    processes : int, optional
+        The number of worker processes. Defaults to `None`, which uses the
+        number of CPUs of the machine. No more workers than particles are
+        started. Keyword only.
+    sequence : str, optional
+        The sequence to use for tracking. If no value is provided, the sequence
+        in use is tracked. Beware of the dangers of giving a sequence that will be
+        ``use``-d by ``MAD-X``, see the warning above for more information.
+        Keyword only.
+    observation_points : Sequence[str], optional
+        A sequence of element names at which to ``OBSERVE`` during the tracking.
+        Each element should be observed only once. Keyword only.
+    **kwargs
+        Any keyword argument will be given to the ``TRACK`` command, for instance
+        `APERTURE`, `ONEPASS` etc. The `ONETABLE` and `RECLOSS` options are always
+        set as they are used to retrieve the data. Refer to the `MAD-X manual
+        <http://madx.web.cern.ch/madx/releases/last-rel/madxuguide.pdf>`_ for options.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple with the turn-by-turn
+        coordinates array of shape ``(n_obs, N, nturns + 1, 6)`` and the turn at
+        which each particle was lost. See its documentation for details.
+
+    Example
+    -------
+        .. code-block:: python
+
+            initial_coordinates = np.zeros((1000, 6))
+            initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 1000)
+            tracks = track_particles_parallel(madx, initial_coordinates, nturns=1000, processes=16)
+            x_at_start = tracks.coordinates[0, :, :, 0]  # shape (1000, 1001)
+    """
+    initial_coordinates, observation_points = _validate_tracking_inputs(initial_coordinates, observation_points)
+    nparticles = len(initial_coordinates)
+    processes = min(multiprocessing.cpu_count() if processes is None else processes, nparticles)
+    logger.debug(
+        f"Performing MAD-X (thin) tracking of {nparticles} particles for {nturns} turns on {processes} processes"
+    )
+
+    if isinstance(sequence, str):
+        logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
+        logger.debug(f"Using sequence '{sequence}' for tracking")
+        madx.use(sequence=sequence)
+
+    job = partial(_track_block, nturns=nturns, observation_points=observation_points, **kwargs)
+    with _tracking_pool(madx, processes) as pool:
+        blocks = pool.map(job, np.array_split(initial_coordinates, processes))
+
+    logger.debug("Merging tracking results from workers")
+    return TrackedParticles(
+        coordinates=np.concatenate([block.coordinates for block in blocks], axis=1),
+        lost_turn=np.concatenate([block.lost_turn for block in blocks]),
+    )
+
+
+def track_particles_to_disk(
+    madx: Madx,
+    /,
+    initial_coordinates: ArrayLike,
+    nturns: int,
+    file_name: Path | str,
+    *,
+    chunk_turns: int = 1000,
+    sequence: str | None = None,
+    observation_points: Sequence[str] | None = None,
+    resume: bool = False,
+    **kwargs,
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks an ensemble of particles for *nturns* like `~.cpymadtools.track.track_particles`,
+    but streams the results to disk instead of holding them in memory. Tracking is done
+    in blocks of *chunk_turns* turns, each block restarting from the coordinates of the
+    surviving particles at the end of the previous one. After each block the ``MAD-X``
+    tables are read and written to a pre-allocated, memory-mapped ``.npy`` file, so
+    memory usage is bounded by the block size and not by *nturns*.
+
+    The coordinates are stored on disk with the turns as the first axis, so that each
+    block is written contiguously. The lost turns are written to a second file next to
+    the first one, with the ``.lost.npy`` suffix. Both files can be opened again later
+    with `~.cpymadtools.track.load_tracked_particles`.
+
+    After each block a small checkpoint file, with the ``.checkpoint.npz`` suffix, is
+    written next to the coordinates file. It holds the turn reached, the coordinates
+    of the particles at this turn, their lost turns and a fingerprint of the machine
+    and tracking inputs. With *resume* set to `True`, a run interrupted (for instance
+    a pre-empted ``HTCondor`` job) picks up from the last completed block instead of
+    starting over. The fingerprint is made of the sequence in use (its elements and
+    their positions), its beam, the values of the global variables, the initial
+    coordinates, the number of turns, the observation points and the ``TRACK``
+    options. Changes to the machine which are not reflected in these (for instance
+    errors assigned with ``EFCOMP``) are not detected.
+
+    Note
+    ----
+        Restarting from the end coordinates of a block is exact for the symplectic
+        thin-lens tracking of ``MAD-X``, but options keeping state across turns
+        within a ``TRACK`` block (for instance ``DAMP`` with ``QUANTUM``) will see
+        it reset at each block.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instantiated `~cpymad.madx.Madx` object. Positional only.
+    initial_coordinates : ArrayLike
+        An array of shape ``(N, 6)`` with the ``X, PX, Y, PY, T, PT`` starting
+        coordinates of each of the *N* particles to track.
+    nturns : int
+        The number of turns to track for.
+    file_name : Path | str
+        The ``.npy`` file to write the coordinates to. It is overwritten if it exists.
+    chunk_turns : int
+        The number of turns tracked in each ``TRACK`` block, and kept in memory at
+        once. Defaults to 1000. Keyword only.
+    sequence : str, optional
+        The sequence to use for tracking, see `~.cpymadtools.track.track_particles`.
+        If given, the ``USE`` command is ran only once, before the first block.
+        Keyword only.
+    observation_points : Sequence[str], optional
+        A sequence of element names at which to ``OBSERVE`` during the tracking.
+        Each element should be observed only once. Keyword only.
+    resume : bool
+        If `True` and a checkpoint from a previous run with the same fingerprint
+        exists, tracking resumes from it and the already written results are kept.
+        If no checkpoint exists, tracking starts from the first turn. A checkpoint
+        with a different fingerprint raises an error. Defaults to `False`. Keyword only.
+    **kwargs
+        Any keyword argument will be given to the ``TRACK`` command of each block,
+        see `~.cpymadtools.track.track_particles`.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple, as loaded by
+        `~.cpymadtools.track.load_tracked_particles`: its coordinates are a
+        read-only view of the file on disk, of shape ``(n_obs, N, nturns + 1, 6)``.
+
+    Example
+    -------
+        .. code-block:: python
+
+            tracks = track_particles_to_disk(
+                madx, initial_coordinates, nturns=1_000_000, file_name="tracks.npy", aperture=True
+            )
+            x_at_start = tracks.coordinates[0, :, -1000:, 0]  # only these are read from disk
+
+        In a job which can be interrupted and restarted, resuming from the last block:
+
+        .. code-block:: python
+
+            tracks = track_particles_to_disk(
+                madx, initial_coordinates, nturns=1_000_000, file_name="tracks.npy", resume=True
+            )
+    """
+    if chunk_turns < 1:
+        logger.error(f"The number of turns per block should be positive, got {chunk_turns}")
+        msg = "Invalid 'chunk_turns' value"
+        raise ValueError(msg)
+
+    initial_coordinates, observation_points = _validate_tracking_inputs(initial_coordinates, observation_points)
+    file_path = Path(file_name)
+    nparticles = len(initial_coordinates)
+    logger.debug(
+        f"Performing MAD-X (thin) tracking of {nparticles} particles for {nturns} turns, "
+        f"by blocks of {chunk_turns} turns written to '{file_path.absolute()}'"
+    )
+
+    if isinstance(sequence, str):
+        logger.warning(f"Sequence '{sequence}' was provided and will be USEd, beware that this will erase errors etc.")
+        logger.debug(f"Using sequence '{sequence}' for tracking")
+        madx.use(sequence=sequence)
+
+    fingerprint = _tracking_fingerprint(madx, initial_coordinates, nturns, observation_points, **kwargs)
+    checkpoint = _load_tracking_checkpoint(file_path, fingerprint) if resume else None
+    if checkpoint is not None:
+        start_turn, coordinates, lost_turn = checkpoint
+        logger.info(f"Resuming tracking from the checkpoint at turn {start_turn}")
+        stored = np.lib.format.open_memmap(file_path, mode="r+")
+    else:
+        start_turn, coordinates, lost_turn = 0, initial_coordinates, np.full(nparticles, -1, dtype=int)
+        shape = (nturns + 1, len(observation_points) + 1, nparticles, len(COORDINATES))
+        stored = np.lib.format.open_memmap(file_path, mode="w+", dtype=float, shape=shape)
+        stored[:] = np.nan
+
+    while start_turn < nturns:
+        alive = np.flatnonzero(lost_turn < 0)
+        if not alive.size:
+            logger.debug(f"All particles lost, stopping at turn {start_turn}")
+            break
+        block_turns = min(chunk_turns, nturns - start_turn)
+        logger.trace(f"Tracking {alive.size} particles from turn {start_turn} for {block_turns} turns")
+        _run_track_block(madx, coordinates[alive], block_turns, observation_points, **kwargs)
+        block = _tracked_particles_from_tables(madx, alive.size, block_turns, observation_points)
+
+        # Turn 0 of a block is the last turn of the previous one, only the very first one is kept
+        first = 0 if start_turn == 0 else 1
+        block_coordinates = block.coordinates[:, :, first:].transpose(2, 0, 1, 3)  # turns first, as on disk
+        stored[start_turn + first : start_turn + block_turns + 1, :, alive] = block_coordinates
+        stored.flush()
+        lost_turn[alive[~block.survived]] = block.lost_turn[~block.survived] + start_turn
+        coordinates = np.full_like(initial_coordinates, np.nan)
+        coordinates[alive] = block.coordinates[0, :, -1]  # start of machine, last turn
+        start_turn += block_turns
+        _save_tracking_checkpoint(file_path, fingerprint, start_turn, coordinates, lost_turn)
+
+    np.save(_lost_turn_path(file_path), lost_turn)
+    del stored  # closes the memory map
+    return load_tracked_particles(file_path)
+
+
+def load_tracked_particles(file_name: Path | str) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Opens the results of `~.cpymadtools.track.track_particles_to_disk` lazily: the
+    coordinates are memory-mapped and only the parts being accessed are read from disk.
+
+    Parameters
+    ----------
+    file_name : Path | str
+        The ``.npy`` file the coordinates were written to.
+
+    Returns
+    -------
+    TrackedParticles
+        A `~.cpymadtools.track.TrackedParticles` tuple whose coordinates are a
+        read-only view of shape ``(n_obs, N, nturns + 1, 6)`` on the file.
+
+    Example
+    -------
+        .. code-block:: python
+
+            tracks = load_tracked_particles("tracks.npy")
+            lost_particles = np.flatnonzero(~tracks.survived)
+    """
+    file_path = Path(file_name)
+    logger.debug(f"Loading tracked particles from '{file_path.absolute()}'")
+    stored = np.load(file_path, mmap_mode="r")  # (nturns + 1, n_obs, N, 6) on disk
+    lost_turn = np.load(_lost_turn_path(file_path))
+    return TrackedParticles(coordinates=stored.transpose(1, 2, 0, 3), lost_turn=lost_turn)
+
+
+def _tracked_particles_from_tables(
+    madx: Madx, /, nparticles: int, nturns: int, observation_points: Sequence[str]
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Builds the dense coordinates array and the lost turns from the internal ``TRACKONE``
+    and ``TRACKLOSS`` tables, each column being retrieved once as an array.
+    """
+    logger.debug("Retrieving tracking data from the TRACKONE table")
+    trackone = madx.table.trackone
+    observation_index = pd.Index([_START_OBSERVATION_NAME, *observation_points])
+    row_names = trackone.row_names()
+    rows_observation = observation_index.get_indexer(row_names)
+    if (unknown := rows_observation < 0).any():
+        unknown_names = sorted(set(np.asarray(row_names)[unknown]))
+        logger.error(f"TRACKONE rows {unknown_names} match none of the observation points {observation_index.tolist()}")
+        msg = "Tracking data does not match the observation points"
+        raise ValueError(msg)
+    rows_particle = trackone.column("number").astype(int) - 1  # MAD-X numbers particles from 1
+    rows_turn = trackone.column("turn").astype(int)
+
+    coordinates = np.full((len(observation_index), nparticles, nturns + 1, len(COORDINATES)), np.nan)
+    for index, coordinate in enumerate(COORDINATES):
+        coordinates[rows_observation, rows_particle, rows_turn, index] = trackone.column(coordinate)
+
+    return TrackedParticles(coordinates=coordinates, lost_turn=_get_lost_turns(madx, nparticles))
+
+
+def _get_lost_turns(madx: Madx, /, nparticles: int) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the turn at which each of the *nparticles* tracked particles was lost,
+    from the internal ``TRACKLOSS`` table, or -1 for particles that survived.
+    """
+    lost_turn = np.full(nparticles, -1, dtype=int)
+    trackloss = madx.table.trackloss
+    lost_turn[trackloss.column("number").astype(int) - 1] = trackloss.column("turn").astype(int)
+    return lost_turn
+
+
+def _validate_tracking_inputs(
+    initial_coordinates: ArrayLike, observation_points: Sequence[str] | None
+) -> tuple[np.ndarray, list[str]]:
+    """
+    .. versionadded:: 1.9.0
+
+    Checks and normalises the initial coordinates to a `float` array of shape ``(N, 6)``,
+    and the observation points to a list of unique, lowercase element names.
+    """
+    initial_coordinates = np.atleast_2d(np.asarray(initial_coordinates, dtype=float))
+    if initial_coordinates.ndim != 2 or initial_coordinates.shape[1] != len(COORDINATES):  # noqa: PLR2004
+        logger.error(f"Initial coordinates should be of shape (N, 6), got {initial_coordinates.shape}")
+        msg = "Invalid 'initial_coordinates' shape"
+        raise ValueError(msg)
+
+    observation_points = [element.lower() for element in observation_points or []]
+    if len(set(observation_points)) != len(observation_points):
+        logger.error(f"Observation points should be unique, got {observation_points}")
+        msg = "Duplicate observation points"
+        raise ValueError(msg)
+    return initial_coordinates, observation_points
+
+
+def _run_track_block(
+    madx: Madx,
+    /,
+    initial_coordinates: np.ndarray,
+    nturns: int,
+    observation_points: Sequence[str],
+    *,
+    ffile: int = 1,
+    **kwargs,
+) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Issues a full ``TRACK`` block for all particles at once, with the ``ONETABLE``
+    and ``RECLOSS`` options always set so the results can be retrieved with
+    `~.cpymadtools.track._tracked_particles_from_tables`. Coordinates are recorded
+    every *ffile* turns, as for the ``RUN`` command.
+    """
+    kwargs = {key.lower(): value for key, value in kwargs.items()} | {"onetable": True, "recloss": True}
+    madx.command.track(**kwargs)
+    for element in observation_points:
+        logger.trace(f"Setting observation point for tracking with OBSERVE at element '{element}'")
+        madx.command.observe(place=element)
+
+    logger.trace("Issuing START commands for all particles at once")
+    madx.input(
+        "\n".join(
+            "start, " + ", ".join(f"{coordinate}={value!r}" for coordinate, value in zip(COORDINATES, particle)) + ";"
+            for particle in initial_coordinates.tolist()
+        )
+    )
+    madx.command.run(turns=nturns, ffile=ffile)
+    madx.command.endtrack()
+
+
+@contextmanager
+def _tracking_pool(madx: Madx, /, processes: int) -> Iterator[MadxPool]:
+    """
+    .. versionadded:: 1.9.0
+
+    Saves the state of the machine in use (see `~.cpymadtools.track.track_particles_parallel`)
+    in a temporary directory and yields a `~.cpymadtools.pool.MadxPool` whose workers load it,
+    ready for tracking jobs.
+    """
+    sequence_name = madx._libmadx.get_active_sequence_name()  # noqa: SLF001
+    with tempfile.TemporaryDirectory(prefix="pyhdtoolkit_track_") as temporary_directory:
+        machine_file = Path(temporary_directory) / "machine.madx"
+        errors_file = Path(temporary_directory) / "errors.madx"
+        logger.debug("Saving the machine state for the tracking workers")
+        save_madx_machine(madx, machine_file, sequences=[sequence_name])
+        save_madx_errors(madx, errors_file)
+
+        setup = partial(_tracking_worker_setup, machine_file, errors_file, sequence_name)
+        with MadxPool(setup, processes=processes) as pool:
+            yield pool
+
+
+def _tracking_worker_setup(machine_file: Path, errors_file: Path, sequence: str) -> Madx:
+    """
+    .. versionadded:: 1.9.0
+
+    Setup of the workers of `~.cpymadtools.track.track_particles_parallel`: loads
+    the saved machine, uses the tracked sequence and loads the saved errors.
+    """
+    from cpymad.madx import Madx  # noqa: PLC0415
+
+    madx = Madx(stdout=False)
+    load_madx_machine(madx, machine_file)
+    madx.command.use(sequence=sequence)
+    madx.call(str(errors_file))
+    return madx
+
+
+def _track_block(
+    madx: Madx, /, initial_coordinates: np.ndarray, nturns: int, observation_points: Sequence[str], **kwargs
+) -> TrackedParticles:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracking job of the workers of `~.cpymadtools.track.track_particles_parallel`:
+    tracks the given particles in a single ``TRACK`` block and builds their dense
+    coordinates array from the ``TRACKONE`` and ``TRACKLOSS`` tables.
+    """
+    _run_track_block(madx, initial_coordinates, nturns, observation_points, **kwargs)
+    return _tracked_particles_from_tables(madx, len(initial_coordinates), nturns, observation_points)
+
+
+def _lost_turn_path(file_path: Path) -> Path:
+    """Path of the file with the lost turns of the particles, next to the coordinates file."""
+    return file_path.with_suffix(".lost.npy")
+
+
+def _checkpoint_path(file_path: Path) -> Path:
+    """Path of the tracking checkpoint file, next to the coordinates file."""
+    return file_path.with_suffix(".checkpoint.npz")
+
+
+def _tracking_fingerprint(
+    madx: Madx, /, initial_coordinates: np.ndarray, nturns: int, observation_points: Sequence[str], **kwargs
+) -> str:
+    """
+    .. versionadded:: 1.9.0
+
+    Hash of the machine and tracking inputs, identifying a tracking run across
+    processes. See `~.cpymadtools.track.track_particles_to_disk` for its content.
+    """
+    digest = hashlib.sha256()
+    sequence_name = madx._libmadx.get_active_sequence_name()
+    sequence = madx.sequence[sequence_name]
+    digest.update(sequence_name.encode())
+    digest.update("\n".join(sequence.expanded_element_names()).encode())
+    digest.update(np.asarray(sequence.expanded_element_positions(), dtype=float).tobytes())
+    digest.update(repr(sorted(sequence.beam.items())).encode())
+    digest.update(repr(sorted(madx.globals.items())).encode())
+    digest.update(np.ascontiguousarray(initial_coordinates).tobytes())
+    tracking = (nturns, list(observation_points), sorted((key.lower(), repr(value)) for key, value in kwargs.items()))
+    digest.update(repr(tracking).encode())
+    return digest.hexdigest()
+
+
+def _save_tracking_checkpoint(
+    file_path: Path, fingerprint: str, turn: int, coordinates: np.ndarray, lost_turn: np.ndarray
+) -> None:
+    """Atomically writes the tracking checkpoint, so an interruption never leaves a partial file."""
+    checkpoint_path = _checkpoint_path(file_path)
+    temporary_path = checkpoint_path.with_suffix(".tmp")
+    logger.trace(f"Writing tracking checkpoint at turn {turn} to '{checkpoint_path.absolute()}'")
+    with temporary_path.open("wb") as handle:
+        np.savez(handle, fingerprint=fingerprint, turn=turn, coordinates=coordinates, lost_turn=lost_turn)
+    temporary_path.replace(checkpoint_path)
+
+
+def _load_tracking_checkpoint(file_path: Path, fingerprint: str) -> tuple[int, np.ndarray, np.ndarray] | None:
+    """
+    .. versionadded:: 1.9.0
+
+    Loads the turn, coordinates and lost turns from the tracking checkpoint next to *file_path*,
+    or returns `None` if there is none. Raises if the checkpoint is from a different run.
+    """
+    checkpoint_path = _checkpoint_path(file_path)
+    if not checkpoint_path.is_file() or not file_path.is_file():
+        logger.debug(f"No tracking checkpoint found at '{checkpoint_path.absolute()}', starting from scratch")
+        return None
+
+    with np.load(checkpoint_path) as checkpoint:
+        if str(checkpoint["fingerprint"]) != fingerprint:
+            logger.error(
+                f"The tracking checkpoint at '{checkpoint_path.absolute()}' was written for a different machine "
+                "or tracking inputs, remove it or use a different file name."
+            )
+            msg = "Tracking checkpoint does not match the current run"
+            raise ValueError(msg)
+        return int(checkpoint["turn"]), checkpoint["coordinates"], checkpoint["lost_turn"]
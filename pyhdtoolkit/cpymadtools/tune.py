@@ -15,18 +15,41 @@ import sys
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-import matplotlib.collections
-import matplotlib.patches
 import numpy as np
+import pandas as pd
 import tfs
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.track import COORDINATES, track_particles_parallel
+from pyhdtoolkit.maths.frequency import get_tunes_from_tracking
+
 if TYPE_CHECKING:
+    import matplotlib.collections
     from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
+
+_FOOTPRINT_GRIDS: tuple[str, ...] = ("polar", "cartesian", "legacy")
+# The particles grid of make_footprint_table before 1.9.0: 14 angles from 0 to 97.5 degrees, from 0.1 sigma
+_LEGACY_N_ANGLES: int = 14
+_LEGACY_FIRST_AMPLITUDE: float = 0.1
 
 
 def make_footprint_table(
-    madx: Madx, /, sigma: float = 5, dense: bool = False, file: str | None = None, cleanup: bool = True, **kwargs
+    madx: Madx,
+    /,
+    sigma: float = 5,
+    dense: bool = False,
+    file: str | None = None,
+    cleanup: bool = True,
+    *,
+    amplitudes: ArrayLike | None = None,
+    spacing: str = "linear",
+    n_angles: int = 7,
+    grid: str = "polar",
+    engine: str = "dynap",
+    nturns: int = 1024,
+    processes: int | None = None,
+    **kwargs,
 ) -> tfs.TfsDataFrame:
     """
     .. versionadded:: 0.9.0
@@ -36,10 +59,34 @@ def make_footprint_table(
     their tunes. Particules are instantiated for different angle variables for each
     amplitude, creating an ensemble able to represent the tune footprint.
 
+    .. versionchanged:: 1.9.0
+        Added the *engine*, *nturns* and *processes* parameters. With the ``track``
+        engine, the same particles are tracked with the ``TRACK`` command across
+        worker processes (see `~.cpymadtools.track.track_particles_parallel`) and
+        their tunes are determined with `~pyhdtoolkit.maths.frequency.naff`, which
+        is much faster than ``DYNAP`` for dense footprints and does not write files
+        in the current working directory. The ``DTUNE`` column then holds the tune
+        variation between the first and second halves of the tracking.
+
+    .. versionchanged:: 1.9.0
+        Added the *amplitudes*, *spacing*, *n_angles* and *grid* parameters to
+        configure the particles grid, and the ``START`` commands are sent to
+        ``MAD-X`` in a single input. By default, particles start at amplitudes
+        from *dsigma* to *sigma* and 7 angles in 15 degrees steps, as described
+        by the table headers.
+
+    .. versionchanged:: 1.9.0
+        The default particles grid changed, which changes the resulting table for
+        the same inputs. Previous versions started particles at amplitudes from 0.1
+        to *sigma* + 1 bunch :math:`\\sigma` and at 14 angles from 0 to 97.5 degrees,
+        which the footprint helpers grouped incorrectly. This grid is still available
+        with ``grid="legacy"``, now with consistent headers.
+
     Warning
     -------
         Since the ``DYNAP`` command makes use of tracking, your sequence needs to
-        be sliced before calling this function.
+        be sliced before calling this function. The same applies to the ``track``
+        engine.
 
     Parameters
     ----------
@@ -49,16 +96,47 @@ def make_footprint_table(
         The maximum amplitude of the tracked particles, in bunch :math:`\\sigma`.
         Defaults to 5.
     dense : bool
-        If set to `True`, an increased number of particles will be tracked.
+        If set to `True`, an increased number of particles will be tracked, as
+        the amplitudes are increased by 0.5 instead of 1 bunch :math:`\\sigma`.
         Defaults to `False`.
     file : str, optional
         If given, the ``DYNAPTUNE`` table will be exported as a ``TFS`` file with
         the provided name.
     cleanup : bool
         If `True`, the **fort.69** and **lyapunov.data** files are cleared before
-        returning the ``DYNAPTUNE`` table. Defaults to `True`.
+        returning the ``DYNAPTUNE`` table. Defaults to `True`. Only relevant for
+        the ``dynap`` engine.
+    amplitudes : ArrayLike, optional
+        The starting amplitudes of the particles, in bunch :math:`\\sigma`, in
+        increasing order. If given, *sigma*, *dense* and *spacing* are ignored.
+        Keyword only.
+    spacing : str
+        How to space the default amplitudes up to *sigma*, either ``linear`` for
+        increments of 1 (or 0.5 if *dense*) or ``log`` for as many logarithmically
+        spaced amplitudes over the same range. Defaults to ``linear``. Keyword only.
+    n_angles : int
+        The number of starting angles for each amplitude, evenly spaced from the
+        horizontal to the vertical plane, for a ``polar`` grid. Defaults to 7.
+        Keyword only.
+    grid : str
+        The kind of particles grid, either ``polar`` for particles at *n_angles*
+        angles for each amplitude, ``cartesian`` for particles at each pair of
+        horizontal and vertical amplitudes, or ``legacy`` for the grid of versions
+        before 1.9.0 (in which case *n_angles* and *spacing* are ignored). Defaults
+        to ``polar``. Keyword only.
+    engine : str
+        How to determine the tunes of the particles, either ``dynap`` to use the
+        ``DYNAP`` command of ``MAD-X`` or ``track`` to track in parallel and analyse
+        the turn-by-turn data in Python. Defaults to ``dynap``. Keyword only.
+    nturns : int
+        The number of turns to track the particles for. Defaults to 1024.
+        Keyword only.
+    processes : int, optional
+        The number of worker processes of the ``track`` engine. Defaults to `None`,
+        which uses the number of CPUs of the machine. Keyword only.
     **kwargs
-        Any keyword argument will be transmitted to the ``DYNAP`` command in ``MAD-X``.
+        Any keyword argument will be transmitted to the ``DYNAP`` command in ``MAD-X``,
+        or to the ``TRACK`` command with the ``track`` engine.
 
     Returns
     -------
@@ -70,62 +148,47 @@ def make_footprint_table(
         .. code-block:: python
 
             dynap_dframe = make_footprint_table(madx, dense=True)
-    """
-    logger.debug(f"Initiating particules up to {sigma:d} bunch sigma to create a tune footprint table")
-    small, big = 0.05, math.sqrt(1 - 0.05**2)
-    sigma_multiplier, angle_multiplier = 0.1, 0.0
 
-    logger.debug("Initializing particles")
-    madx.command.track()
-    madx.command.start(fx=small, fy=small)
-    while sigma_multiplier <= sigma + 1:
-        angle = 15 * angle_multiplier * math.pi / 180
-        if angle_multiplier == 0:
-            madx.command.start(fx=sigma_multiplier * big, fy=sigma_multiplier * small)
-        elif angle_multiplier == 6:  # noqa: PLR2004
-            madx.command.start(fx=sigma_multiplier * small, fy=sigma_multiplier * big)
-        else:
-            madx.command.start(fx=sigma_multiplier * math.cos(angle), fy=sigma_multiplier * math.sin(angle))
-        angle_multiplier += 0.5
-        if int(angle_multiplier) == 7:  # noqa: PLR2004
-            angle_multiplier = 0
-            sigma_multiplier += 1 if not dense else 0.5
+        To track the particles on 8 processes instead of using ``DYNAP``:
 
-    logger.debug("Starting DYNAP tracking with initialized particles")
-    try:
-        madx.command.dynap(fastune=True, turns=1024, **kwargs)
-        madx.command.endtrack()
-    except RuntimeError as madx_crash:
-        logger.exception(
-            "Remote MAD-X process crashed, most likely because you did not slice the sequence "
-            "before running DYNAP. Restart and slice before calling this function."
-        )
-        msg = "DYNAP command crashed the MAD-X process"
-        raise RuntimeError(msg) from madx_crash
+        .. code-block:: python
 
-    if cleanup and sys.platform not in ("win32", "cygwin"):
-        # fails on Windows due to its I/O system, since MAD-X still has "control" of the files
-        try:
-            logger.debug("Cleaning up DYNAP output files `fort.69` and `lyapunov.data`")
-            Path("fort.69").unlink()
-            Path("lyapunov.data").unlink()
-        except FileNotFoundError:  # pragma: no cover  # this would be a MAD-X issue
-            logger.exception("Could not cleanup DYNAP output files, they might have not been created")
+            dynap_dframe = make_footprint_table(madx, dense=True, engine="track", processes=8)
+
+        To use 15 logarithmically spaced amplitudes up to 6 bunch sigma on 19 angles:
+
+        .. code-block:: python
+
+            dynap_dframe = make_footprint_table(madx, amplitudes=np.geomspace(0.1, 6, 15), n_angles=19)
+    """
+    if engine not in ("dynap", "track"):
+        logger.error(f"Invalid footprint engine '{engine}', options are 'dynap' and 'track'")
+        msg = "Invalid footprint engine"
+        raise ValueError(msg)
+
+    dsigma = 1 if not dense else 0.5
+    if amplitudes is not None:
+        amplitudes = np.asarray(amplitudes, dtype=float)
+        sigma = float(amplitudes.max())
+    else:
+        amplitudes = _get_default_amplitudes(sigma, dsigma, spacing, grid)
+    logger.debug(f"Initiating particules up to {sigma} bunch sigma to create a tune footprint table")
+    fx, fy = _get_footprint_amplitudes(amplitudes, n_angles, grid)
+
+    if engine == "dynap":
+        dynaptune = _dynap_footprint(madx, fx, fy, nturns, cleanup, **kwargs)
+    else:
+        dynaptune = _tracking_footprint(madx, fx, fy, nturns, processes, **kwargs)
 
     tfs_dframe = tfs.TfsDataFrame(
-        data=madx.table.dynaptune.dframe(),
+        data=dynaptune,
         headers={
             "NAME": "DYNAPTUNE",
             "TYPE": "DYNAPTUNE",
             "TITLE": "FOOTPRINT TABLE",
             "MADX_VERSION": str(madx.version).upper(),
             "ORIGIN": "pyhdtoolkit.cpymadtools.tune.make_footprint_table() function",
-            "ANGLE": 7,  # default of the function
-            "AMPLITUDE": sigma,
-            "DSIGMA": 1 if not dense else 0.5,
-            "ANGLE_MEANING": "Number of different starting angles used for each starting amplitude",
-            "AMPLITUDE_MEANING": "Up to which bunch sigma the starting amplitudes were ramped up",
-            "DSIGMA_MEANING": "Increment value of AMPLITUDE at each new starting amplitude",
+            **_get_footprint_grid_headers(amplitudes, sigma, dsigma, n_angles, grid),
         },
     )
     tfs_dframe = tfs_dframe.reset_index(drop=True)
@@ -136,6 +199,138 @@ def make_footprint_table(
     return tfs_dframe
 
 
+def make_detuning_footprint_table(
+    ampdet_dframe: tfs.TfsDataFrame,
+    /,
+    ex: float,
+    ey: float,
+    sigma: float = 5,
+    dense: bool = False,
+    *,
+    file: str | None = None,
+    amplitudes: ArrayLike | None = None,
+    spacing: str = "linear",
+    n_angles: int = 7,
+    grid: str = "polar",
+) -> tfs.TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Predicts the tune footprint of the machine from its amplitude detuning
+    coefficients, as returned by `~.cpymadtools.ptc.get_amplitude_detuning`,
+    without any tracking. Particles are placed on the same grid of amplitudes
+    and angles as in `~.cpymadtools.tune.make_footprint_table`, and their tunes
+    are given by the Taylor expansion of the tunes in the actions
+    :math:`\\epsilon_{x,y} = 2J_{x,y}`,
+
+    .. math::
+
+        Q_{x,y}(\\epsilon_x, \\epsilon_y) = Q_{x,y} + \\sum_{i,j}
+        \\frac{1}{i!j!} \\frac{\\partial^{i+j} Q_{x,y}}{\\partial \\epsilon_x^i
+        \\partial \\epsilon_y^j} \\epsilon_x^i \\epsilon_y^j,
+
+    with :math:`\\epsilon_x = f_x^2 \\epsilon_{x,\\mathrm{beam}}` for a particle at
+    :math:`f_x` bunch :math:`\\sigma`, and similarly vertically. This is evaluated
+    for all particles at once and is very fast, which makes it suitable to quickly
+    check the effect of different settings, but it does not include any resonance
+    or higher order effect.
+
+    Parameters
+    ----------
+    ampdet_dframe : tfs.TfsDataFrame
+        The amplitude detuning table, as returned by `~.cpymadtools.ptc.get_amplitude_detuning`,
+        with the ``Q1`` and ``Q2`` tunes and the ``ANHX`` and ``ANHY`` coefficients
+        of first and / or second order. Terms depending on the momentum deviation are
+        ignored. Positional only.
+    ex : float
+        The horizontal geometric emittance of the beam, in [m], as the ``EX`` attribute
+        of a ``BEAM`` in ``MAD-X``.
+    ey : float
+        The vertical geometric emittance of the beam, in [m], as the ``EY`` attribute
+        of a ``BEAM`` in ``MAD-X``.
+    sigma : float
+        The maximum amplitude of the particles, in bunch :math:`\\sigma`. Defaults to 5.
+    dense : bool
+        If set to `True`, the amplitudes are increased by 0.5 instead of 1 bunch
+        :math:`\\sigma`. Defaults to `False`.
+    file : str, optional
+        If given, the table will be exported as a ``TFS`` file with the provided name.
+        Keyword only.
+    amplitudes : ArrayLike, optional
+        The amplitudes of the particles, in bunch :math:`\\sigma`, in increasing order.
+        If given, *sigma*, *dense* and *spacing* are ignored. Keyword only.
+    spacing : str
+        How to space the default amplitudes up to *sigma*, either ``linear`` or ``log``,
+        see `~.cpymadtools.tune.make_footprint_table`. Defaults to ``linear``. Keyword only.
+    n_angles : int
+        The number of angles for each amplitude, for a ``polar`` grid. Defaults to 7.
+        Keyword only.
+    grid : str
+        The kind of particles grid, either ``polar`` or ``cartesian``, see
+        `~.cpymadtools.tune.make_footprint_table`. Defaults to ``polar``. Keyword only.
+
+    Returns
+    -------
+    tfs.TfsDataFrame
+        A table with the headers of a ``DYNAPTUNE`` table from `~.cpymadtools.tune.make_footprint_table`,
+        and for each particle its normalised amplitudes ``fx`` and ``fy`` in bunch :math:`\\sigma`
+        and its tunes ``tunx`` and ``tuny``. It can be given to `~.cpymadtools.tune.get_footprint_lines`
+        and `~.cpymadtools.tune.get_footprint_patches`.
+
+    Example
+    -------
+        .. code-block:: python
+
+            ampdet_dframe = get_amplitude_detuning(madx, order=2)
+            beam = madx.sequence.lhcb1.beam
+            footprint = make_detuning_footprint_table(ampdet_dframe, beam.ex, beam.ey, sigma=6)
+            qxs, qys = get_footprint_lines(footprint)
+    """
+    logger.debug("Extracting tunes and detuning coefficients from the amplitude detuning table")
+    names = ampdet_dframe.NAME.to_numpy(dtype=str)
+    orders = ampdet_dframe[["ORDER1", "ORDER2", "ORDER3", "ORDER4"]].to_numpy(dtype=int)
+    values = ampdet_dframe.VALUE.to_numpy(dtype=float)
+    if not {"Q1", "Q2"} <= set(names):
+        logger.error("The amplitude detuning table should contain the 'Q1' and 'Q2' tunes")
+        msg = "Invalid amplitude detuning table"
+        raise ValueError(msg)
+
+    dsigma = 1 if not dense else 0.5
+    if amplitudes is not None:
+        amplitudes = np.asarray(amplitudes, dtype=float)
+        sigma = float(amplitudes.max())
+    else:
+        amplitudes = _get_default_amplitudes(sigma, dsigma, spacing, grid)
+    fx, fy = _get_footprint_amplitudes(amplitudes, n_angles, grid)
+
+    logger.debug(f"Evaluating the detuning of {len(fx)} particles")
+    actions = np.stack([fx**2 * ex, fy**2 * ey], axis=-1)  # 2J of each particle
+    tunes = np.stack([np.full(len(fx), values[names == "Q1"][0]), np.full(len(fx), values[names == "Q2"][0])], axis=-1)
+    for plane, name in enumerate(("ANHX", "ANHY")):
+        terms = (names == name) & ~orders[:, 2:].any(axis=1)  # not the momentum dependent terms
+        powers = orders[terms, :2]
+        coefficients = values[terms] / np.prod([[math.factorial(power) for power in row] for row in powers], axis=1)
+        tunes[:, plane] += np.prod(actions[:, np.newaxis, :] ** powers, axis=-1) @ coefficients
+
+    tfs_dframe = tfs.TfsDataFrame(
+        data={"fx": fx, "fy": fy, "tunx": tunes[:, 0], "tuny": tunes[:, 1]},
+        headers={
+            "NAME": "DYNAPTUNE",
+            "TYPE": "DYNAPTUNE",
+            "TITLE": "DETUNING FOOTPRINT TABLE",
+            "ORIGIN": "pyhdtoolkit.cpymadtools.tune.make_detuning_footprint_table() function",
+            **_get_footprint_grid_headers(amplitudes, sigma, dsigma, n_angles, grid),
+            "EX": ex,
+            "EY": ey,
+        },
+    )
+
+    if file is not None:
+        tfs.write(Path(file).absolute(), tfs_dframe)
+
+    return tfs_dframe
+
+
 def get_footprint_lines(dynap_dframe: tfs.TfsDataFrame) -> tuple[np.ndarray, np.ndarray]:
     """
     .. versionadded:: 0.12.0
@@ -146,12 +341,16 @@ def get_footprint_lines(dynap_dframe: tfs.TfsDataFrame) -> tuple[np.ndarray, np.
     different amplitudes and angles from starting particles, and returns
     these in immediately plottable `numpy.ndarray` objects.
 
-    Warning
-    -------
-        This function is some *dark magic* stuff I have taken out of very dusty
-        drawers, and I cannot explain exactly how most of it works under the hood.
-        I also do not know who wrote this initially. Results are not guaranteed
-        to be correct and should always be checked with a quick plot.
+    Note
+    ----
+        The tunes are arranged in an (amplitude, angle) grid, the first amplitude
+        being the particle close to the reference orbit. The points then follow
+        a single meshed line going along every other amplitude forth and back
+        through the angles, then along every other angle up and down through the
+        amplitudes, so that all grid lines are drawn in one plot call.
+
+    .. versionchanged:: 1.9.0
+        The points are determined with array operations on the tunes grid.
 
     Parameters
     ----------
@@ -173,15 +372,9 @@ def get_footprint_lines(dynap_dframe: tfs.TfsDataFrame) -> tuple[np.ndarray, np.
             plt.plot(qxs, qys, "o--", label="Tune Footprint from DYNAP Table")
     """
     logger.debug("Determining footprint plottable")
-    logger.debug("Retrieving AMPLITUDE, ANGLE and DSIGMA data from TfsDataFrame headers")
-    amplitude = dynap_dframe.headers["AMPLITUDE"]
-    angle = dynap_dframe.headers["ANGLE"]
-    dsigma = dynap_dframe.headers["DSIGMA"]
-
-    tune_groups = _make_tune_groups(dynap_dframe)
-    footprint = _Footprint(tune_groups, amplitude, angle, dsigma)
-    qxs, qys = footprint.get_plottable()
-    return np.array(qxs, dtype=float), np.array(qys, dtype=float)
+    tunes = _get_tunes_grid(dynap_dframe)
+    amplitudes, angles = _get_meshed_line_indices(*tunes.shape[:2])
+    return tunes[amplitudes, angles, 0], tunes[amplitudes, angles, 1]
 
 
 def get_footprint_patches(dynap_dframe: tfs.TfsDataFrame) -> matplotlib.collections.PatchCollection:
@@ -225,134 +418,273 @@ def get_footprint_patches(dynap_dframe: tfs.TfsDataFrame) -> matplotlib.collecti
             footprint_polygons = get_footprint_patches(dynap_tfs)
             axis.add_collection(footprint_polygons)
     """
+    import matplotlib.collections  # noqa: PLC0415
+    import matplotlib.patches  # noqa: PLC0415
+
     logger.debug("Determining footprint polygons")
     angle = dynap_dframe.headers["ANGLE"]
-    amplitude = dynap_dframe.headers["AMPLITUDE"]
+    amplitude = dynap_dframe.headers.get("NAMPLITUDES", dynap_dframe.headers["AMPLITUDE"])
 
     logger.debug("Grouping tune points according to starting angles and amplitudes")
-    try:
-        a = np.zeros([amplitude, angle, 2])
-        a[0, :, 0] = dynap_dframe["tunx"].to_numpy()[0]
-        a[0, :, 1] = dynap_dframe["tuny"].to_numpy()[0]
-        a[1:, :, 0] = dynap_dframe["tunx"].to_numpy()[1:].reshape(-1, angle)
-        a[1:, :, 1] = dynap_dframe["tuny"].to_numpy()[1:].reshape(-1, angle)
-    except ValueError as dynap_error:
-        logger.exception(
+    if len(dynap_dframe) != 1 + (amplitude - 1) * angle:
+        logger.error(
             "Cannot group tune points according to starting angles and amplitudes. Try changing "
             "the 'AMPLITUDE' value in the provided TfsDataFrame's headers."
         )
         msg = "Invalid AMPLITUDE value in the provided TfsDataFrame headers"
-        raise ValueError(msg) from dynap_error
+        raise ValueError(msg)
+    tunes = _get_tunes_grid(dynap_dframe)
 
     logger.debug("Determining polygon vertices")
-    sx = a.shape[0] - 1
-    sy = a.shape[1] - 1
-    p1 = a[:-1, :-1, :].reshape(sx * sy, 2)[:, :]
-    p2 = a[1:, :-1, :].reshape(sx * sy, 2)[:]
-    p3 = a[1:, 1:, :].reshape(sx * sy, 2)[:]
-    p4 = a[:-1, 1:, :].reshape(sx * sy, 2)[:]
-    polygons = np.stack((p1, p2, p3, p4))  # Stack endpoints to form polygons
-    polygons = np.transpose(polygons, (1, 0, 2))  # transpose polygons
+    # Each polygon joins neighbouring amplitudes and angles of the grid, in order
+    polygons = np.stack((tunes[:-1, :-1], tunes[1:, :-1], tunes[1:, 1:], tunes[:-1, 1:]), axis=2).reshape(-1, 4, 2)
+    patch_colors = np.zeros((amplitude - 1, angle - 1, 3))
+    patch_colors[..., 2] = 1  # blue by default
+    patch_colors[-1] = (0, 1, 0)  # differentiate last amplitude in green
+    patch_colors[:, -1] = (1, 0, 0)  # differentiate last angle in red
 
     logger.debug("Creating PatchCollection of Polygons")
-    patches = list(map(matplotlib.patches.Polygon, polygons))
-    patch_colors = [(0, 0, 1) for _ in polygons]
-    patch_colors[(sx - 1) * sy :] = [(0, 1, 0)] * sy  # differentiate first angle in green
-    patch_colors[(sy - 1) :: sy] = [(1, 0, 0)] * sx  # differentiate last amplitude in red
-    return matplotlib.collections.PatchCollection(patches, facecolors=[], edgecolor=patch_colors)
+    patches = [matplotlib.patches.Polygon(polygon) for polygon in polygons]
+    return matplotlib.collections.PatchCollection(patches, facecolors=[], edgecolor=patch_colors.reshape(-1, 3))
 
 
-# ----- Arcane Private Utilities ----- #
+# ----- Footprint Helpers ----- #
 
 
-def _make_tune_groups(dynap_dframe: tfs.TfsDataFrame) -> list[list[dict[str, float]]]:
+def _get_default_amplitudes(sigma: float, dsigma: float, spacing: str, grid: str = "polar") -> np.ndarray:
     """
-    Creates appropriate tune points groups from the ``DYNAP`` `~tfs.frame.TfsDataFrame`
-    based on starting amplitude and angle for each particle.
+    .. versionadded:: 1.9.0
 
-    Parameters
-    ----------
-    dynap_dframe : tfs.TfsDataFrame
-        The dynap data frame returned by `~.tune.make_footprint_table`.
+    Returns the default starting amplitudes of `~.tune.make_footprint_table`, from
+    *dsigma* to *sigma* with increments of *dsigma*, or as many amplitudes spaced
+    logarithmically over the same range. The ``legacy`` grid has amplitudes from
+    0.1 up to *sigma* + 1 with increments of *dsigma*, as in versions before 1.9.0.
+    """
+    if spacing not in ("linear", "log"):
+        logger.error(f"Invalid amplitudes spacing '{spacing}', options are 'linear' and 'log'")
+        msg = "Invalid amplitudes spacing"
+        raise ValueError(msg)
+    if grid == "legacy":
+        return _LEGACY_FIRST_AMPLITUDE + dsigma * np.arange(math.floor((sigma + 0.9) / dsigma + 1e-9) + 1)
+
+    namplitudes = round(sigma / dsigma)
+    if namplitudes < 1:
+        logger.error(f"No starting amplitude up to 'sigma={sigma}' with increments of {dsigma}")
+        msg = "The 'sigma' amplitude should be at least half of the amplitudes increment"
+        raise ValueError(msg)
+    if spacing == "log":
+        return np.geomspace(dsigma, sigma, namplitudes)
+    return dsigma * np.arange(1, namplitudes + 1)
+
+
+def _get_footprint_amplitudes(amplitudes: np.ndarray, n_angles: int, grid: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the horizontal and vertical normalised amplitudes, in bunch :math:`\\sigma`,
+    of the particles of a footprint: a particle close to the reference orbit followed,
+    for each of the *amplitudes*, by particles at *n_angles* angles from the horizontal
+    to the vertical plane (``polar`` grid), at each of the *amplitudes* vertically
+    (``cartesian`` grid) or at 14 angles from 0 to 97.5 degrees (``legacy`` grid).
+    Particles are never exactly in one plane, as ``DYNAP`` needs some motion in both
+    planes.
+    """
+    if grid not in _FOOTPRINT_GRIDS:
+        logger.error(f"Invalid footprint grid '{grid}', options are {_FOOTPRINT_GRIDS}")
+        msg = "Invalid footprint grid"
+        raise ValueError(msg)
+    if n_angles < 2:  # noqa: PLR2004
+        logger.error(f"At least 2 starting angles are needed for a footprint, got {n_angles}")
+        msg = "Invalid number of starting angles"
+        raise ValueError(msg)
 
-    Returns
-    -------
-    list[list[dict[str, float]]]
-        A `list` of lists of dictionaries containing horizontal and vertical tune points.
-        The data is constructed such that one can access the data of a particle starting
-        with given amplitude and angle through ``data[amplitude][angle]["H"/"V"]``. This
-        function is only meant to be used internally by `~.tune.get_footprint_lines`.
+    small, big = 0.05, math.sqrt(1 - 0.05**2)
+    if grid == "polar":
+        angles = np.linspace(0, np.pi / 2, n_angles)
+        cosines, sines = np.cos(angles), np.sin(angles)
+        cosines[0], sines[0] = big, small
+        cosines[-1], sines[-1] = small, big
+        fx, fy = np.outer(amplitudes, cosines), np.outer(amplitudes, sines)
+    elif grid == "legacy":  # the last angle goes beyond the vertical plane
+        angles = np.deg2rad(7.5 * np.arange(_LEGACY_N_ANGLES))
+        cosines, sines = np.cos(angles), np.sin(angles)
+        cosines[0], sines[0] = big, small
+        cosines[-2], sines[-2] = small, big
+        fx, fy = np.outer(amplitudes, cosines), np.outer(amplitudes, sines)
+    else:
+        fx, fy = np.meshgrid(amplitudes, amplitudes, indexing="ij")
+    return np.concatenate([[small], fx.ravel()]), np.concatenate([[small], fy.ravel()])
+
+
+def _get_footprint_grid_headers(
+    amplitudes: np.ndarray, sigma: float, dsigma: float, n_angles: int, grid: str
+) -> dict[str, int | float | str]:
     """
-    logger.debug("Constructing tune points groups based on starting amplitudes and angles")
-    amplitude = dynap_dframe.headers["AMPLITUDE"]
+    .. versionadded:: 1.9.0
+
+    Returns the headers describing the particles grid of a footprint table, which
+    `~.tune.get_footprint_lines` and `~.tune.get_footprint_patches` rely on.
+    """
+    return {
+        "ANGLE": {"polar": n_angles, "legacy": _LEGACY_N_ANGLES}.get(grid, len(amplitudes)),
+        "AMPLITUDE": sigma,
+        "DSIGMA": dsigma,
+        "NAMPLITUDES": len(amplitudes) + 1,
+        "GRID": grid.upper(),
+        "ANGLE_MEANING": "Number of different starting angles used for each starting amplitude",
+        "AMPLITUDE_MEANING": "Up to which bunch sigma the starting amplitudes were ramped up",
+        "DSIGMA_MEANING": "Increment value of AMPLITUDE at each new starting amplitude",
+        "NAMPLITUDES_MEANING": "Number of starting amplitudes, including the particle close to the orbit",
+        "GRID_MEANING": "Polar (amplitude, angle), cartesian (horizontal, vertical amplitude) or legacy grid",
+    }
+
+
+def _get_initial_coordinates(madx: Madx, /, fx: np.ndarray, fy: np.ndarray) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the ``(N, 6)`` initial coordinates of particles at the given normalised
+    amplitudes, in bunch :math:`\\sigma`, from the (uncoupled) optics at the start of
+    the sequence in use and the emittances of its beam. As with the ``FX`` and ``FY``
+    attributes of ``START`` in ``MAD-X``, particles start at the phase of maximum
+    position, relative to the closed orbit.
+    """
+    logger.debug("Computing optics at the start of the machine for the particles initialization")
+    sequence = madx._libmadx.get_active_sequence_name()  # noqa: SLF001
+    beam = madx.sequence[sequence].beam
+    twiss = madx.twiss()
+    betx, alfx, bety, alfy = (twiss[column][0] for column in ("betx", "alfx", "bety", "alfy"))
+
+    initial_coordinates = np.zeros((len(fx), len(COORDINATES)))
+    initial_coordinates[:, 0] = fx * np.sqrt(beam.ex * betx)
+    initial_coordinates[:, 1] = -fx * np.sqrt(beam.ex / betx) * alfx
+    initial_coordinates[:, 2] = fy * np.sqrt(beam.ey * bety)
+    initial_coordinates[:, 3] = -fy * np.sqrt(beam.ey / bety) * alfy
+    return initial_coordinates
+
+
+def _dynap_footprint(
+    madx: Madx, /, fx: np.ndarray, fy: np.ndarray, nturns: int, cleanup: bool, **kwargs
+) -> pd.DataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Runs ``DYNAP`` for particles at the given normalised amplitudes and returns
+    the resulting ``DYNAPTUNE`` table, for `~.tune.make_footprint_table`.
+    """
+    logger.debug(f"Initializing {len(fx)} particles with a single input")
+    madx.command.track()
+    madx.input("\n".join(f"start, fx={x!r}, fy={y!r};" for x, y in zip(fx.tolist(), fy.tolist(), strict=True)))
+
+    logger.debug("Starting DYNAP tracking with initialized particles")
+    try:
+        madx.command.dynap(fastune=True, turns=nturns, **kwargs)
+        madx.command.endtrack()
+    except RuntimeError as madx_crash:
+        logger.exception(
+            "Remote MAD-X process crashed, most likely because you did not slice the sequence "
+            "before running DYNAP. Restart and slice before calling this function."
+        )
+        msg = "DYNAP command crashed the MAD-X process"
+        raise RuntimeError(msg) from madx_crash
+
+    if cleanup and sys.platform not in ("win32", "cygwin"):
+        # fails on Windows due to its I/O system, since MAD-X still has "control" of the files
+        try:
+            logger.debug("Cleaning up DYNAP output files `fort.69` and `lyapunov.data`")
+            Path("fort.69").unlink()
+            Path("lyapunov.data").unlink()
+        except FileNotFoundError:  # pragma: no cover  # this would be a MAD-X issue
+            logger.exception("Could not cleanup DYNAP output files, they might have not been created")
+    return madx.table.dynaptune.dframe()
+
+
+def _tracking_footprint(
+    madx: Madx, /, fx: np.ndarray, fy: np.ndarray, nturns: int, processes: int | None, **kwargs
+) -> pd.DataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Tracks particles at the given normalised amplitudes across worker processes,
+    and returns a table with the columns of ``DYNAPTUNE``, for `~.tune.make_footprint_table`.
+    """
+    initial_coordinates = _get_initial_coordinates(madx, fx, fy)
+    tracks = track_particles_parallel(madx, initial_coordinates, nturns, processes=processes, **kwargs)
+
+    logger.debug("Determining tunes from the turn-by-turn data")
+    coordinates = tracks.coordinates[0, :, 1:]  # the turns after the initial coordinates
+    qx, qy = get_tunes_from_tracking(coordinates)
+    half = nturns // 2
+    first_qx, first_qy = get_tunes_from_tracking(coordinates[:, :half])
+    second_qx, second_qy = get_tunes_from_tracking(coordinates[:, half : 2 * half])
+    return pd.DataFrame(
+        {
+            "x": initial_coordinates[:, 0],
+            "y": initial_coordinates[:, 2],
+            "tunx": qx,
+            "tuny": qy,
+            "dtune": np.hypot(second_qx - first_qx, second_qy - first_qy),
+        }
+    )
+
+
+def _get_tunes_grid(dynap_dframe: tfs.TfsDataFrame) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Arranges the tunes of the ``DYNAPTUNE`` `~tfs.frame.TfsDataFrame` in an array of
+    shape ``(AMPLITUDE, ANGLE, 2)`` according to the starting amplitude and angle of
+    the particles, from the headers. The first amplitude is the particle close to the
+    reference orbit, repeated for all angles, and the last axis holds :math:`Q_x` and
+    :math:`Q_y`. Rows beyond the ones needed for the grid are ignored. The number of
+    amplitudes is read from ``NAMPLITUDES``, or from ``AMPLITUDE`` for tables written
+    before this header was added.
+    """
+    logger.debug("Constructing tunes grid based on starting amplitudes and angles")
+    amplitude = dynap_dframe.headers.get("NAMPLITUDES", dynap_dframe.headers["AMPLITUDE"])
     angle = dynap_dframe.headers["ANGLE"]
-    tunx = dynap_dframe["tunx"].to_numpy()
-    tuny = dynap_dframe["tuny"].to_numpy()
-
-    tune_groups: list[list[dict[str, float]]] = []
-    tune_groups.append([{"H": float(tunx[0]), "V": float(tuny[0])}])
-
-    for n in range(1, amplitude):
-        group = []
-        for m in range(angle):
-            idx = 1 + (n - 1) * angle + m
-            group.append({"H": float(tunx[idx]), "V": float(tuny[idx])})
-        tune_groups.append(group)
-
-    return tune_groups
-
-
-class _Footprint:
-    """More dark magic from the past here, close your eyes my friends."""
-
-    def __init__(self, tune_groups: list[list[dict[str, float]]], amplitude: int, angle: int, dsigma: float) -> None:
-        self._tunes = tune_groups
-        self._maxnangl = angle
-        self._nampl = amplitude
-        self._dSigma = dsigma
-
-    def get_h_tune(self, ampl: int, angl: int) -> float:
-        if len(self._tunes[ampl]) <= angl < self._maxnangl:
-            return self._tunes[ampl][len(self._tunes[ampl]) - 1]["H"]
-        return self._tunes[ampl][angl]["H"]
-
-    def get_v_tune(self, ampl: int, angl: int) -> float:
-        if len(self._tunes[ampl]) <= angl < self._maxnangl:
-            return self._tunes[ampl][len(self._tunes[ampl]) - 1]["V"]
-        return self._tunes[ampl][angl]["V"]
-
-    def get_plottable(self) -> tuple[list[float], list[float]]:  # noqa: PLR0912
-        qxs, qys = [], []
-        for i in range(0, self._nampl - 1, 2):
-            for j in range(self._maxnangl):
-                qxs.append(self.get_h_tune(i, j))
-                qys.append(self.get_v_tune(i, j))
-            for j in range(self._maxnangl - 1, -1, -1):
-                qxs.append(self.get_h_tune(i + 1, j))
-                qys.append(self.get_v_tune(i + 1, j))
-        if self._nampl % 2 == 0:  # pragma: no cover
-            for j in range(0, self._maxnangl - 1, 2):
-                for i in range(self._nampl - 1, -1, -1):
-                    qxs.append(self.get_h_tune(i, j))
-                    qys.append(self.get_v_tune(i, j))
-                for i in range(0, self._nampl, 1):
-                    qxs.append(self.get_h_tune(i, j + 1))
-                    qys.append(self.get_v_tune(i, j + 1))
-            if self._maxnangl % 2 != 0:  # pragma: no cover
-                for i in range(self._nampl - 1, -1, -1):
-                    qxs.append(self.get_h_tune(i, self._maxnangl - 1))
-                    qys.append(self.get_v_tune(i, self._maxnangl - 1))
-                qxs.append(self.get_h_tune(0, self._maxnangl - 2))
-                qys.append(self.get_v_tune(0, self._maxnangl - 2))
-        else:
-            for j in range(self._maxnangl):
-                qxs.append(self.get_h_tune(self._nampl - 1, j))
-                qys.append(self.get_v_tune(self._nampl - 1, j))
-            for j in range(self._maxnangl - 1, -1, -2):
-                for i in range(self._nampl - 1, -1, -1):
-                    qxs.append(self.get_h_tune(i, j))
-                    qys.append(self.get_v_tune(i, j))
-                for i in range(0, self._nampl, 1):
-                    qxs.append(self.get_h_tune(i, j - 1))
-                    qys.append(self.get_v_tune(i, j - 1))
-        return qxs, qys
+    tunes = dynap_dframe[["tunx", "tuny"]].to_numpy(dtype=float)
+    return np.concatenate(
+        (np.broadcast_to(tunes[0], (1, angle, 2)), tunes[1 : 1 + (amplitude - 1) * angle].reshape(-1, angle, 2))
+    )
+
+
+def _get_meshed_line_indices(namplitudes: int, nangles: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the amplitude and angle indices of the points of the tunes grid (see
+    `~.tune._get_tunes_grid`) to visit, in order, to draw all lines of the grid as
+    a single line. This first goes along every other amplitude forth and back through
+    the angles, then along every other angle down and up through the amplitudes. A
+    negative angle index refers to the last angle.
+    """
+    amplitudes, angles = _zigzag(np.arange(0, namplitudes - 1, 2), 1, nangles, reverse_first=False)
+    last_amplitude, all_angles = np.full(nangles, namplitudes - 1), np.arange(nangles)
+
+    if namplitudes % 2 == 0:  # the amplitudes pass ended on the last amplitude, going backwards
+        zigzag_angles, zigzag_amplitudes = _zigzag(np.arange(0, nangles - 1, 2), 1, namplitudes, reverse_first=True)
+        segments = [(amplitudes, angles), (zigzag_amplitudes, zigzag_angles)]
+        if nangles % 2 != 0:
+            last_angle = np.full(namplitudes, nangles - 1)
+            segments += [(np.arange(namplitudes)[::-1], last_angle), (np.array([0]), np.array([nangles - 2]))]
+    else:  # the last amplitude was not visited yet
+        zigzag_angles, zigzag_amplitudes = _zigzag(np.arange(nangles - 1, -1, -2), -1, namplitudes, reverse_first=True)
+        segments = [(amplitudes, angles), (last_amplitude, all_angles), (zigzag_amplitudes, zigzag_angles)]
+
+    return tuple(np.concatenate(indices) for indices in zip(*segments, strict=True))
+
+
+def _zigzag(lines: np.ndarray, offset: int, size: int, reverse_first: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    For each index *l* in *lines*, visits the *size* positions of line *l* in one
+    direction then the ones of line *l + offset* in the other direction. Returns
+    the line and position indices of all visited points.
+    """
+    positions = np.arange(size)
+    first, second = (positions[::-1], positions) if reverse_first else (positions, positions[::-1])
+    line_indices = (lines[:, np.newaxis] + np.repeat([0, offset], size)).ravel()
+    position_indices = np.tile(np.concatenate((first, second)), len(lines))
+    return line_indices, position_indices
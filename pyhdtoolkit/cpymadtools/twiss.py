@@ -12,17 +12,22 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import pandas as pd
 import tfs
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.cache import _get_twiss_data
 from pyhdtoolkit.cpymadtools.constants import DEFAULT_TWISS_COLUMNS
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
+    import numpy as np
     from cpymad.madx import Madx
     from tfs import TfsDataFrame
 
+    from pyhdtoolkit.cpymadtools.cache import _TwissData
+
 
 # ----- Utlites ----- #
 
@@ -109,16 +114,20 @@ def get_pattern_twiss(
     madx.twiss(**kwargs)
 
     logger.trace("Extracting relevant parts of the TWISS table")
-    twiss_df = tfs.TfsDataFrame(madx.table.twiss.dframe())
-    twiss_df.headers = {var.upper(): madx.table.summ[var][0] for var in madx.table.summ}
-    twiss_df: TfsDataFrame = twiss_df[madx.table.twiss.selected_columns()].iloc[madx.table.twiss.selected_rows()]
+    table = madx.table.twiss
+    rows = table.selected_rows()
+    twiss_df = _columns_to_tfs(
+        {column: table.column(column, rows=rows) for column in table.selected_columns()},
+        index=table.row_names(rows),
+        headers=_get_summ_headers(madx),
+    )
 
     logger.trace("Clearing 'TWISS' flag")
     madx.select(flag="twiss", clear=True)
     return twiss_df
 
 
-def get_twiss_tfs(madx: Madx, /, **kwargs) -> tfs.TfsDataFrame:
+def get_twiss_tfs(madx: Madx, /, columns: Sequence[str] | None = None, **kwargs) -> tfs.TfsDataFrame:
     """
     .. versionadded:: 0.8.3
 
@@ -127,10 +136,23 @@ def get_twiss_tfs(madx: Madx, /, **kwargs) -> tfs.TfsDataFrame:
     outputting the `TWISS` (uppercase names, colnames, ``SUMM`` table in headers).
     This will call the `TWISS` command first before returning the dframe to you.
 
+    Tip
+    ---
+        On large (sliced) sequences, the ``TWISS`` table holds hundreds of
+        columns and tens of thousands of rows. If only a few of them are needed,
+        provide the *columns* parameter: only these columns are then transferred
+        from the ``MAD-X`` process, which is significantly faster and lighter on
+        memory than exporting the full table.
+
     Parameters
     ----------
     madx : cpymad.madx.Madx
         An instanciated `~cpymad.madx.Madx` object. Positional only.
+    columns : Sequence[str], optional
+        If provided, only these columns (case insensitive) are retrieved
+        from the ``TWISS`` table. The ``NAME`` column is always retrieved
+        as it is used for the index. Defaults to `None`, which retrieves
+        all columns of the table.
     **kwargs
         Any keyword argument that can be given to the ``MAD-X`` ``TWISS`` command,
         such as `chrom`, `ripken`, `centre`; or starting values for `betx`, `bety`
@@ -147,16 +169,84 @@ def get_twiss_tfs(madx: Madx, /, **kwargs) -> tfs.TfsDataFrame:
         .. code-block:: python
 
             twiss_df = get_twiss_tfs(madx, chrom=True, ripken=True)
+
+        To only retrieve a few columns from a large ``TWISS`` table:
+
+        .. code-block:: python
+
+            twiss_df = get_twiss_tfs(madx, columns=["s", "betx", "bety", "dx"])
     """
     logger.trace("Clearing 'TWISS' flag")
     madx.select(flag="twiss", clear=True)
-    madx.command.twiss(**kwargs)
+    if columns is not None:  # the NAME column is always needed for the index
+        columns = list(dict.fromkeys(["name", *(column.lower() for column in columns)]))
+    twiss_data = _get_twiss_data(madx, columns, **kwargs)
 
     logger.debug("Exporting internal TWISS and SUMM tables to TfsDataFrame")
-    twiss_tfs = tfs.TfsDataFrame(madx.table.twiss.dframe())
-    twiss_tfs.name = twiss_tfs.name.str[:-2]  # remove :1 from names
-    twiss_tfs.columns = twiss_tfs.columns.str.upper()
-    twiss_tfs: TfsDataFrame = twiss_tfs.set_index("NAME")  # ty:ignore[invalid-assignment]
-    twiss_tfs.index = twiss_tfs.index.str.upper()
-    twiss_tfs.headers = {var.upper(): madx.table.summ[var][0] for var in madx.table.summ}
-    return twiss_tfs
+    return _twiss_data_to_tfs(twiss_data)
+
+
+# ----- Helpers ----- #
+
+
+def _twiss_data_to_tfs(twiss_data: _TwissData, /) -> TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Exports data retrieved from the internal ``TWISS`` table to a
+    `~tfs.frame.TfsDataFrame` with uppercase column names, element
+    names as index and the ``SUMM`` table as headers. The dataframe
+    is built once from the retrieved arrays.
+
+    Parameters
+    ----------
+    twiss_data : _TwissData
+        The ``TWISS`` table data, as returned by the helpers of
+        `~.cpymadtools.cache`. It must hold the ``name`` column.
+
+    Returns
+    -------
+    tfs.TfsDataFrame
+        The ``TWISS`` table as a `~tfs.frame.TfsDataFrame`.
+    """
+    names = twiss_data.columns["name"]
+    return _columns_to_tfs(
+        {column.upper(): values for column, values in twiss_data.columns.items() if column != "name"},
+        index=pd.Index(names, name="NAME").str[:-2].str.upper(),  # remove :1 from names
+        headers={var.upper(): value for var, value in twiss_data.summ.items()},
+    )
+
+
+def _columns_to_tfs(data: dict[str, np.ndarray], index: Sequence | pd.Index, headers: dict) -> TfsDataFrame:
+    """
+    .. versionadded:: 1.9.0
+
+    Builds a `~tfs.frame.TfsDataFrame` in a single go from columns
+    retrieved as `~numpy.ndarray` objects from a ``MAD-X`` table.
+    The arrays are not copied when building the dataframe.
+
+    Parameters
+    ----------
+    data : dict[str, np.ndarray]
+        The columns data, as a mapping of column name to array.
+    index : Sequence | pd.Index
+        The index to give to the dataframe.
+    headers : dict
+        The headers to give to the dataframe.
+
+    Returns
+    -------
+    tfs.TfsDataFrame
+        The built `~tfs.frame.TfsDataFrame`.
+    """
+    return tfs.TfsDataFrame(data, index=index, headers=headers, copy=False)
+
+
+def _get_summ_headers(madx: Madx, /) -> dict[str, float]:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the contents of the internal ``SUMM`` table, with
+    uppercased keys, to be used as headers of a dataframe.
+    """
+    return {var.upper(): madx.table.summ[var][0] for var in madx.table.summ}
@@ -10,15 +10,50 @@ with `~cpymad.madx.Madx` objects.
 
 from __future__ import annotations
 
+import collections
+import json
+import math
+import shutil
+import struct
+import tempfile
+import zipfile
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 import tfs
 from loguru import logger
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
     from cpymad.madx import Madx
+    from numpy.typing import ArrayLike
+
+_SIDECAR_FORMATS: tuple[str, ...] = ("parquet", "npz")
+_FULL_PRECISION_FORMAT: str = "-.17g"  # enough digits to round-trip doubles
+_DEFAULT_FLOAT_FORMAT: str = "18.10g"  # MAD-X default
+_DIRECT_VARIABLE: int = 1  # variable types as given by cpymad
+_DEFERRED_VARIABLE: int = 2
+_ERRORS_TABLE: str = "pyhdtoolkit_errors"
+_MAX_ERROR_ORDER: int = 20  # MAD-X stores field errors up to K20L / K20SL
+_ALIGN_ERROR_COLUMNS: tuple[str, ...] = (
+    "dx",
+    "dy",
+    "ds",
+    "dphi",
+    "dtheta",
+    "dpsi",
+    "mrex",
+    "mrey",
+    "mredx",
+    "mredy",
+    "arex",
+    "arey",
+    "mscalx",
+    "mscaly",
+)
 
 
 def export_madx_table(
@@ -28,6 +63,9 @@ def export_madx_table(
     file_name: Path | str,
     pattern: str | None = None,
     headers_table: str = "SUMM",
+    *,
+    chunk_size: int | None = None,
+    sidecars: Sequence[str] = (),
     **kwargs,
 ) -> None:
     """
@@ -46,6 +84,14 @@ def export_madx_table(
         they will be given default values so the **TFS** file can be read
         back by ``MAD-X``.
 
+    Tip
+    ---
+        For very large tables, such as multi-million rows tracking tables,
+        provide the *chunk_size* parameter: the table is then retrieved and
+        written to disk by chunks of rows, and is never fully loaded in
+        memory. The written file is the same in both cases, but compression
+        of the output file is not supported when streaming.
+
     Parameters
     ----------
     madx : cpymad.madx.Madx
@@ -61,6 +107,21 @@ def export_madx_table(
     headers_table : str
         The name of the internal table to use for headers. Defaults to
         using the ``SUMM`` table.
+    chunk_size : int, optional
+        If given, the table is streamed to disk by chunks of this many
+        rows. Defaults to `None`, which loads the whole table in memory
+        before writing it. Keyword only.
+
+        .. versionadded:: 1.9.0
+    sidecars : Sequence[str]
+        Binary formats to also export the table to, next to the **TFS** file
+        and with the same name but the appropriate suffix. Accepted values are
+        ``parquet`` (requires the `pyarrow` package) and ``npz``. The ``npz``
+        archive is written uncompressed, so that it can be memory-mapped with
+        `~.cpymadtools.utils.load_npz_table`. Defaults to an empty tuple, which
+        writes no sidecar. Keyword only.
+
+        .. versionadded:: 1.9.0
     **kwargs
         Any keyword arguments will be passed to `~tfs.writer.write_tfs`.
 
@@ -70,29 +131,141 @@ def export_madx_table(
 
             madx.command.twiss()
             export_madx_table(madx, table_name="TWISS", file_name="twiss.tfs")
+
+        To stream a large tracking table to disk, with a Parquet sidecar
+        file for later analysis:
+
+        .. code-block:: python
+
+            export_madx_table(
+                madx,
+                table_name="trackone",
+                file_name="tracks.tfs",
+                chunk_size=100_000,
+                sidecars=["parquet"],
+            )
     """
     file_path = Path(file_name)
+    sidecars = [sidecar.lower() for sidecar in sidecars]
+    for sidecar in sidecars:
+        if sidecar not in _SIDECAR_FORMATS:
+            logger.error(f"Sidecar format '{sidecar}' is not accepted, should be one of {_SIDECAR_FORMATS}.")
+            msg = "Invalid 'sidecars' parameter"
+            raise ValueError(msg)
+
+    if chunk_size is not None:
+        _stream_madx_table(
+            madx,
+            table_name,
+            file_path,
+            pattern=pattern,
+            headers_table=headers_table,
+            chunk_size=chunk_size,
+            sidecars=sidecars,
+            **kwargs,
+        )
+        return
+
     logger.debug(f"Exporting table {table_name} into '{file_path.absolute()}'")
     dframe = get_table_tfs(madx, table_name, headers_table)
     if pattern:
-        logger.debug(f"Setting NAME column as index and filtering extracted table with regex pattern '{pattern}'")
-        dframe = dframe.set_index("NAME").filter(regex=pattern, axis="index").reset_index()
-    if "NAME" not in dframe.headers:
-        logger.debug("No 'NAME' header found, adding a default value 'EXPORT'")
-        dframe.headers["NAME"] = "EXPORT"
-    if "TYPE" not in dframe.headers:
-        logger.debug("No 'TYPE' header found, adding a default value 'EXPORT'")
-        dframe.headers["TYPE"] = "EXPORT"
+        logger.debug(f"Filtering extracted table with regex pattern '{pattern}' on the NAME column, moved first")
+        columns = ["NAME", *dframe.columns.drop("NAME")]
+        dframe = dframe.loc[dframe.NAME.str.contains(pattern, regex=True), columns].reset_index(drop=True)
+    _add_default_export_headers(dframe.headers)
     logger.debug("Writing to disk")
     tfs.write(file_path, dframe, **kwargs)
 
+    if "parquet" in sidecars:
+        _write_parquet_sidecar(file_path.with_suffix(".parquet"), [dframe], dframe.headers)
+    if "npz" in sidecars:
+        columns = ((column, [dframe[column].to_numpy()]) for column in dframe.columns)
+        _write_npz_sidecar(file_path.with_suffix(".npz"), columns, nrows=len(dframe))
+
+
+def load_npz_table(file_name: Path | str) -> dict[str, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Loads the columns of a table exported to an ``npz`` sidecar file by
+    `~.cpymadtools.utils.export_madx_table`. The columns are memory-mapped
+    from the (uncompressed) archive rather than read: their data is only
+    loaded from disk when accessed.
 
-def get_table_tfs(madx: Madx, /, table_name: str, headers_table: str = "SUMM") -> tfs.TfsDataFrame:
+    Parameters
+    ----------
+    file_name : Path | str
+        The ``npz`` file to load the table from.
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        A mapping of column names to read-only, memory-mapped arrays of the
+        column values. String columns (such as ``NAME``) are fixed-width
+        unicode arrays.
+
+    Example
+    -------
+        .. code-block:: python
+
+            export_madx_table(madx, "trackone", "tracks.tfs", sidecars=["npz"])
+            tracks = load_npz_table("tracks.npz")
+            x_coordinates = tracks["X"]
+    """
+    file_path = Path(file_name)
+    logger.debug(f"Memory-mapping table columns from '{file_path.absolute()}'")
+    columns: dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(file_path) as archive, file_path.open("rb") as raw_file:
+        for member in archive.infolist():
+            if member.compress_type != zipfile.ZIP_STORED:
+                logger.error(f"Member '{member.filename}' is compressed and can not be memory-mapped")
+                msg = "Compressed npz archives can not be memory-mapped"
+                raise ValueError(msg)
+
+            with archive.open(member) as handle:  # read the array header to know its layout
+                version = np.lib.format.read_magic(handle)
+                read_header = (
+                    np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                )
+                shape, fortran_order, dtype = read_header(handle)
+                array_header_size = handle.tell()
+
+            # Data starts after the local zip header (fixed 30 bytes + file name + extra field) and array header
+            raw_file.seek(member.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", raw_file.read(4))
+            offset = member.header_offset + 30 + name_length + extra_length + array_header_size
+
+            column = Path(member.filename).stem
+            if not math.prod(shape):  # can not memory-map an empty array
+                columns[column] = np.empty(shape, dtype=dtype)
+            else:
+                order = "F" if fortran_order else "C"
+                columns[column] = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=shape, order=order)
+    return columns
+
+
+def get_table_tfs(
+    madx: Madx,
+    /,
+    table_name: str,
+    headers_table: str = "SUMM",
+    downcast: bool = False,
+    categorical: bool = False,
+) -> tfs.TfsDataFrame:
     """
     .. versionadded:: 0.11.0
 
     Turns an internal table from the ``MAD-X`` process into a
-    `~tfs.frame.TfsDataFrame`.
+    `~tfs.frame.TfsDataFrame`. Each column is retrieved as an array
+    and the dataframe is built from them in a single go.
+
+    Tip
+    ---
+        For large tables (tracking tables, ``normal_results`` or error
+        tables) the memory footprint of the returned dataframe can be
+        greatly reduced with the *downcast* and *categorical* options.
+        Note that these options are meant for in-memory analysis: the
+        precision lost with *downcast* can not be recovered.
 
     Parameters
     ----------
@@ -103,6 +276,17 @@ def get_table_tfs(madx: Madx, /, table_name: str, headers_table: str = "SUMM") -
     headers_table : str
         The name of the internal table to use for headers. Defaults to
         using the ``SUMM`` table.
+    downcast : bool
+        If `True`, the floating point columns are downcast to single precision
+        (``float32``), halving their memory footprint. Defaults to `False`.
+
+        .. versionadded:: 1.9.0
+    categorical : bool
+        If `True`, the ``NAME`` and ``KEYWORD`` columns (when present) are
+        returned as `~pandas.Categorical` columns, which is much lighter
+        when element names repeat, as in tracking tables. Defaults to `False`.
+
+        .. versionadded:: 1.9.0
 
     Returns
     -------
@@ -115,27 +299,375 @@ def get_table_tfs(madx: Madx, /, table_name: str, headers_table: str = "SUMM") -
         .. code-block:: python
 
             twiss_tfs = get_table_tfs(madx, table_name="TWISS")
+
+        To retrieve a large tracking table with a lighter memory footprint:
+
+        .. code-block:: python
+
+            tracks_tfs = get_table_tfs(madx, table_name="trackone", downcast=True, categorical=True)
     """
     logger.debug(f"Extracting table {table_name} into a TfsDataFrame")
-    # Converting to dict and then DataFrame because the madx.table.name.dframe()
-    # method sometimes complains about element names and crashes (mostly seen)
-    # when exporting error tables.
-    dframe = pd.DataFrame.from_dict(dict(madx.table[table_name]))
-    dframe = tfs.TfsDataFrame(dframe)
-    dframe.columns = dframe.columns.str.upper()
-
-    if "NAME" in dframe.columns:
-        logger.trace("Uppercasing 'NAME' column contents")
-        dframe.NAME = dframe.NAME.str.upper()
+    # Getting each column as an array from the table, not through the madx.table.name.dframe()
+    # method as it sometimes complains about element names and crashes (mostly seen) when
+    # exporting error tables.
+    table = madx.table[table_name]
+    data = {column.upper(): _convert_column(column, table.column(column), downcast, categorical) for column in table}
 
     logger.trace(f"Turning {headers_table} table into headers")
-    dframe.headers = {var.upper(): madx.table[headers_table][var][0] for var in madx.table[headers_table]}
-    return dframe
+    headers = {var.upper(): madx.table[headers_table][var][0] for var in madx.table[headers_table]}
+    return tfs.TfsDataFrame(data, headers=headers, copy=False)
+
+
+def save_madx_machine(madx: Madx, /, file_name: Path | str, sequences: Sequence[str] | None = None) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Saves the state of the machine in the ``MAD-X`` process to a file: the
+    given sequences (as expanded, so sliced or re-cycled sequences are saved
+    as such), their beams and all global variables, with full precision.
+    Deferred expressions are kept as such. The machine can then be loaded
+    in another process with `~.cpymadtools.utils.load_madx_machine`, which
+    is much faster than re-doing the setup steps.
+
+    Important
+    ---------
+        Only sequences, beams and variables are saved: macros, tables,
+        ``SELECT`` statements and options are not. Sequences sharing element
+        classes with a sliced sequence can not be saved alongside it, as
+        ``MAD-X`` would write the thin elements with their thick parents.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    file_name : Path | str
+        The file to save the machine to.
+    sequences : Sequence[str], optional
+        The names of the sequences to save. Defaults to `None`, which
+        saves all sequences defined in ``MAD-X``.
+
+    Example
+    -------
+        .. code-block:: python
+
+            save_madx_machine(madx, "lhcb1_thin.madx", sequences=["lhcb1"])
+    """
+    file_path = Path(file_name)
+    sequences = list(madx.sequence) if sequences is None else list(sequences)
+    logger.debug(f"Saving sequences {sequences} with beams and globals to '{file_path.absolute()}'")
+    madx.input(f'set, format="{_FULL_PRECISION_FORMAT}";')
+    try:
+        madx.command.save(sequence=sequences, file=str(file_path), beam=True)
+    finally:
+        madx.input(f'set, format="{_DEFAULT_FLOAT_FORMAT}";')
+
+    # SAVE only writes the variables the sequences depend on, we want all of them
+    logger.trace("Appending all global variables")
+    with file_path.open("a") as machine_file:
+        for name in madx.globals:
+            variable = madx.globals.cmdpar[name]
+            value = repr(float(variable.value)) if variable.expr is None else variable.expr
+            if variable.var_type == _DEFERRED_VARIABLE:
+                machine_file.write(f"{name} := {value};\n")
+            elif variable.var_type == _DIRECT_VARIABLE:
+                machine_file.write(f"{name} = {value};\n")
+
+
+def load_madx_machine(madx: Madx, /, file_name: Path | str) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Loads a machine saved by `~.cpymadtools.utils.save_madx_machine` into
+    the ``MAD-X`` process. The sequence to work with still needs to be
+    ``USE``-d afterwards.
+
+    Note
+    ----
+        Saved ``RBEND`` elements have their length already converted to the
+        arc length, so the ``RBARC`` option is turned off for the loaded
+        machine to be identical to the saved one. It stays off afterwards.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    file_name : Path | str
+        The file to load the machine from.
+
+    Example
+    -------
+        .. code-block:: python
+
+            load_madx_machine(madx, "lhcb1_thin.madx")
+            madx.command.use(sequence="lhcb1")
+    """
+    file_path = Path(file_name)
+    logger.debug(f"Loading machine from '{file_path.absolute()}'")
+    madx.option(rbarc=False)
+    madx.call(str(file_path))
+
+
+def save_madx_errors(madx: Madx, /, file_name: Path | str) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Saves the alignment (``EALIGN``) and field (``EFCOMP``) errors assigned
+    to the elements of the sequence in use to a file of ``MAD-X`` commands,
+    with full precision. Each element is addressed by its occurrence in the
+    sequence, so errors of elements sharing a name are kept distinct (which
+    is not the case when reading back an ``ESAVE`` file with ``SETERR``).
+    The file is to be called, with `~cpymad.madx.Madx.call`, once the same
+    sequence is ``USE``-d in another process, for instance after loading a
+    machine saved with `~.cpymadtools.utils.save_madx_machine`.
+
+    Note
+    ----
+        The ``SELECT`` statements for the error flag are cleared in the process.
+
+    Parameters
+    ----------
+    madx : cpymad.madx.Madx
+        An instanciated `~cpymad.madx.Madx` object. Positional only.
+    file_name : Path | str
+        The file to save the errors to.
+
+    Example
+    -------
+        .. code-block:: python
+
+            save_madx_machine(madx, "lhcb1.madx", sequences=["lhcb1"])
+            save_madx_errors(madx, "lhcb1_errors.madx")
+
+            # Later on, in a different MAD-X process
+            load_madx_machine(other_madx, "lhcb1.madx")
+            other_madx.command.use(sequence="lhcb1")
+            other_madx.call("lhcb1_errors.madx")
+    """
+    file_path = Path(file_name)
+    logger.debug(f"Saving errors of the sequence in use to '{file_path.absolute()}'")
+    madx.select(flag="error", clear=True)
+    madx.select(flag="error", full=True)
+    madx.command.etable(table=_ERRORS_TABLE)
+    madx.select(flag="error", clear=True)
+
+    table = madx.table[_ERRORS_TABLE]
+    names = table.column("name")  # as 'name:occurrence'
+    field_columns = [f"k{order:d}{skew}l" for order in range(_MAX_ERROR_ORDER + 1) for skew in ("", "s")]
+    align = np.column_stack([table.column(column) for column in _ALIGN_ERROR_COLUMNS])
+    field = np.column_stack([table.column(column) for column in field_columns])
+    with_errors = np.flatnonzero(align.any(axis=1) | field.any(axis=1))
+    logger.trace(f"Found {with_errors.size} elements with errors")
+
+    with file_path.open("w") as errors_file:
+        for row in with_errors:
+            name, occurrence = names[row].rsplit(":", maxsplit=1)
+            errors_file.write(f"select, flag=error, clear;\nselect, flag=error, range={name}[{occurrence}];\n")
+            if align[row].any():
+                values = ", ".join(
+                    f"{column}={value!r}" for column, value in zip(_ALIGN_ERROR_COLUMNS, align[row].tolist())
+                )
+                errors_file.write(f"ealign, {values};\n")
+            if field[row].any():
+                normal = ", ".join(repr(value) for value in field[row, ::2].tolist())
+                skew = ", ".join(repr(value) for value in field[row, 1::2].tolist())
+                errors_file.write(f"efcomp, dkn={{{normal}}}, dks={{{skew}}};\n")
+        errors_file.write("select, flag=error, clear;\n")
 
 
 # ----- Helpers ----- #
 
 
+def _stream_madx_table(
+    madx: Madx,
+    /,
+    table_name: str,
+    file_path: Path,
+    *,
+    pattern: str | None,
+    headers_table: str,
+    chunk_size: int,
+    sidecars: Sequence[str] = (),
+    **kwargs,
+) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Streams an internal table from the ``MAD-X`` process to a **TFS** file (and
+    requested *sidecars*) by chunks of *chunk_size* rows. The written file is the
+    same as the one written by `~.cpymadtools.utils.export_madx_table` without
+    streaming. Each chunk is written with `~tfs.writer.write_tfs` to a temporary
+    file and appended to the final file, without its column names and types lines.
+    See `~.cpymadtools.utils.export_madx_table` for the parameters.
+    """
+    if chunk_size < 1:
+        logger.error(f"The chunk size should be a positive integer, not {chunk_size}")
+        msg = "Invalid 'chunk_size' parameter"
+        raise ValueError(msg)
+
+    logger.debug(f"Streaming table {table_name} into '{file_path.absolute()}' by chunks of {chunk_size} rows")
+    table = madx.table[table_name]
+    headers = {var.upper(): madx.table[headers_table][var][0] for var in madx.table[headers_table]}
+    _add_default_export_headers(headers)
+
+    columns = list(table)
+    rows = np.arange(madx._libmadx.get_table_row_count(table_name))
+    if pattern:  # filter on the full NAME column once, then only retrieve the matching rows
+        logger.debug(f"Filtering extracted table with regex pattern '{pattern}' on the NAME column")
+        names = pd.Index(_convert_column("name", table.column("name")))
+        rows = rows[names.str.contains(pattern, regex=True)]
+        columns.insert(0, columns.pop(columns.index("name")))  # same as the NAME index being reset
+    chunks_rows = [rows[start : start + chunk_size].tolist() for start in range(0, len(rows), chunk_size)] or [[]]
+
+    def get_chunk(chunk_rows: list[int]) -> tfs.TfsDataFrame:
+        data = {column.upper(): _convert_column(column, table.column(column, rows=chunk_rows)) for column in columns}
+        return tfs.TfsDataFrame(data, copy=False)
+
+    def write_tfs_chunks() -> Iterator[tfs.TfsDataFrame]:
+        """Writes the chunks to the TFS file one after the other, and yields them for the sidecars."""
+        with file_path.open("w") as tfs_file, tempfile.TemporaryDirectory(dir=file_path.parent) as tmpdir:
+            chunk_path = Path(tmpdir) / "chunk.tfs"
+            for index, chunk_rows in enumerate(chunks_rows):
+                logger.trace(f"Writing chunk {index + 1}/{len(chunks_rows)}")
+                chunk = get_chunk(chunk_rows)
+                tfs.write(chunk_path, chunk, headers_dict=headers if index == 0 else {}, **kwargs)
+                with chunk_path.open() as chunk_file:
+                    if index > 0:  # skip the column names and types lines
+                        chunk_file.readline()
+                        chunk_file.readline()
+                    shutil.copyfileobj(chunk_file, tfs_file)
+                yield chunk
+
+    if "parquet" in sidecars:  # written at the same time as the TFS file
+        _write_parquet_sidecar(file_path.with_suffix(".parquet"), write_tfs_chunks(), headers)
+    else:
+        collections.deque(write_tfs_chunks(), maxlen=0)  # consume the generator
+
+    if "npz" in sidecars:  # columns are written one after the other, each by chunks
+        column_chunks = (
+            (
+                column.upper(),
+                (_convert_column(column, table.column(column, rows=chunk_rows)) for chunk_rows in chunks_rows),
+            )
+            for column in columns
+        )
+        _write_npz_sidecar(file_path.with_suffix(".npz"), column_chunks, nrows=len(rows))
+
+
+def _write_parquet_sidecar(file_path: Path, chunks: Iterable[pd.DataFrame], headers: dict) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Writes the table given as *chunks* of rows to a ``Parquet`` file, one row group
+    per chunk. The *headers* are stored as JSON in the schema metadata. Requires
+    the `pyarrow` package.
+    """
+    try:
+        import pyarrow as pa  # noqa: PLC0415
+        import pyarrow.parquet as pq  # noqa: PLC0415
+    except ImportError as error:
+        logger.error("The 'pyarrow' package is required to write Parquet sidecar files")
+        msg = "Writing Parquet sidecar files requires 'pyarrow'"
+        raise ImportError(msg) from error
+
+    logger.debug(f"Writing Parquet sidecar file '{file_path.absolute()}'")
+    writer = None
+    try:
+        for chunk in chunks:
+            arrow_table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                metadata = {**(arrow_table.schema.metadata or {}), b"headers": json.dumps(headers, default=str)}
+                writer = pq.ParquetWriter(file_path, arrow_table.schema.with_metadata(metadata))
+            writer.write_table(arrow_table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_npz_sidecar(file_path: Path, columns: Iterable[tuple[str, Iterable[np.ndarray]]], nrows: int) -> None:
+    """
+    .. versionadded:: 1.9.0
+
+    Writes the table given as *columns* to an uncompressed ``npz`` archive, one
+    array per column. Each column is given as its name and an iterable of chunks
+    of its values, which are written to disk one after the other. Numeric columns
+    are never fully loaded in memory, but string columns are as their fixed width
+    must be known before writing.
+    """
+    logger.debug(f"Writing npz sidecar file '{file_path.absolute()}'")
+    with zipfile.ZipFile(file_path, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for column, chunks in columns:
+            with archive.open(f"{column}.npy", mode="w", force_zip64=True) as handle:
+                chunks_iterator = iter(chunks)
+                first_chunk = np.asarray(next(chunks_iterator, np.array([])))
+                if first_chunk.dtype.kind in "fiub":  # numeric column, stream its chunks
+                    header = {
+                        "descr": np.lib.format.dtype_to_descr(first_chunk.dtype),
+                        "fortran_order": False,
+                        "shape": (nrows,),
+                    }
+                    np.lib.format.write_array_header_2_0(handle, header)
+                    handle.write(first_chunk.tobytes())
+                    for chunk in chunks_iterator:
+                        handle.write(np.asarray(chunk, dtype=first_chunk.dtype).tobytes())
+                else:  # strings, to fixed width unicode
+                    values = np.concatenate([first_chunk, *chunks_iterator]).astype(str)
+                    np.lib.format.write_array(handle, values, allow_pickle=False)
+
+
+def _add_default_export_headers(headers: dict) -> None:
+    """Adds default ``NAME`` and ``TYPE`` headers, required by ``MAD-X`` to read the file back, if missing."""
+    if "NAME" not in headers:
+        logger.debug("No 'NAME' header found, adding a default value 'EXPORT'")
+        headers["NAME"] = "EXPORT"
+    if "TYPE" not in headers:
+        logger.debug("No 'TYPE' header found, adding a default value 'EXPORT'")
+        headers["TYPE"] = "EXPORT"
+
+
+def _convert_column(name: str, values: np.ndarray, downcast: bool = False, categorical: bool = False) -> ArrayLike:
+    """
+    .. versionadded:: 1.9.0
+
+    Converts a column array retrieved from an internal ``MAD-X`` table to
+    the values to give to the dataframe. The ``NAME`` column contents are
+    uppercased, by uppercasing each distinct name only once. The ``NAME``
+    and ``KEYWORD`` columns are made categorical if *categorical* is `True`,
+    and floating point columns are made ``float32`` if *downcast* is `True`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the column, case insensitive.
+    values : numpy.ndarray
+        The column data, as retrieved from the ``MAD-X`` table.
+    downcast : bool
+        Whether to downcast floating point columns to ``float32``.
+        Defaults to `False`.
+    categorical : bool
+        Whether to make the ``NAME`` and ``KEYWORD`` columns categorical.
+        Defaults to `False`.
+
+    Returns
+    -------
+    ArrayLike
+        The converted column values.
+    """
+    if values.dtype.kind == "f":
+        return values.astype(np.float32) if downcast else values
+
+    if name.upper() not in ("NAME", "KEYWORD"):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    if name.upper() == "NAME":  # uppercase each distinct name once, then re-factorize in case of collisions
+        remapping, uniques = pd.factorize(pd.Index(uniques).str.upper())
+        codes = remapping[codes]
+
+    if categorical:
+        return pd.Categorical.from_codes(codes, categories=uniques)
+    return np.asarray(uniques, dtype=object)[codes]
+
+
 def _get_k_strings(start: int = 0, stop: int = 8, orientation: str = "both") -> list[str]:
     """
     Returns the list of K-strings for various magnets and orders (``K1L``, ``K2SL`` etc strings).
@@ -1,3 +1,10 @@
-from . import stats_fitting, utils  # noqa: TID252
+from typing import TYPE_CHECKING
 
-__all__ = ["stats_fitting", "utils"]
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import frequency, stats_fitting, utils  # noqa: TID252
+
+__all__ = ["frequency", "stats_fitting", "utils"]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
@@ -0,0 +1,298 @@
+"""
+.. _maths-frequency:
+
+Frequency Analysis
+------------------
+
+Module with vectorised frequency analysis functions, to determine the
+tunes of many turn-by-turn signals at once, such as particle coordinates
+from tracking. Both functions operate on the last axis of the provided
+arrays, which holds the turns, and treat all other axes as independent
+signals.
+
+Real signals (for instance :math:`x`) give frequencies in :math:`[0, 0.5]`,
+while complex signals (for instance normalised :math:`x - i p_x`) give
+frequencies in :math:`[0, 1)`.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+from loguru import logger
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
+# Number of signal samples processed at once, to keep the temporary arrays reasonably small
+_BLOCK_SIZE: int = 2**21
+
+
+def interpolated_fft(signals: ArrayLike, /) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Determines the main frequency of each of the provided signals from
+    the peak of their Hann-windowed FFT spectrum, interpolated between
+    the two highest bins of the peak. The mean of each signal is removed
+    before the analysis. This is very fast and precise to a small fraction
+    of the :math:`1 / N` bin width, see `~.maths.frequency.naff` for a more
+    precise determination.
+
+    .. note::
+        The line of a real signal overlaps with its mirror image when its
+        frequency is within about two bins, :math:`2 / N`, of 0 or 0.5,
+        and is then only determined to about half a bin width. For instance
+        a frequency of 0.499 over 1024 turns is found with an error of about
+        :math:`5 \\times 10^{-4}`. The same holds for complex signals with a
+        frequency close to 0 or 1, which is mostly removed with the mean of
+        the signal.
+
+    Parameters
+    ----------
+    signals : ArrayLike
+        An array of shape ``(..., N)`` with signals of *N* turns on the
+        last axis. Signals containing `NaN` values, for instance from lost
+        particles, give a `NaN` frequency.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of shape ``(...)`` with the main frequency of each signal,
+        in tune units.
+
+    Example
+    -------
+        .. code-block:: python
+
+            turns = np.arange(1024)
+            signals = np.cos(2 * np.pi * np.outer([0.27, 0.31], turns))
+            interpolated_fft(signals)
+            # array([0.27, 0.31]), up to a few 1e-7
+    """
+    signals, invalid = _prepare_signals(signals)
+    frequencies = np.empty(len(signals))
+    for block in _blocks(signals):
+        frequencies[block] = _interpolated_fft(signals[block])
+    frequencies[invalid.ravel()] = np.nan
+    return frequencies.reshape(invalid.shape)
+
+
+def naff(signals: ArrayLike, /, n_lines: int = 1, *, max_iterations: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Determines the main frequencies of each of the provided signals with
+    the Numerical Analysis of Fundamental Frequencies (NAFF) algorithm. The
+    frequency of the highest line is first estimated from the interpolated
+    FFT, then refined with Newton iterations to the maximum of the Hann-windowed
+    Fourier integral of the signal. This line is then subtracted from the
+    signal and the process repeated for the next *n_lines* lines. All signals
+    are processed together with array operations.
+
+    Parameters
+    ----------
+    signals : ArrayLike
+        An array of shape ``(..., N)`` with signals of *N* turns on the
+        last axis. Signals containing `NaN` values, for instance from lost
+        particles, give `NaN` frequencies and amplitudes.
+    n_lines : int
+        The number of spectral lines to determine for each signal, by
+        order of decreasing amplitude. Defaults to 1, the main frequency
+        only.
+    max_iterations : int
+        The maximum number of Newton iterations for the refinement of each
+        line, which usually converges in 3 or 4. Defaults to 10.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        Two arrays of shape ``(..., n_lines)`` with the frequencies, in tune
+        units, and the amplitudes of the determined lines of each signal.
+
+    Example
+    -------
+        .. code-block:: python
+
+            turns = np.arange(1024)
+            signals = np.cos(2 * np.pi * 0.27 * turns) + 0.1 * np.cos(2 * np.pi * 0.05 * turns)
+            frequencies, amplitudes = naff(signals, n_lines=2)
+            # frequencies: array([0.27, 0.05]), amplitudes: array([1.0, 0.1])
+    """
+    if n_lines < 1:
+        logger.error(f"At least one line should be determined, got 'n_lines={n_lines}'")
+        msg = "Invalid number of lines to determine"
+        raise ValueError(msg)
+
+    signals, invalid = _prepare_signals(signals)
+    frequencies = np.empty((len(signals), n_lines))
+    amplitudes = np.empty((len(signals), n_lines))
+    for block in _blocks(signals):
+        frequencies[block], amplitudes[block] = _naff(signals[block], n_lines, max_iterations)
+    frequencies[invalid.ravel()] = amplitudes[invalid.ravel()] = np.nan
+    return frequencies.reshape(*invalid.shape, n_lines), amplitudes.reshape(*invalid.shape, n_lines)
+
+
+def get_tunes_from_tracking(coordinates: ArrayLike, /, method: str = "naff") -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    Determines the horizontal and vertical tunes of tracked particles from
+    their turn-by-turn :math:`x` and :math:`y` coordinates, as returned by the
+    tracking functions of `~pyhdtoolkit.cpymadtools`. Tunes are determined
+    in :math:`[0, 0.5]`, like from the ``DYNAP`` command of ``MAD-X``.
+
+    .. note::
+        With either method, tunes within about :math:`2 / N` of 0 or 0.5,
+        for instance from a half-integer working point, are only determined
+        to about half of a :math:`1 / N` bin width, see the note in
+        `~.maths.frequency.interpolated_fft`. Track more turns to determine
+        them more precisely.
+
+    Parameters
+    ----------
+    coordinates : ArrayLike
+        An array of shape ``(..., N, 6)`` with the ``X, PX, Y, PY, T, PT``
+        coordinates of particles over *N* turns, such as a slice of the
+        ``coordinates`` of a `~.cpymadtools.track.TrackedParticles`. Lost
+        particles give `NaN` tunes.
+    method : str
+        The method to use to determine the tunes, either ``naff`` to use
+        `~.maths.frequency.naff` or ``fft`` to use the faster but less precise
+        `~.maths.frequency.interpolated_fft`. Defaults to ``naff``.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        Two arrays of shape ``(...)`` with the horizontal and vertical tunes
+        of each particle.
+
+    Example
+    -------
+        .. code-block:: python
+
+            tracks = track_particles(madx, initial_coordinates, nturns=1024)
+            qx, qy = get_tunes_from_tracking(tracks.coordinates[0])
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    signals = np.stack([coordinates[..., 0], coordinates[..., 2]])
+    if method == "naff":
+        tunes = naff(signals)[0][..., 0]
+    elif method == "fft":
+        tunes = interpolated_fft(signals)
+    else:
+        logger.error(f"Invalid method '{method}' for tunes determination, options are 'naff' and 'fft'")
+        msg = "Invalid tunes determination method"
+        raise ValueError(msg)
+    return tunes[0], tunes[1]
+
+
+# ----- Helpers ----- #
+
+
+def _prepare_signals(signals: ArrayLike) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the provided signals with their mean removed, flattened to
+    an (n_signals, N) array, and a boolean mask in the original shape of
+    the signals containing `NaN` values. These are set to zero to not
+    disturb the analysis of the others.
+    """
+    signals = np.array(signals, ndmin=1)
+    signals = signals.astype(complex if np.iscomplexobj(signals) else float)
+    if signals.shape[-1] < 3:  # noqa: PLR2004
+        logger.error(f"Signals should have at least 3 turns, got {signals.shape[-1]}")
+        msg = "Signals are too short for frequency analysis"
+        raise ValueError(msg)
+    invalid = np.isnan(signals).any(axis=-1)
+    signals = signals.reshape(-1, signals.shape[-1])
+    signals[invalid.ravel()] = 0
+    return signals - signals.mean(axis=-1, keepdims=True), invalid
+
+
+def _blocks(signals: np.ndarray) -> list[slice]:
+    """Returns slices to iterate over the (n_signals, N) signals in blocks of about _BLOCK_SIZE samples."""
+    n_signals = max(_BLOCK_SIZE // signals.shape[-1], 1)
+    return [slice(start, start + n_signals) for start in range(0, len(signals), n_signals)]
+
+
+def _hann_window(nturns: int) -> np.ndarray:
+    """Periodic Hann window, for which the peak interpolation of `_interpolated_fft` is exact."""
+    return np.sin(np.pi * np.arange(nturns) / nturns) ** 2
+
+
+def _interpolated_fft(signals: np.ndarray) -> np.ndarray:
+    """Interpolated FFT frequencies of a (n_signals, N) array of signals with a zero mean."""
+    nturns = signals.shape[-1]
+    is_complex = np.iscomplexobj(signals)
+    windowed = signals * _hann_window(nturns)
+    spectra = np.abs(np.fft.fft(windowed) if is_complex else np.fft.rfft(windowed))
+    peaks = np.argmax(spectra[:, 1:], axis=-1) + 1  # not the DC bin
+    rows = np.arange(len(spectra))
+    highest = spectra[rows, peaks]
+    left = spectra[rows, peaks - 1]
+    # Past the last bin, the spectrum of a complex signal wraps around to the DC bin while
+    # that of a real signal is mirrored: the magnitude of bin k is that of bin N - k
+    right = spectra[rows, (peaks + 1) % nturns if is_complex else np.minimum(peaks + 1, nturns - peaks - 1)]
+    # Ratio of the second highest bin to the peak one, from which the offset of the
+    # frequency to the peak bin follows exactly for a pure tone and a Hann window
+    ratios = np.maximum(left, right) / np.where(highest > 0, highest, 1)
+    offsets = np.where(right > left, 1, -1) * (2 * ratios - 1) / (ratios + 1)
+    frequencies = (peaks + offsets) / nturns
+    return frequencies % 1 if is_complex else np.clip(frequencies, 0, 0.5)
+
+
+def _naff(signals: np.ndarray, n_lines: int, max_iterations: int) -> tuple[np.ndarray, np.ndarray]:
+    """NAFF frequencies and amplitudes of a (n_signals, N) array of signals with a zero mean."""
+    nturns = signals.shape[-1]
+    is_complex = np.iscomplexobj(signals)
+    window = _hann_window(nturns)
+    # Turns centred on the middle of the signals, which keeps the derivatives well conditioned.
+    # The phasors are not centred, which only changes the phase of phi and not the Newton steps
+    turns = np.arange(nturns) - (nturns - 1) / 2
+    frequencies = np.empty((len(signals), n_lines))
+    amplitudes = np.empty((len(signals), n_lines))
+    residuals = signals.copy()
+
+    for line in range(n_lines):
+        windowed = residuals * window
+        frequency = _interpolated_fft(residuals)
+        for _ in range(max_iterations):
+            # Newton step to the maximum of |phi|^2, with phi the windowed Fourier integral
+            weighted = windowed * np.conj(_phasors(frequency, nturns))
+            phi = weighted.sum(axis=-1)
+            dphi = -2j * np.pi * (weighted @ turns)
+            d2phi = -4 * np.pi**2 * (weighted @ turns**2)
+            slope = np.real(np.conj(phi) * dphi)
+            curvature = np.abs(dphi) ** 2 + np.real(np.conj(phi) * d2phi)
+            step = np.where(curvature < 0, -slope / np.where(curvature < 0, curvature, -1), 0)
+            step = np.clip(step, -1 / nturns, 1 / nturns)  # the estimate is within a bin of the line
+            frequency = frequency + step
+            if np.all(np.abs(step) < 1e-15):  # noqa: PLR2004
+                break
+
+        oscillations = _phasors(frequency, nturns)
+        phi = (windowed * np.conj(oscillations)).sum(axis=-1, keepdims=True) / window.sum()
+        residuals = residuals - (phi * oscillations if is_complex else 2 * np.real(phi * oscillations))
+        # For real signals the line is at +/- frequency, we report the one in [0, 0.5]
+        frequencies[:, line] = frequency if is_complex else np.abs(frequency)
+        amplitudes[:, line] = np.abs(phi[:, 0]) * (1 if is_complex else 2)
+
+    if is_complex:
+        frequencies %= 1
+    return frequencies, amplitudes
+
+
+def _phasors(frequencies: np.ndarray, nturns: int) -> np.ndarray:
+    """
+    Returns the (n_signals, nturns) array of exp(2i pi f n) for each frequency
+    f and turn n. Writing n = a * size + b, these are built as the products of
+    exp(2i pi f a * size) and exp(2i pi f b), which only needs 2 sqrt(nturns)
+    complex exponentials per frequency and is much faster than computing all
+    of them.
+    """
+    size = int(np.ceil(np.sqrt(nturns)))
+    steps = np.arange(size)
+    coarse = np.exp(2j * np.pi * frequencies[:, np.newaxis] * steps * size)
+    fine = np.exp(2j * np.pi * frequencies[:, np.newaxis] * steps)
+    return (coarse[:, :, np.newaxis] * fine[:, np.newaxis, :]).reshape(len(frequencies), -1)[:, :nturns]
@@ -1,3 +1,10 @@
-from . import beam, ripken, twiss  # noqa: TID252
+from typing import TYPE_CHECKING
+
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import beam, ripken, twiss  # noqa: TID252
 
 __all__ = ["beam", "ripken", "twiss"]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
@@ -2,6 +2,13 @@
 .. _plotting:
 """
 
-from . import aperture, crossing, envelope, lattice, phasespace, tune, utils  # noqa: TID252
+from typing import TYPE_CHECKING
+
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import aperture, crossing, envelope, lattice, phasespace, tune, utils  # noqa: TID252
 
 __all__ = ["aperture", "crossing", "envelope", "lattice", "phasespace", "tune", "utils"]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
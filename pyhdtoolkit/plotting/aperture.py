@@ -17,6 +17,7 @@ import numpy as np
 import pandas as pd
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.cache import get_twiss_dframe
 from pyhdtoolkit.plotting.layout import plot_machine_layout
 from pyhdtoolkit.plotting.utils import maybe_get_ax
 
@@ -156,8 +157,7 @@ def plot_aperture(
     # pylint: disable=too-many-arguments
     logger.debug("Plotting aperture limits and machine layout")
     logger.debug("Getting Twiss dataframe from cpymad")
-    madx.command.twiss(centre=True)
-    twiss_df: pd.DataFrame = madx.table.twiss.dframe()
+    twiss_df: pd.DataFrame = get_twiss_dframe(madx, raise_on_failure=False, centre=True)
     aperture_df = pd.DataFrame.from_dict(dict(madx.table.aperture))  # slicing -> issues with .dframe()
 
     # Restrict the span of twiss_df to avoid plotting all elements then cropping when xlimits is given
@@ -355,7 +355,7 @@ def _get_positions_and_real_apertures(
     """
     logger.debug("Getting Twiss dframe from MAD-X")
     madx.command.select(flag="twiss", column=["aper_1", "aper_2"])  # make sure we to get these two
-    twiss_df = madx.twiss(**kwargs).dframe()
+    twiss_df = get_twiss_dframe(madx, **kwargs)
     madx.command.select(flag="twiss", clear=True)  # clean up
     twiss_df.s = twiss_df.s - xoffset
 
@@ -15,6 +15,7 @@ from typing import TYPE_CHECKING
 import numpy as np
 from loguru import logger
 
+from pyhdtoolkit.cpymadtools.cache import get_twiss_dframe
 from pyhdtoolkit.plotting.utils import maybe_get_ax
 
 if TYPE_CHECKING:
@@ -110,7 +111,7 @@ def plot_beam_envelope(
 
     logger.debug("Getting Twiss dframe from MAD-X")
     plane_letter = "x" if plane.lower() in ("x", "horizontal") else "y"
-    twiss_df = madx.twiss(**kwargs).dframe()
+    twiss_df = get_twiss_dframe(madx, **kwargs)
     twiss_df.s = twiss_df.s - xoffset
 
     if xlimits is not None:
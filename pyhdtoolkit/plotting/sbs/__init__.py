@@ -2,6 +2,13 @@
 .. _plotting.sbs:
 """
 
-from . import coupling, phase  # noqa: TID252
+from typing import TYPE_CHECKING
+
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import coupling, phase  # noqa: TID252
 
 __all__ = ["coupling", "phase"]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
@@ -6,24 +6,45 @@ Tune Diagram Plotters
 
 Module with functions to create tune diagram plots.
 These provide functionality to draw Farey sequences
-up to a desired order.
+up to a desired order, and to find the resonances
+closest to given working points.
 """
 
 from __future__ import annotations
 
-from functools import partial
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
 import numpy as np
 from loguru import logger
+from matplotlib.collections import LineCollection
 
 from pyhdtoolkit.plotting.utils import maybe_get_ax
 
 if TYPE_CHECKING:
+    import tfs
     from matplotlib.axes import Axes
-
-
-ORDER_TO_ALPHA: dict[int, float] = {1: 1, 2: 0.75, 3: 0.65, 4: 0.55, 5: 0.45, 6: 0.35}
+    from numpy.typing import ArrayLike
+
+
+MAX_ORDER: int = 15
+ORDER_TO_ALPHA: dict[int, float] = {
+    1: 1,
+    2: 0.75,
+    3: 0.65,
+    4: 0.55,
+    5: 0.45,
+    6: 0.35,
+    7: 0.3,
+    8: 0.27,
+    9: 0.24,
+    10: 0.21,
+    11: 0.18,
+    12: 0.15,
+    13: 0.13,
+    14: 0.11,
+    15: 0.1,
+}
 ORDER_TO_RGB: dict[int, np.ndarray] = {
     1: np.array([152, 52, 48]) / 255,  # a brown
     2: np.array([57, 119, 175]) / 255,  # a blue
@@ -31,6 +52,15 @@ ORDER_TO_RGB: dict[int, np.ndarray] = {
     4: np.array([82, 157, 62]) / 255,  # a green
     5: np.array([197, 57, 50]) / 255,  # a red
     6: np.array([141, 107, 184]) / 255,  # a purple
+    7: np.array([140, 86, 75]) / 255,  # a light brown
+    8: np.array([227, 119, 194]) / 255,  # a pink
+    9: np.array([127, 127, 127]) / 255,  # a grey
+    10: np.array([188, 189, 34]) / 255,  # an olive
+    11: np.array([23, 190, 207]) / 255,  # a cyan
+    12: np.array([31, 60, 110]) / 255,  # a navy
+    13: np.array([255, 187, 120]) / 255,  # a light orange
+    14: np.array([152, 223, 138]) / 255,  # a light green
+    15: np.array([197, 176, 213]) / 255,  # a lavender
 }
 ORDER_TO_LINESTYLE: dict[int, str] = {
     1: "solid",
@@ -39,8 +69,33 @@ ORDER_TO_LINESTYLE: dict[int, str] = {
     4: "dashed",
     5: "dashed",
     6: "dashed",
+    7: "dotted",
+    8: "dotted",
+    9: "dotted",
+    10: "dotted",
+    11: "dotted",
+    12: "dotted",
+    13: "dotted",
+    14: "dotted",
+    15: "dotted",
+}
+ORDER_TO_LINEWIDTH: dict[int, float] = {
+    1: 2,
+    2: 1.75,
+    3: 1.5,
+    4: 1.25,
+    5: 1,
+    6: 0.75,
+    7: 0.7,
+    8: 0.65,
+    9: 0.6,
+    10: 0.55,
+    11: 0.5,
+    12: 0.5,
+    13: 0.5,
+    14: 0.5,
+    15: 0.5,
 }
-ORDER_TO_LINEWIDTH: dict[int, float] = {1: 2, 2: 1.75, 3: 1.5, 4: 1.25, 5: 1, 6: 0.75}
 ORDER_TO_LABEL: dict[int, str] = {
     1: "1st order",
     2: "2nd order",
@@ -48,6 +103,15 @@ ORDER_TO_LABEL: dict[int, str] = {
     4: "4th order",
     5: "5th order",
     6: "6th order",
+    7: "7th order",
+    8: "8th order",
+    9: "9th order",
+    10: "10th order",
+    11: "11th order",
+    12: "12th order",
+    13: "13th order",
+    14: "14th order",
+    15: "15th order",
 }
 
 
@@ -108,14 +172,14 @@ def plot_tune_diagram(
         If given, will be used as the title of the plot's legend.
     max_order : int
         The order up to which to plot resonance lines for. This
-        parameter value should not exceed 6. Defaults to 6.
+        parameter value should not exceed 15. Defaults to 6.
     differentiate_orders : bool
         If `True`, the lines for each order will be of a different
         color. When set to `False`, there is still differentation
         through ``alpha``, ``linewidth`` and ``linestyle``. Defaults
         to `False`.
     **kwargs
-        Any keyword argument is given to `~matplotlib.pyplot.plot`.
+        Any keyword argument is given to `~matplotlib.collections.LineCollection`.
         Be aware that ``alpha``, ``ls``, ``lw``, ``color`` and ``label``
         are already set by this function and providing them as kwargs
         might lead to errors. If either `ax` or `axis` is found in the
@@ -130,7 +194,7 @@ def plot_tune_diagram(
     Raises
     ------
     ValueError
-        If the *max_order* is not between 1 and 6, included.
+        If the *max_order* is not between 1 and 15, included.
 
     Example
     -------
@@ -139,9 +203,9 @@ def plot_tune_diagram(
             fig, ax = plt.subplots(figsize=(6, 6))
             plot_tune_diagram(ax=ax, max_order=4, differentiate_orders=True)
     """
-    if max_order > 6 or max_order < 1:  # noqa: PLR2004
-        logger.error("Plotting is not supported outside of 1st-6th order (and not recommended)")
-        msg = "The 'max_order' argument should be between 1 and 6 included"
+    if max_order > MAX_ORDER or max_order < 1:
+        logger.error(f"Plotting is not supported outside of 1st-{ORDER_TO_LABEL[MAX_ORDER]} (and not recommended)")
+        msg = f"The 'max_order' argument should be between 1 and {MAX_ORDER} included"
         raise ValueError(msg)
 
     logger.debug(f"Plotting resonance lines up to {ORDER_TO_LABEL[max_order]}")
@@ -168,12 +232,95 @@ def plot_tune_diagram(
     return axis
 
 
+def plot_frequency_map(
+    fma_dframe: tfs.TfsDataFrame,
+    /,
+    title: str | None = None,
+    *,
+    vmin: float = -7,
+    vmax: float = -2,
+    cmap: str = "jet",
+    colorbar: bool = True,
+    **kwargs,
+) -> Axes:
+    """
+    .. versionadded:: 1.9.0
+
+    Plots the frequency map from a Frequency Map Analysis table, as
+    returned by `~pyhdtoolkit.cpymadtools.fma.make_fma_table`: each
+    particle is drawn at its tunes in the first window of turns and
+    coloured by its diffusion index. Lost particles are not drawn. To
+    draw on top of the resonance lines, give the `~matplotlib.axes.Axes`
+    returned by `~.plotting.tune.plot_tune_diagram`.
+
+    Parameters
+    ----------
+    fma_dframe : tfs.TfsDataFrame
+        The Frequency Map Analysis table, with the ``QX1``, ``QY1``
+        and ``DIFFUSION`` columns. Positional only.
+    title : str, optional
+        If provided, is set as title of the plot.
+    vmin : float
+        The diffusion index corresponding to the lowest color of the
+        colormap. Defaults to -7. Keyword only.
+    vmax : float
+        The diffusion index corresponding to the highest color of the
+        colormap. Defaults to -2. Keyword only.
+    cmap : str
+        The colormap to use for the diffusion index. Defaults to ``jet``. Keyword only.
+    colorbar : bool
+        If `True`, a colorbar of the diffusion index is added to the
+        figure. Defaults to `True`. Keyword only.
+    **kwargs
+        Any keyword argument is given to `~matplotlib.axes.Axes.scatter`.
+        If either `ax` or `axis` is found in the kwargs, the corresponding
+        value is used as the axis object to plot on.
+
+    Returns
+    -------
+    matplotlib.axes.Axes
+            The `~matplotlib.axes.Axes` on which the frequency map is drawn.
+
+    Example
+    -------
+        .. code-block:: python
+
+            fig, ax = plt.subplots(figsize=(6, 6))
+            plot_tune_diagram(ax=ax, max_order=5)
+            plot_frequency_map(fma_dframe, ax=ax, s=4)
+            ax.set_xlim(0.26, 0.32)
+            ax.set_ylim(0.29, 0.34)
+    """
+    logger.debug("Plotting frequency map coloured by diffusion index")
+    axis, kwargs = maybe_get_ax(**kwargs)
+    qx, qy, diffusion = fma_dframe[["QX1", "QY1", "DIFFUSION"]].to_numpy(dtype=float).T
+    surviving = np.isfinite(diffusion)
+    points = axis.scatter(
+        qx[surviving], qy[surviving], c=diffusion[surviving], vmin=vmin, vmax=vmax, cmap=cmap, **kwargs
+    )
+
+    if colorbar:
+        logger.debug("Adding colorbar of the diffusion index")
+        axis.figure.colorbar(points, ax=axis, label="Diffusion Index")
+    if title is not None:
+        axis.set_title(title)
+    axis.set_xlabel("$Q_{x}$")
+    axis.set_ylabel("$Q_{y}$")
+    return axis
+
+
 def plot_resonance_lines_for_order(order: int, axis: Axes, **kwargs) -> None:
     """
     .. versionadded:: 1.0.0
 
     Plot resonance lines from farey sequences of the given
-    *order* on the provided `~matplotlib.axes.Axes`.
+    *order* on the provided `~matplotlib.axes.Axes`, which are
+    all the resonance lines up to this order in the unit square.
+
+    .. versionchanged:: 1.9.0
+        The lines are drawn as a single `~matplotlib.collections.LineCollection`
+        from segments computed once per order and cached, and orders up to 15
+        are supported.
 
     Parameters
     ----------
@@ -183,7 +330,7 @@ def plot_resonance_lines_for_order(order: int, axis: Axes, **kwargs) -> None:
         The `~matplotlib.axes.Axes` on which to plot the resonance
         lines.
     **kwargs
-        Any keyword argument is given to `~matplotlib.axes.Axes.plot`.
+        Any keyword argument is given to `~matplotlib.collections.LineCollection`.
 
     Example
     -------
@@ -194,25 +341,122 @@ def plot_resonance_lines_for_order(order: int, axis: Axes, **kwargs) -> None:
     """
     order_label = ORDER_TO_LABEL[order]
     logger.debug(f"Plotting {order_label} resonance lines")
-    axis.plot([], [], label=order_label, **kwargs)  # to avoid legend duplication in loops below
-
-    x = np.linspace(0, 1, 1000)
-    y = np.linspace(0, 1, 1000)
-    farey_sequences = farey_sequence(order)
-    clip = partial(np.clip, a_min=0, a_max=1)  # clip all values to plot to [0, 1]
-
-    for node in farey_sequences:
-        h, k = node  # Node h/k on the axes
-        for sequence in farey_sequences:
-            p, q = sequence
-            a = float(k * p)  # Resonance line a*Qx + b*Qy = c (linked to p/q)
-            if a > 0:
-                b, c = float(q - k * p), float(p * h)
-                axis.plot(x, clip(c / a - x * b / a), **kwargs)
-                axis.plot(x, clip(c / a + x * b / a), **kwargs)
-                axis.plot(clip(c / a - x * b / a), y, **kwargs)
-                axis.plot(clip(c / a + x * b / a), y, **kwargs)
-                axis.plot(clip(c / a - x * b / a), 1 - y, **kwargs)
-                axis.plot(clip(c / a + x * b / a), 1 - y, **kwargs)
-            if q == k and p == 1:  # FN elements below 1/k
-                break
+    segments = np.concatenate([_get_resonance_segments(lower_order) for lower_order in range(1, order + 1)])
+    axis.add_collection(LineCollection(segments, label=order_label, **kwargs))
+    axis.autoscale_view()
+
+
+def get_nearest_resonances(qx: ArrayLike, qy: ArrayLike, /, max_order: int = 6) -> tuple[np.ndarray, np.ndarray]:
+    """
+    .. versionadded:: 1.9.0
+
+    For each of the given working points, finds the nearest resonance
+    line :math:`m Q_x + n Q_y = p` of each order :math:`|m| + |n|` up to
+    *max_order*, and its distance to the working point in the tune
+    diagram. All points and orders are handled with array operations,
+    and tunes are not restricted to the unit square: integer parts are
+    reflected in *p*.
+
+    Parameters
+    ----------
+    qx : ArrayLike
+        The horizontal tunes of the working points, for instance the
+        ``tunx`` column of a footprint table. Positional only.
+    qy : ArrayLike
+        The vertical tunes of the working points, broadcastable with
+        *qx*. Positional only.
+    max_order : int
+        The order up to which to look for resonances. Defaults to 6.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        An array of shape ``(..., max_order)`` with the distance of each
+        point to its nearest resonance of each order, and an integer array
+        of shape ``(..., max_order, 3)`` with the ``(m, n, p)`` coefficients
+        of these resonances. Points with `NaN` tunes have `NaN` distances
+        and zero coefficients.
+
+    Example
+    -------
+        .. code-block:: python
+
+            distances, resonances = get_nearest_resonances(dynap_dframe.tunx, dynap_dframe.tuny)
+            closest_third_order = resonances[:, 2]  # (m, n, p) for each particle
+    """
+    if max_order < 1:
+        logger.error(f"Resonances are determined from the 1st order, got 'max_order={max_order}'")
+        msg = "The 'max_order' argument should be at least 1"
+        raise ValueError(msg)
+
+    qx, qy = np.broadcast_arrays(np.asarray(qx, dtype=float), np.asarray(qy, dtype=float))
+    valid = np.isfinite(qx) & np.isfinite(qy)
+    distances = np.empty((*qx.shape, max_order))
+    resonances = np.zeros((*qx.shape, max_order, 3), dtype=int)
+    for order in range(1, max_order + 1):
+        m, n = _get_resonance_coefficients(order).T
+        values = qx[..., np.newaxis] * m + qy[..., np.newaxis] * n
+        p = np.rint(np.where(valid[..., np.newaxis], values, 0))
+        order_distances = np.abs(values - p) / np.hypot(m, n)
+        nearest = np.argmin(np.where(valid[..., np.newaxis], order_distances, 0), axis=-1)[..., np.newaxis]
+        distances[..., order - 1] = np.take_along_axis(order_distances, nearest, axis=-1)[..., 0]
+        resonances[..., order - 1, 0] = np.where(valid, m[nearest[..., 0]], 0)
+        resonances[..., order - 1, 1] = np.where(valid, n[nearest[..., 0]], 0)
+        resonances[..., order - 1, 2] = np.take_along_axis(p, nearest, axis=-1)[..., 0]
+    return distances, resonances
+
+
+# ----- Helpers ----- #
+
+
+@lru_cache
+def _get_resonance_coefficients(order: int) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the ``(k, 2)`` array of the ``(m, n)`` coefficients of the resonances
+    of the given *order*, with :math:`|m| + |n| = order` and only one of the two
+    opposite signs of each pair. Cached, and returned read-only.
+    """
+    m = np.arange(order + 1)
+    n = order - m
+    coefficients = np.concatenate([np.stack([m, n], axis=-1), np.stack([m[1:-1], -n[1:-1]], axis=-1)])
+    coefficients.flags.writeable = False
+    return coefficients
+
+
+@lru_cache
+def _get_resonance_segments(order: int) -> np.ndarray:
+    """
+    .. versionadded:: 1.9.0
+
+    Returns the ``(k, 2, 2)`` array of the start and end points of the resonance
+    lines of exactly the given *order* within the unit square, lines equal to one
+    of a lower order (such as :math:`2 Q_x = 2`) excluded. Each line is clipped to
+    the square by intersecting the bounds of its parametric coordinate in both
+    planes. Cached, and returned read-only.
+    """
+    m, n = _get_resonance_coefficients(order).T
+    lowest, highest = np.minimum(m, 0) + np.minimum(n, 0), np.maximum(m, 0) + np.maximum(n, 0)
+    counts = highest - lowest + 1  # all p such that the line crosses the square
+    m, n = np.repeat(m, counts), np.repeat(n, counts)
+    p = np.concatenate([np.arange(low, high + 1) for low, high in zip(lowest, highest)])
+    reduced = np.gcd(np.gcd(m, n), p) == 1
+    m, n, p = m[reduced], n[reduced], p[reduced]
+
+    # Lines as point + t * direction, with the point closest to the origin
+    norm = np.hypot(m, n)
+    point = np.stack([m, n], axis=-1) * (p / norm**2)[:, np.newaxis]
+    direction = np.stack([-n, m], axis=-1) / norm[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bounds = np.stack([-point / direction, (1 - point) / direction])  # (2, k, 2) with inf where parallel
+    parallel = direction == 0
+    low = np.where(parallel, -np.inf, bounds.min(axis=0)).max(axis=-1)
+    high = np.where(parallel, np.inf, bounds.max(axis=0)).min(axis=-1)
+    crossing = ~np.isclose(low, high)  # lines only touching a corner are dropped
+
+    ends = np.stack([low, high], axis=-1)[crossing, :, np.newaxis]
+    segments = point[crossing, np.newaxis] + ends * direction[crossing, np.newaxis]
+    segments = np.clip(segments, 0, 1)  # rounding errors at the edges
+    segments.flags.writeable = False
+    return segments
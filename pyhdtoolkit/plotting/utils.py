@@ -19,6 +19,8 @@ from loguru import logger
 from matplotlib import transforms
 from matplotlib.patches import Ellipse
 
+from pyhdtoolkit.cpymadtools.cache import get_twiss_dframe
+
 if TYPE_CHECKING:
     from cpymad.madx import Madx
     from matplotlib.text import Annotation
@@ -536,8 +538,7 @@ def _get_twiss_table_with_offsets_and_limits(
     """
     # Restrict the span of twiss_df to avoid plotting all elements then cropping when xlimits is given
     logger.trace("Getting TWISS table from MAD-X")
-    madx.command.twiss(**kwargs)
-    twiss_df = madx.table.twiss.dframe()
+    twiss_df = get_twiss_dframe(madx, raise_on_failure=False, **kwargs)
     twiss_df.s = twiss_df.s - xoffset
     return twiss_df[twiss_df.s.between(*xlimits)] if xlimits else twiss_df
 
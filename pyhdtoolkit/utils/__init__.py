@@ -1,3 +1,10 @@
-from . import cmdline, contexts, decorators, htcondor, logging  # noqa: TID252
+from typing import TYPE_CHECKING
 
-__all__ = ["cmdline", "contexts", "decorators", "htcondor", "logging"]
+from pyhdtoolkit._lazy import attach
+
+if TYPE_CHECKING:
+    from . import cmdline, contexts, decorators, htcondor, logging, profiling  # noqa: TID252
+
+__all__ = ["cmdline", "contexts", "decorators", "htcondor", "logging", "profiling"]
+
+__getattr__, __dir__ = attach(__name__, submodules=__all__)
@@ -27,6 +27,13 @@ def timeit(function: Callable) -> NoneType:  # type: ignore
     via *function*. Original code from is from :user:`Jaime Coello
     de Portugal <jaimecp89>`.
 
+    Tip
+    ---
+        To know where the time goes in a study using `~pyhdtoolkit.cpymadtools`
+        and `~pyhdtoolkit.plotting` functions, prefer the nested spans recorded
+        by the `~.utils.profiling.SpanProfiler`, which also separate the time
+        spent waiting on ``MAD-X`` from the `Python` side.
+
     Parameters
     ----------
     function : Callable
@@ -0,0 +1,396 @@
+"""
+.. _utils-profiling:
+
+Profiling Utilities
+-------------------
+
+Provides a profiler recording the calls to the public functions of the
+`~pyhdtoolkit.cpymadtools` (including `~pyhdtoolkit.cpymadtools.lhc`)
+and `~pyhdtoolkit.plotting` subpackages as nested spans. For each span,
+the time spent waiting on the ``MAD-X`` process is separated from the
+time spent in `Python` (conversions, computations, plotting etc), and
+the number of commands sent to ``MAD-X`` is counted.
+
+The recorded spans can be exported as `JSON`, or as a `Chrome` trace to
+be inspected in a trace viewer such as ``chrome://tracing`` or
+`Perfetto <https://ui.perfetto.dev>`_.
+
+.. versionadded:: 1.9.0
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+
+import pandas as pd
+from cpymad.madx import Madx
+from loguru import logger
+from minrpc.client import Client
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import CodeType, FrameType, TracebackType
+
+# Modules whose public functions and methods are recorded as spans
+TRACED_PACKAGES: tuple[str, ...] = ("pyhdtoolkit.cpymadtools", "pyhdtoolkit.plotting")
+# Generators and coroutines are entered and left at each step, they are not recorded
+_GENERATOR_FLAGS: int = inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+_ACTIVE_PROFILER: SpanProfiler | None = None
+
+
+@dataclass
+class Span:
+    """
+    .. versionadded:: 1.9.0
+
+    A single recorded span, with the timings and ``MAD-X`` commands count
+    of everything that happened within it (children spans included).
+
+    Attributes
+    ----------
+    name : str
+        The name of the span, the qualified name of the recorded function
+        or the name given to `~.utils.profiling.SpanProfiler.span`.
+    start : float
+        Start time of the span, in seconds since the profiler started.
+    end : float
+        End time of the span, in seconds since the profiler started.
+    madx_time : float
+        Time spent waiting on the ``MAD-X`` process during the span, in
+        seconds.
+    madx_commands : int
+        Number of commands sent to ``MAD-X`` during the span.
+    children : list[Span]
+        The spans opened (and closed) within this one.
+    """
+
+    name: str
+    start: float
+    end: float = float("nan")
+    madx_time: float = 0.0
+    madx_commands: int = 0
+    children: list[Span] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        """Total wall time of the span, in seconds."""
+        return self.end - self.start
+
+    @property
+    def python_time(self) -> float:
+        """Time of the span not spent waiting on ``MAD-X``, in seconds."""
+        return self.duration - self.madx_time
+
+    @property
+    def self_time(self) -> float:
+        """Time of the span not spent in any of its children, in seconds."""
+        return self.duration - sum(child.duration for child in self.children)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the span and its children as a (JSON-serializable) `dict`."""
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "madx_time": self.madx_time,
+            "python_time": self.python_time,
+            "madx_commands": self.madx_commands,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def walk(self) -> Iterator[tuple[int, Span]]:
+        """Yields this span and all its descendants, depth-first, with their depth."""
+        stack = [(0, self)]
+        while stack:
+            depth, span = stack.pop()
+            yield depth, span
+            stack.extend((depth + 1, child) for child in reversed(span.children))
+
+
+@dataclass
+class _OpenSpan:
+    span: Span
+    frame: FrameType | None  # None for spans opened with SpanProfiler.span
+    madx_time: float  # profiler counters when the span was opened
+    madx_commands: int
+
+
+class SpanProfiler:
+    """
+    .. versionadded:: 1.9.0
+
+    Records the calls to the public functions (and methods of public
+    classes) of the `~pyhdtoolkit.cpymadtools` and `~pyhdtoolkit.plotting`
+    subpackages as nested spans, together with the time spent waiting on
+    ``MAD-X`` and the number of commands sent to it. Extra spans can be
+    opened around any code with the `~.utils.profiling.SpanProfiler.span`
+    method, to structure the recording of a whole study.
+
+    The profiler is meant to be used as a context manager, and only records
+    what happens in the thread it was started from. Only one profiler can be
+    active at a time.
+
+    Note
+    ----
+        While active, the profiler replaces the `Python` profiling function
+        (see `sys.setprofile`), and can therefore not be used together with
+        `cProfile` or similar tools. ``MAD-X`` work done in other processes,
+        for instance by the workers of a `~.cpymadtools.pool.MadxPool`, is
+        not recorded.
+
+    Example
+    -------
+        .. code-block:: python
+
+            with SpanProfiler() as profiler:
+                with profiler.span("setup"):
+                    lhc = LHCSetup(run=3, opticsfile="R2022a_A30cmC30cmA10mL200cm.madx")
+                with profiler.span("matching"):
+                    match_tunes(lhc.madx, "lhc", "lhcb1", 62.31, 60.32)
+
+            print(profiler.summary())
+            profiler.to_chrome_trace("study_trace.json")
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []  # the top-level spans
+        self.madx_time: float = 0.0  # running totals
+        self.madx_commands: int = 0
+        self._stack: list[_OpenSpan] = []
+        self._span_names: dict[CodeType, str | None] = {}
+        self._origin: float = 0.0
+        self._thread: int | None = None
+        self._previous_profile = None
+        self._patched: dict[type, tuple[str, Any]] = {}
+
+    # ----- Public API ----- #
+
+    def start(self) -> None:
+        """Starts recording. Prefer using the profiler as a context manager."""
+        global _ACTIVE_PROFILER  # noqa: PLW0603
+        if _ACTIVE_PROFILER is not None:
+            logger.error("Attempted to start a profiler while another one is active")
+            msg = "Another SpanProfiler is already active"
+            raise RuntimeError(msg)
+
+        logger.debug("Starting span profiler")
+        _ACTIVE_PROFILER = self
+        self._origin = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._patch_madx_interface()
+        self._previous_profile = sys.getprofile()
+        sys.setprofile(self._profile)
+
+    def stop(self) -> None:
+        """Stops recording, closing any span still open."""
+        global _ACTIVE_PROFILER  # noqa: PLW0603
+        if _ACTIVE_PROFILER is not self:
+            return
+
+        logger.debug("Stopping span profiler")
+        sys.setprofile(self._previous_profile)
+        self._restore_madx_interface()
+        while self._stack:
+            self._close_span()
+        _ACTIVE_PROFILER = None
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """
+        Records the code run in the context as a span with the given name.
+        The functions called within are recorded as its children.
+
+        Parameters
+        ----------
+        name : str
+            The name of the span.
+
+        Returns
+        -------
+        Iterator[Span]
+            The opened span.
+        """
+        span = self._open_span(name, frame=None)
+        try:
+            yield span
+        finally:
+            # close spans of functions left through an exception first
+            while self._stack and self._stack[-1].span is not span:
+                self._close_span()
+            if self._stack:
+                self._close_span()
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Aggregates the recorded spans by name.
+
+        Returns
+        -------
+        pandas.DataFrame
+            A `~pandas.DataFrame` indexed by span name, with the number of
+            calls and the total, ``MAD-X``, `Python` and self times (in seconds)
+            as well as the number of ``MAD-X`` commands of each. Sorted by
+            decreasing total time. Recursive calls are counted at each level.
+        """
+        columns = ["CALLS", "TOTAL_TIME", "MADX_TIME", "PYTHON_TIME", "SELF_TIME", "MADX_COMMANDS"]
+        records = [
+            (span.name, 1, span.duration, span.madx_time, span.python_time, span.self_time, span.madx_commands)
+            for root in self.spans
+            for _, span in root.walk()
+        ]
+        if not records:
+            return pd.DataFrame(columns=columns).rename_axis("NAME")
+        dframe = pd.DataFrame.from_records(records, columns=["NAME", *columns])
+        return dframe.groupby("NAME").sum().sort_values("TOTAL_TIME", ascending=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the recorded spans and totals as a (JSON-serializable) `dict`."""
+        return {
+            "madx_time": self.madx_time,
+            "madx_commands": self.madx_commands,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+    def to_json(self, file: Path | str) -> None:
+        """
+        Writes the recorded spans, nested, to a `JSON` file.
+
+        Parameters
+        ----------
+        file : pathlib.Path | str
+            The file to write to.
+        """
+        logger.debug(f"Writing recorded spans to '{file}'")
+        Path(file).write_text(json.dumps(self.to_dict(), indent=2))
+
+    def to_chrome_trace(self, file: Path | str) -> None:
+        """
+        Writes the recorded spans to a file in the `Chrome` trace event format,
+        which can be loaded in ``chrome://tracing`` or `Perfetto`. The ``MAD-X``
+        and `Python` times as well as the ``MAD-X`` commands count of each span
+        are given as its arguments.
+
+        Parameters
+        ----------
+        file : pathlib.Path | str
+            The file to write to.
+        """
+        logger.debug(f"Writing recorded spans as a Chrome trace to '{file}'")
+        events = [
+            {
+                "name": span.name,
+                "cat": span.name.rsplit(".", maxsplit=1)[0],
+                "ph": "X",  # complete event
+                "ts": span.start * 1e6,  # in microseconds
+                "dur": span.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": self._thread or 0,
+                "args": {
+                    "madx_time": span.madx_time,
+                    "python_time": span.python_time,
+                    "madx_commands": span.madx_commands,
+                },
+            }
+            for root in self.spans
+            for _, span in root.walk()
+        ]
+        Path(file).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    # ----- Context manager ----- #
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
+    ) -> None:
+        self.stop()
+
+    # ----- Spans handling ----- #
+
+    def _profile(self, frame: FrameType, event: str, arg: Any) -> None:  # noqa: ARG002
+        if event == "call":
+            name = self._span_name(frame)
+            if name is not None:
+                self._open_span(name, frame)
+        elif event == "return" and self._stack and self._stack[-1].frame is frame:
+            self._close_span()
+
+    def _span_name(self, frame: FrameType) -> str | None:
+        """The name of the span for calls to this code, or None if it is not recorded (cached per code object)."""
+        code = frame.f_code
+        try:
+            return self._span_names[code]
+        except KeyError:
+            pass
+
+        module: str = frame.f_globals.get("__name__", "")
+        qualname_parts = code.co_qualname.split(".")
+        recorded = (
+            module.startswith(TRACED_PACKAGES)
+            and not code.co_flags & _GENERATOR_FLAGS
+            and not any(part.startswith(("_", "<")) for part in qualname_parts[:-1])  # private / nested
+            and (not qualname_parts[-1].startswith(("_", "<")) or qualname_parts[-1] == "__init__")
+        )
+        # Functions of private modules are exposed by their package (e.g. the lhc ones)
+        public_module = ".".join(part for part in module.split(".") if not part.startswith("_"))
+        name = f"{public_module}.{code.co_qualname}" if recorded else None
+        self._span_names[code] = name
+        return name
+
+    def _open_span(self, name: str, frame: FrameType | None) -> Span:
+        span = Span(name=name, start=time.perf_counter() - self._origin)
+        parent = self.spans if not self._stack else self._stack[-1].span.children
+        parent.append(span)
+        self._stack.append(_OpenSpan(span, frame, self.madx_time, self.madx_commands))
+        return span
+
+    def _close_span(self) -> None:
+        opened = self._stack.pop()
+        opened.span.end = time.perf_counter() - self._origin
+        opened.span.madx_time = self.madx_time - opened.madx_time
+        opened.span.madx_commands = self.madx_commands - opened.madx_commands
+
+    # ----- MAD-X interface hooks ----- #
+
+    def _patch_madx_interface(self) -> None:
+        """
+        Wraps the methods through which all of cpymad's communication with the
+        MAD-X process (RPC round trips) and all commands (input) go, at the class
+        level so that instances created while profiling are also covered.
+        """
+        profiler = self
+        communicate = Client._communicate
+        madx_input = Madx.input
+
+        def timed_communicate(client: Client, message: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return communicate(client, message)
+            finally:
+                if threading.get_ident() == profiler._thread:
+                    profiler.madx_time += time.perf_counter() - start
+
+        def counted_input(madx: Madx, text: str) -> Any:
+            if threading.get_ident() == profiler._thread:
+                profiler.madx_commands += 1
+            return madx_input(madx, text)
+
+        self._patched = {Client: ("_communicate", communicate), Madx: ("input", madx_input)}
+        Client._communicate = timed_communicate
+        Madx.input = counted_input
+
+    def _restore_madx_interface(self) -> None:
+        for cls, (attribute, original) in self._patched.items():
+            setattr(cls, attribute, original)
+        self._patched = {}
@@ -0,0 +1,171 @@
+import pytest
+from cpymad.madx import TwissFailed
+from pandas.testing import assert_frame_equal
+
+from pyhdtoolkit.cpymadtools import cache
+from pyhdtoolkit.cpymadtools.cache import (
+    disable_twiss_cache,
+    enable_twiss_cache,
+    get_twiss_dframe,
+    invalidate_twiss_cache,
+    invalidates_twiss_cache,
+    twiss_cache,
+)
+from pyhdtoolkit.cpymadtools.twiss import get_twiss_tfs
+
+
+class TestTwissCache:
+    def test_repeated_calls_reuse_result(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        first = get_twiss_tfs(madx)
+        second = get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 1
+        assert_frame_equal(first, second)
+        assert first.headers == second.headers
+
+    def test_cached_results_are_copies(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        first = get_twiss_dframe(madx)
+        first.s = first.s - 100  # as done in the plotting functions
+        second = get_twiss_dframe(madx)
+        assert len(_twiss_runs) == 1
+        assert second.s.iloc[0] == 0
+
+    def test_dframe_matches_cpymad(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        reference = madx.twiss(centre=True).dframe()
+
+        with twiss_cache(madx):
+            assert_frame_equal(get_twiss_dframe(madx, centre=True), reference)
+            assert_frame_equal(get_twiss_dframe(madx, centre=True), reference)
+            assert_frame_equal(get_twiss_dframe(madx, columns=["s", "betx"], centre=True), reference[["s", "betx"]])
+
+    def test_failed_twiss_raises_unless_asked_not_to(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        madx.globals.kqf = 10  # unstable lattice, TWISS fails
+
+        with pytest.raises(TwissFailed):
+            get_twiss_dframe(madx)
+        get_twiss_dframe(madx, raise_on_failure=False)  # as madx.command.twiss, does not raise
+
+    def test_different_kwargs_are_different_entries(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        get_twiss_tfs(madx)
+        get_twiss_tfs(madx, centre=True)
+        get_twiss_tfs(madx)
+        get_twiss_tfs(madx, centre=True)
+        assert len(_twiss_runs) == 2  # noqa: PLR2004
+
+    def test_missing_columns_fetched_without_twiss(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        few_columns = get_twiss_tfs(madx, columns=["s", "betx"])
+        all_columns = get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 1
+        assert_frame_equal(few_columns, all_columns[["S", "BETX"]])
+
+    def test_changed_globals_are_fingerprinted(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+        kqf = madx.globals["kqf"]
+
+        madx.globals["kqf"] = kqf * 1.01
+        modified = get_twiss_tfs(madx)
+        madx.globals["kqf"] = kqf
+        nominal = get_twiss_tfs(madx)
+        madx.globals["kqf"] = kqf * 1.01
+        assert_frame_equal(get_twiss_tfs(madx), modified)
+        madx.globals["kqf"] = kqf
+        assert_frame_equal(get_twiss_tfs(madx), nominal)
+
+        assert len(_twiss_runs) == 2  # noqa: PLR2004
+        assert modified.headers["Q1"] != nominal.headers["Q1"]
+
+    def test_other_commands_invalidate(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        get_twiss_tfs(madx)
+        madx.command.select(flag="twiss", column=["name", "s"])  # read-only
+        madx.input("value, table(summ, q1);")  # read-only
+        get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 1
+
+        madx.use(sequence="CAS3")
+        get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 2  # noqa: PLR2004
+
+    def test_explicit_invalidation(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx)
+
+        @invalidates_twiss_cache
+        def change_machine(madx, /):
+            pass
+
+        get_twiss_tfs(madx)
+        invalidate_twiss_cache(madx)
+        get_twiss_tfs(madx)
+        change_machine(madx)
+        get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 3  # noqa: PLR2004
+
+    def test_maxsize_evicts_least_recently_used(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        enable_twiss_cache(madx, maxsize=2)
+
+        get_twiss_tfs(madx)
+        get_twiss_tfs(madx, centre=True)
+        get_twiss_tfs(madx)  # hit, refreshes first entry
+        get_twiss_tfs(madx, chrom=True)  # evicts the centre=True entry
+        get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 3  # noqa: PLR2004
+        get_twiss_tfs(madx, centre=True)
+        assert len(_twiss_runs) == 4  # noqa: PLR2004
+
+    def test_context_manager_restores_state(self, _matched_base_lattice, _twiss_runs):
+        madx = _matched_base_lattice
+        command_log = madx._command_log
+
+        with twiss_cache(madx):
+            get_twiss_tfs(madx)
+            get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 1
+        assert madx._command_log is command_log
+
+        get_twiss_tfs(madx)
+        get_twiss_tfs(madx)
+        assert len(_twiss_runs) == 3  # noqa: PLR2004
+
+    def test_disable_without_cache_does_nothing(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        disable_twiss_cache(madx)
+        invalidate_twiss_cache(madx)
+
+    def test_invalid_maxsize_raises(self, _matched_base_lattice):
+        with pytest.raises(ValueError, match="Invalid 'maxsize' argument"):
+            enable_twiss_cache(_matched_base_lattice, maxsize=0)
+
+
+# ----- Fixtures ----- #
+
+
+@pytest.fixture
+def _twiss_runs(monkeypatch) -> list[dict]:
+    """Records the kwargs of each TWISS actually run through the cache helpers."""
+    runs = []
+    original_run_twiss = cache._run_twiss
+
+    def run_twiss(madx, /, raise_on_failure=False, **kwargs):
+        runs.append(kwargs)
+        return original_run_twiss(madx, raise_on_failure=raise_on_failure, **kwargs)
+
+    monkeypatch.setattr(cache, "_run_twiss", run_twiss)
+    return runs
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import tfs
+
+from pyhdtoolkit.cpymadtools.da import make_da_table
+from pyhdtoolkit.cpymadtools.track import track_single_particle
+from pyhdtoolkit.cpymadtools.tune import _get_initial_coordinates
+
+DA_COLUMNS: list[str] = ["ANGLE", "DA", "DA_X", "DA_Y", "LOST_AMPLITUDE", "SURVIVAL"]
+NTURNS: int = 500
+TOLERANCE: float = 0.25
+
+
+def test_make_da_table(_matched_base_lattice, tmp_path):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+    export_file = tmp_path / "da.tfs"
+
+    da = make_da_table(madx, NTURNS, file=export_file, n_angles=3, max_amplitude=30, tolerance=TOLERANCE, processes=2)
+    assert isinstance(da, tfs.TfsDataFrame)
+    assert da.columns.tolist() == DA_COLUMNS
+    assert np.allclose(da.ANGLE, [0, 45, 90])
+    assert ((da.LOST_AMPLITUDE - da.DA) <= TOLERANCE).all()
+    assert ((da.SURVIVAL >= 1) & (da.SURVIVAL <= NTURNS)).all()
+    assert np.allclose(np.hypot(da.DA_X, da.DA_Y), da.DA)
+    assert da.headers["MIN_DA"] == da.DA.min()
+    assert tfs.read(export_file).columns.tolist() == DA_COLUMNS
+
+    # Serial check of the bracket with single particle tracking along the horizontal plane
+    unit = _get_initial_coordinates(madx, np.array([1.0]), np.array([0.0]))[0]
+    for amplitude, lost in [(da.DA[0], False), (da.LOST_AMPLITUDE[0], True)]:
+        x, px, y, py, t, pt = amplitude * unit
+        tracks = track_single_particle(
+            madx, initial_coordinates=(x, px, y, py, t, pt), nturns=NTURNS, aperture=True, recloss=True
+        )
+        assert (len(tracks["observation_point_1"]) < NTURNS + 1) is lost
+
+
+def test_make_da_table_no_loss(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+
+    da = make_da_table(madx, NTURNS, n_angles=2, max_amplitude=4, processes=2)
+    assert (da.DA == 4).all()  # noqa: PLR2004
+    assert da.LOST_AMPLITUDE.isna().all()
+    assert (da.SURVIVAL == NTURNS).all()
+
+
+@pytest.mark.parametrize(
+    "scan_kwargs", [{"step": 0}, {"tolerance": -0.1}, {"max_amplitude": 1, "step": 2}], ids=["step", "tol", "max"]
+)
+def test_make_da_table_invalid_scan(_matched_base_lattice, scan_kwargs):
+    with pytest.raises(ValueError, match="'step' and 'tolerance' should be positive"):
+        make_da_table(_matched_base_lattice, **scan_kwargs)
@@ -0,0 +1,86 @@
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import tfs
+from matplotlib.collections import PathCollection
+
+from pyhdtoolkit.cpymadtools.fma import make_fma_table
+from pyhdtoolkit.cpymadtools.utils import load_npz_table
+from pyhdtoolkit.plotting.tune import plot_frequency_map, plot_tune_diagram
+
+# Forcing non-interactive Agg backend so rendering is done similarly across platforms during tests
+mpl.use("Agg")
+
+FMA_COLUMNS: list[str] = ["FX", "FY", "X", "Y", "QX1", "QY1", "QX2", "QY2", "DIFFUSION"]
+NTURNS: int = 256
+# Diffusion index below which particles of the CAS lattice at a few sigma are regular
+REGULAR_DIFFUSION: float = -3
+
+
+@pytest.mark.parametrize(
+    ("grid", "nparticles", "n_angles"),
+    [("cartesian", 1 + 3 * 3, 3), ("polar", 1 + 3 * 7, 7), ("legacy", 1 + 4 * 14, 14)],
+)
+def test_make_fma_table(_matched_base_lattice, tmp_path, grid, nparticles, n_angles):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+    export_file = tmp_path / "fma.tfs"
+
+    fma = make_fma_table(madx, sigma=3, grid=grid, nturns=NTURNS, processes=2, file=export_file, sidecars=["npz"])
+    assert isinstance(fma, tfs.TfsDataFrame)
+    assert len(fma) == nparticles
+    assert fma.columns.tolist() == FMA_COLUMNS
+    assert fma.headers["NTURNS"] == NTURNS
+    assert fma.headers["GRID"] == grid.upper()
+    assert fma.headers["ANGLE"] == n_angles
+    assert fma.headers["DSIGMA"] == 1
+    assert fma[FMA_COLUMNS].notna().all().all()
+
+    # The small amplitude particles are regular and sit at the working point
+    assert np.allclose(fma.QX1[0], 0.335, atol=2e-3)
+    assert np.allclose(fma.QY1[0], 0.29, atol=2e-3)
+    assert (fma.DIFFUSION < REGULAR_DIFFUSION).all()
+
+    assert tfs.read(export_file).columns.tolist() == FMA_COLUMNS
+    assert np.allclose(load_npz_table(export_file.with_suffix(".npz"))["DIFFUSION"], fma.DIFFUSION)
+
+
+def test_make_fma_table_consistent_with_footprint_window(_matched_base_lattice):
+    """The first window tunes are those of a footprint tracked for the same number of turns."""
+    from pyhdtoolkit.cpymadtools.tune import make_footprint_table  # noqa: PLC0415
+
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+
+    fma = make_fma_table(madx, sigma=2, grid="polar", nturns=NTURNS, processes=2)
+    footprint = make_footprint_table(madx, sigma=2, nturns=NTURNS, engine="track", processes=2)
+    assert np.allclose(fma[["X", "Y"]], footprint[["x", "y"]])
+    assert np.allclose(fma[["QX1", "QY1"]], footprint[["tunx", "tuny"]])
+
+
+@pytest.mark.parametrize(("kwargs", "match"), [({"method": "sussix"}, "method"), ({"sidecars": ["hdf5"]}, "sidecars")])
+def test_make_fma_table_invalid_inputs(_matched_base_lattice, kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        make_fma_table(_matched_base_lattice, **kwargs)
+
+
+def test_plot_frequency_map():
+    fma = tfs.TfsDataFrame(
+        {
+            "QX1": [0.31, 0.312, np.nan],
+            "QY1": [0.32, 0.318, np.nan],
+            "DIFFUSION": [-6.0, -3.0, np.nan],  # last particle is lost
+        }
+    )
+    _figure, axis = plt.subplots()
+    plot_tune_diagram(ax=axis, max_order=3)
+    assert plot_frequency_map(fma, ax=axis, title="FMA") is axis
+
+    points = next(collection for collection in axis.collections if isinstance(collection, PathCollection))
+    assert len(points.get_offsets()) == fma.DIFFUSION.notna().sum()
+    assert np.allclose(points.get_array(), [-6.0, -3.0])
+    assert axis.get_title() == "FMA"
+    plt.close("all")
@@ -36,12 +36,14 @@ from pyhdtoolkit.cpymadtools.constants import (
 )
 from pyhdtoolkit.cpymadtools.lhc import (
     LHCSetup,
+    _setup,
     add_markers_around_lhc_ip,
     apply_lhc_colinearity_knob,
     apply_lhc_colinearity_knob_delta,
     apply_lhc_coupling_knob,
     apply_lhc_rigidity_waist_shift_knob,
     carry_colinearity_knob_over,
+    clear_lhc_machine_cache,
     correct_lhc_global_coupling,
     correct_lhc_orbit,
     deactivate_lhc_arc_sextupoles,
@@ -874,6 +876,54 @@ def test_lhc_run2_setup_context_manager(_proton_opticsfile, slicefactor):
         assert math.isclose(madx.table.summ.q2[0], 60.32, abs_tol=1e-4, rel_tol=1e-2)
 
 
+@pytest.mark.parametrize("slicefactor", [None, 4])
+def test_lhc_run2_setup_machine_cache(_proton_opticsfile, slicefactor, tmp_path, monkeypatch):
+    with LHCSetup(run=2, opticsfile=_proton_opticsfile, slicefactor=slicefactor, stdout=False) as madx:
+        reference = madx.twiss().dframe()
+        reference_tunes = (madx.table.summ.q1[0], madx.table.summ.q2[0])
+
+    with LHCSetup(run=2, opticsfile=_proton_opticsfile, slicefactor=slicefactor, cache=tmp_path, stdout=False) as madx:
+        assert_frame_equal(madx.twiss().dframe(), reference)
+    assert len(list(tmp_path.glob("lhc_*.madx"))) == 1
+
+    # Now the machine is loaded from the cache, with no preparation step
+    monkeypatch.setattr(_setup, "re_cycle_sequence", _fail_if_called)
+    with LHCSetup(run=2, opticsfile=_proton_opticsfile, slicefactor=slicefactor, cache=tmp_path, stdout=False) as madx:
+        twiss_df = madx.twiss().dframe()
+        # Sequence start and end markers are moved when loading, other elements have identical optics
+        columns = ["s", "l", "angle", "k1l", "k2l", "betx", "bety", "alfx", "alfy", "mux", "muy", "dx", "dy", "x", "y"]
+        assert_frame_equal(
+            twiss_df.loc[twiss_df.keyword != "marker", columns], reference.loc[reference.keyword != "marker", columns]
+        )
+        assert (madx.table.summ.q1[0], madx.table.summ.q2[0]) == reference_tunes
+
+    clear_lhc_machine_cache(tmp_path)
+    assert not list(tmp_path.glob("lhc_*.madx"))
+
+
+def test_lhc_machine_cache_evicts_least_recently_used(_proton_opticsfile, tmp_path, monkeypatch):
+    monkeypatch.setattr(_setup, "_MAX_CACHED_MACHINES", 2)
+    for energy in (6500, 6800, 6500, 7000):  # second 6500 is a cache hit and refreshes the entry
+        with LHCSetup(run=2, opticsfile=_proton_opticsfile, energy=energy, cache=tmp_path, stdout=False):
+            pass
+
+    cached_files = list(tmp_path.glob("lhc_*.madx"))
+    assert len(cached_files) == _setup._MAX_CACHED_MACHINES
+    assert (
+        _setup._lhc_machine_cache_file(
+            tmp_path,
+            2,
+            PROTON_DIR.parent / "lhc_as-built.seq",
+            PROTON_DIR / "opticsfile.22",
+            1,
+            use_b4=False,
+            energy=6800,
+            slicefactor=None,
+        )
+        not in cached_files
+    )
+
+
 def test_lhc_run2_setup_raises_on_wrong_b4_conditions(_proton_opticsfile):
     with pytest.raises(
         ValueError, match="Cannot use beam 4 sequence file for beam 1"
@@ -891,6 +941,11 @@ def test_lhc_run2_setup_raises_on_absent_sequence_file():
 # ---------------------- Private Utilities ---------------------- #
 
 
+def _fail_if_called(*_args, **_kwargs):
+    msg = "Should not have been called"
+    raise AssertionError(msg)
+
+
 @pytest.fixture
 def _magnets_fields_path() -> pathlib.Path:
     return INPUTS_DIR / "cpymadtools" / "magnets_fields.tfs"
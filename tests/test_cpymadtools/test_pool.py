@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+from cpymad.madx import Madx
+
+from pyhdtoolkit.cpymadtools._generators import LatticeGenerator
+from pyhdtoolkit.cpymadtools.pool import JobTimeoutError, MadxPool, WorkerCrashedError, WorkerSetupError
+
+BASE_LATTICE = LatticeGenerator.generate_base_cas_lattice()
+
+
+class TestMadxPool:
+    def test_map_results_in_order(self, _cas_pool):
+        kqf_values = [0.066, 0.067, 0.068, 0.069, 0.070]
+        tunes = _cas_pool.map(_q1_for_kqf, kqf_values)
+
+        with Madx(stdout=False) as madx:
+            _setup_cas_madx(madx)
+            expected = [_q1_for_kqf(madx, kqf) for kqf in kqf_values]
+        assert tunes == pytest.approx(expected)
+
+    def test_failed_job_raises(self, _cas_pool):
+        with pytest.raises(ZeroDivisionError):
+            _cas_pool.map(_inverse, [1, 0, 2])
+        assert _cas_pool.map(_inverse, [1, 2]) == [1, 0.5]  # pool still usable
+
+    def test_return_exceptions(self, _cas_pool):
+        results = _cas_pool.map(_inverse, [1, 0, 4], return_exceptions=True)
+        assert isinstance(results[1], ZeroDivisionError)
+        assert results[::2] == [1, 0.25]
+
+    def test_timeout_restarts_worker(self, _cas_pool):
+        results = _cas_pool.map(_sleep, [0, 30, 0], timeout=2, return_exceptions=True)
+        assert results[0] == 0
+        assert isinstance(results[1], JobTimeoutError)
+        assert results[2] == 0
+        assert len(_cas_pool) == _cas_pool.processes
+        assert _cas_pool.map(_sleep, [0, 0, 0, 0]) == [0, 0, 0, 0]
+
+    def test_crash_restarts_worker(self, _cas_pool):
+        results = _cas_pool.map(_crash_on, [False, True, False], return_exceptions=True)
+        assert results[0] == "alive"
+        assert isinstance(results[1], WorkerCrashedError)
+        assert results[2] == "alive"
+        assert _cas_pool.map(_crash_on, [False] * 4) == ["alive"] * 4
+
+    def test_closed_pool_raises(self):
+        pool = MadxPool(_cas_madx, processes=1)
+        pool.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            pool.map(_inverse, [1])
+
+    def test_setup_failure_raises(self):
+        with pytest.raises(WorkerSetupError, match="ZeroDivisionError"):
+            MadxPool(_failing_setup, processes=2)
+
+    @pytest.mark.parametrize("processes", [0, -2])
+    def test_invalid_processes_raises(self, processes):
+        with pytest.raises(ValueError, match="Invalid 'processes' argument"):
+            MadxPool(_cas_madx, processes=processes)
+
+
+# ----- Helpers ----- #
+
+
+def _setup_cas_madx(madx: Madx) -> None:
+    madx.input(BASE_LATTICE)
+    madx.command.use(sequence="CAS3")
+
+
+def _cas_madx() -> Madx:
+    madx = Madx(stdout=False)
+    _setup_cas_madx(madx)
+    return madx
+
+
+def _failing_setup() -> Madx:
+    return 1 / 0
+
+
+def _q1_for_kqf(madx: Madx, kqf: float) -> float:
+    madx.globals["kqf"] = kqf
+    madx.command.twiss()
+    return madx.table.summ.q1[0]
+
+
+def _inverse(_madx: Madx, value: float) -> float:
+    return 1 / value
+
+
+def _sleep(_madx: Madx, duration: float) -> float:
+    time.sleep(duration)
+    return duration
+
+
+def _crash_on(_madx: Madx, crash: bool) -> str:
+    if crash:
+        os._exit(1)
+    return "alive"
+
+
+# ----- Fixtures ----- #
+
+
+@pytest.fixture
+def _cas_pool() -> MadxPool:
+    with MadxPool(_cas_madx, processes=2) as pool:
+        yield pool
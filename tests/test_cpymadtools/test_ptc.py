@@ -1,14 +1,27 @@
 import pathlib
 
+import numpy as np
 import pytest
 import tfs
 from cpymad.madx import Madx
+from numpy.testing import assert_allclose
 from pandas import DataFrame
 from pandas.testing import assert_frame_equal
 
 from pyhdtoolkit.cpymadtools._generators import LatticeGenerator
 from pyhdtoolkit.cpymadtools.matching import match_tunes_and_chromaticities
-from pyhdtoolkit.cpymadtools.ptc import get_amplitude_detuning, get_rdts, ptc_track_particle, ptc_twiss
+from pyhdtoolkit.cpymadtools.ptc import (
+    PTCScan,
+    PTCSession,
+    get_amplitude_detuning,
+    get_rdts,
+    ptc_scan,
+    ptc_track_particle,
+    ptc_track_particles,
+    ptc_twiss,
+    rdts_to_complex,
+)
+from pyhdtoolkit.cpymadtools.track import COORDINATES, TrackedParticles
 
 CURRENT_DIR = pathlib.Path(__file__).parent
 INPUTS_DIR = CURRENT_DIR.parent / "inputs"
@@ -48,6 +61,30 @@ def test_rdts(tmp_path, _rdts_tfs_path):
     assert_frame_equal(reference_df.set_index("NAME"), rdts_df.set_index("NAME"), rtol=5e-3)
 
 
+def test_rdts_to_complex(_rdts_tfs_path):
+    rdts_df = tfs.read(_rdts_tfs_path)
+    complex_df = rdts_to_complex(rdts_df)
+
+    assert complex_df.index.name == "NAME"
+    assert complex_df.index.tolist() == rdts_df.NAME.tolist()
+    assert complex_df.headers == rdts_df.headers
+    assert (complex_df.dtypes == np.complex128).all()
+    assert len(complex_df.columns) == len([column for column in rdts_df.columns if column.startswith("GNFA")])
+    assert_allclose(complex_df.F3000.to_numpy().real, rdts_df.GNFC_3_0_0_0_0_0.to_numpy())
+    assert_allclose(complex_df.F3000.to_numpy().imag, rdts_df.GNFS_3_0_0_0_0_0.to_numpy())
+    assert_allclose(np.abs(complex_df.F1020.to_numpy()), rdts_df.GNFA_1_0_2_0_0_0.to_numpy(), rtol=1e-6)
+
+
+def test_rdts_as_complex(tmp_path, _matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    complex_df = get_rdts(madx, order=3, file=tmp_path / "complex.tfs", as_complex=True)
+
+    assert "F3000" in complex_df.columns
+    assert (complex_df.dtypes == np.complex128).all()
+    assert_frame_equal(tfs.read(tmp_path / "complex.tfs", index="NAME"), complex_df, rtol=1e-9)  # written precision
+
+
 def test_ptc_twiss(tmp_path, _matched_base_lattice, _ptc_twiss_tfs_path):
     madx = _matched_base_lattice
     ptc_twiss_df = ptc_twiss(madx, file=tmp_path / "here.tfs").reset_index(drop=True)
@@ -89,6 +126,116 @@ def test_single_particle_ptc_track_with_onepass(_matched_base_lattice):
     assert all(coordinate in tracks.columns for coordinate in ("x", "px", "y", "py", "t", "pt", "s", "e"))
 
 
+@pytest.mark.parametrize("obs_points", [[], ["qf", "msf"]])
+def test_parallel_ptc_track_matches_single_particle(_matched_base_lattice, obs_points):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    madx.select(flag="error", pattern="^qf")
+    madx.command.ealign(dx=1e-4)
+    initial_coordinates = np.zeros((5, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 5)
+    initial_coordinates[:, 2] = 2e-4
+    tracks = ptc_track_particles(madx, initial_coordinates, nturns=20, processes=2, observation_points=obs_points)
+
+    assert isinstance(tracks, TrackedParticles)
+    assert tracks.coordinates.shape == (len(obs_points) + 1, 5, 21, 6)
+    assert tracks.survived.all()
+
+    for particle in (0, 2, 4):  # spread across both workers
+        single = ptc_track_particle(
+            madx, initial_coordinates=tuple(initial_coordinates[particle]), nturns=20, observation_points=obs_points
+        )
+        for obs_index, track in enumerate(single.values()):
+            expected = track[list(COORDINATES)].to_numpy()
+            assert_allclose(tracks.coordinates[obs_index, particle, -len(expected) :], expected, atol=1e-14)
+
+
+def test_ptc_session_matches_functions(_matched_base_lattice, _ampdet_tfs_path, _ptc_twiss_tfs_path):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    single = ptc_track_particle(
+        madx, initial_coordinates=(1e-4, 0, 2e-4, 0, 0, 0), nturns=20, observation_points=["qf"]
+    )
+
+    with PTCSession(madx) as session:
+        first_ampdet_df = session.get_amplitude_detuning()
+        ptc_twiss_df = session.ptc_twiss().reset_index(drop=True)
+        tracks = session.ptc_track_particle((1e-4, 0, 2e-4, 0, 0, 0), nturns=20, observation_points=["qf"])
+        ampdet_df = session.get_amplitude_detuning()  # previous selections are cleared
+        onetable_tracks = session.ptc_track_particle((1e-4, 0, 2e-4, 0, 0, 0), nturns=20, onetable=True)
+
+    assert_frame_equal(tfs.read(_ampdet_tfs_path), ampdet_df, rtol=1e-2)
+    assert_frame_equal(first_ampdet_df, ampdet_df)
+    reference_twiss_df = tfs.read(_ptc_twiss_tfs_path)
+    assert_frame_equal(reference_twiss_df.drop(columns=["COMMENTS"]), ptc_twiss_df.drop(columns=["COMMENTS"]))
+    assert tracks.keys() == single.keys()
+    for key, track in tracks.items():
+        assert_frame_equal(track, single[key])
+    # Starts and observation points of the previous tracking were cleared
+    assert len(onetable_tracks["trackone"]) == 21  # noqa: PLR2004
+
+
+def test_ptc_session_inactive(_matched_base_lattice, caplog):
+    session = PTCSession(_matched_base_lattice)
+    with pytest.raises(RuntimeError, match="PTC session is not active"):
+        session.ptc_twiss()
+
+    with session:
+        pass
+    with pytest.raises(RuntimeError, match="PTC session is not active"):
+        session.get_rdts()
+
+    for record in caplog.records:
+        if record.levelname == "ERROR":
+            assert "context manager" in record.message
+
+
+def test_ptc_scan_amplitude_detuning(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    ksf = madx.globals["ksf"]
+    settings = {"ksf": [ksf, 1.1 * ksf, 0.9 * ksf], "ksd": [0, 0, 0]}
+    scan = ptc_scan(madx, settings, quantity="ampdet", processes=2)
+
+    assert isinstance(scan, PTCScan)
+    assert scan.results.shape == (3, 1, len(scan.terms))
+    assert scan.elements.tolist() == ["cas3"]
+    assert madx.globals["ksf"] == ksf  # the scan does not change our instance
+    try:
+        for index, value in enumerate(settings["ksf"]):
+            madx.globals.update({"ksf": value, "ksd": 0})
+            ampdet_df = get_amplitude_detuning(madx)
+            orders = ampdet_df[["ORDER1", "ORDER2", "ORDER3", "ORDER4"]].to_numpy(dtype=int)
+            terms = ["_".join([name, *map(str, order)]) for name, order in zip(ampdet_df.NAME, orders)]
+            assert scan.terms.tolist() == terms
+            assert_allclose(scan.results[index, 0], ampdet_df.VALUE.to_numpy())
+        assert_allclose(scan.get("ANHX_1_0_0_0")[:, 0], scan.results[:, 0, terms.index("ANHX_1_0_0_0")])
+    finally:
+        madx.globals["ksf"] = ksf
+
+
+def test_ptc_scan_rdts(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    scan = ptc_scan(madx, {"ksf": [0, madx.globals["ksf"]]}, quantity="rdts", order=3, processes=2)
+    rdts_df = get_rdts(madx, order=3)
+
+    columns = sorted(column for column in rdts_df.columns if column.startswith("GNF"))
+    assert scan.terms.tolist() == columns
+    assert scan.elements.tolist() == rdts_df.NAME.tolist()
+    assert_allclose(scan.results[1], rdts_df[columns].to_numpy(), atol=1e-12)
+    assert_allclose(scan.get("GNFA_3_0_0_0_0_0"), scan.results[:, :, columns.index("GNFA_3_0_0_0_0_0")])
+
+
+@pytest.mark.parametrize(
+    ("settings", "quantity"),
+    [({"ksf": [0, 1]}, "invalid"), ({"ksf": [0, 1], "ksd": [0]}, "ampdet"), ({}, "rdts")],
+)
+def test_ptc_scan_fails_on_invalid_inputs(_matched_base_lattice, settings, quantity):
+    with pytest.raises(ValueError):  # noqa: PT011
+        ptc_scan(_matched_base_lattice, settings, quantity=quantity)
+
+
 # ----- Fixtures ----- #
 
 
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from pyhdtoolkit.cpymadtools.thintrack import ThinLattice, get_thin_lattice, track_thin_lattice
+from pyhdtoolkit.cpymadtools.track import TrackedParticles, track_particles
+
+
+@pytest.mark.parametrize("jit", [True, False])
+def test_thin_tracking_matches_madx(_matched_base_lattice, jit):
+    madx = _matched_base_lattice
+    madx.select(flag="error", pattern="^qf")
+    madx.command.efcomp(dkn=[0, 0, 0, 5], dks=[0, 1e-4])
+    madx.command.ealign(dx=1e-4, dy=-5e-5)
+    initial_coordinates = np.zeros((5, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 2e-3, 5)
+    initial_coordinates[:, 2] = 5e-4
+    initial_coordinates[:, 5] = np.linspace(-5e-4, 5e-4, 5)
+    expected = track_particles(madx, initial_coordinates, nturns=50, onepass=True)
+
+    lattice = get_thin_lattice(madx)
+    tracks = track_thin_lattice(lattice, initial_coordinates, nturns=50, jit=jit)
+
+    assert isinstance(lattice, ThinLattice)
+    assert lattice.orders.max() == 3  # noqa: PLR2004 (the octupole field errors)
+    assert isinstance(tracks, TrackedParticles)
+    assert tracks.coordinates.shape == (1, 5, 51, 6)
+    assert tracks.survived.all()
+    assert_allclose(tracks.coordinates[..., :4], expected.coordinates[..., :4], atol=1e-12)
+    assert_allclose(tracks.coordinates[..., 4:], expected.coordinates[..., 4:], atol=1e-9)
+
+
+@pytest.mark.parametrize("record_turns", [True, False])
+def test_thin_tracking_kernels_agree_on_losses(_matched_base_lattice, record_turns):
+    lattice = get_thin_lattice(_matched_base_lattice)
+    initial_coordinates = np.zeros((20, 6))
+    initial_coordinates[:, 0] = initial_coordinates[:, 2] = np.linspace(1e-3, 5e-2, 20)
+
+    compiled = track_thin_lattice(lattice, initial_coordinates, nturns=200, record_turns=record_turns)
+    vectorised = track_thin_lattice(lattice, initial_coordinates, nturns=200, record_turns=record_turns, jit=False)
+
+    assert compiled.coordinates.shape == (1, 20, 201 if record_turns else 2, 6)
+    assert not compiled.survived.all()
+    assert compiled.survived[0]
+    assert (compiled.lost_turn == vectorised.lost_turn).all()
+    assert_allclose(compiled.coordinates, vectorised.coordinates, atol=1e-14)
+    assert np.isnan(compiled.coordinates[0, ~compiled.survived, -1]).all()
+
+
+def test_thin_tracking_final_coordinates_only(_matched_base_lattice):
+    lattice = get_thin_lattice(_matched_base_lattice)
+    initial_coordinates = np.zeros((3, 6))
+    initial_coordinates[:, 0] = [1e-4, 2e-4, 3e-4]
+
+    full = track_thin_lattice(lattice, initial_coordinates, nturns=30)
+    final = track_thin_lattice(lattice, initial_coordinates, nturns=30, record_turns=False)
+
+    assert final.coordinates.shape == (1, 3, 2, 6)
+    assert_allclose(final.coordinates[0, :, 0], initial_coordinates)
+    assert_allclose(final.coordinates[0, :, 1], full.coordinates[0, :, -1])
+
+
+def test_thin_lattice_from_thick_sequence_raises(_non_matched_lhc_madx):
+    with pytest.raises(ValueError, match="Unsupported element"):
+        get_thin_lattice(_non_matched_lhc_madx)
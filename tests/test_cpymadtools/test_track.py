@@ -1,7 +1,18 @@
+import numpy as np
 import pytest
+from numpy.testing import assert_allclose
 from pandas import DataFrame
 
-from pyhdtoolkit.cpymadtools.track import track_single_particle
+from pyhdtoolkit.cpymadtools import track as track_module
+from pyhdtoolkit.cpymadtools.track import (
+    COORDINATES,
+    TrackedParticles,
+    load_tracked_particles,
+    track_particles,
+    track_particles_parallel,
+    track_particles_to_disk,
+    track_single_particle,
+)
 
 
 @pytest.mark.parametrize("obs_points", [[], ["qf", "mb", "msf"]])
@@ -34,3 +45,170 @@ def test_single_particle_tracking_with_onepass(_matched_base_lattice):
     tracks = tracks_dict["trackone"]
     assert isinstance(tracks, DataFrame)
     assert all(coordinate in tracks.columns for coordinate in ("x", "px", "y", "py", "t", "pt", "s", "e"))
+
+
+@pytest.mark.parametrize("obs_points", [[], ["qf", "MB[3]", "msf"]])
+def test_particles_tracking_matches_single_particle(_matched_base_lattice, obs_points):
+    madx = _matched_base_lattice
+    initial_coordinates = np.zeros((5, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 5)
+    initial_coordinates[:, 2] = 2e-4
+    tracks = track_particles(
+        madx, initial_coordinates, nturns=50, sequence="CAS3", observation_points=obs_points, onepass=True
+    )
+
+    assert isinstance(tracks, TrackedParticles)
+    assert tracks.coordinates.shape == (len(obs_points) + 1, 5, 51, 6)
+    assert tracks.survived.all()
+    assert (tracks.lost_turn == -1).all()
+    assert_allclose(tracks.coordinates[0, :, 0], initial_coordinates, atol=1e-15)
+    assert np.isnan(tracks.coordinates[1:, :, 0]).all()  # initial coordinates only recorded at start
+
+    for particle in (0, 4):
+        single = track_single_particle(
+            madx,
+            initial_coordinates=tuple(initial_coordinates[particle]),
+            nturns=50,
+            observation_points=obs_points,
+            onepass=True,
+        )
+        for obs_index, track in enumerate(single.values()):
+            expected = track[list(COORDINATES)].to_numpy()
+            assert_allclose(tracks.coordinates[obs_index, particle, -len(expected) :], expected, atol=1e-15)
+
+
+def test_particles_tracking_losses(_matched_base_lattice):
+    madx = _matched_base_lattice
+    initial_coordinates = [[1e-4, 0, 1e-4, 0, 0, 0], [0.5, 0, 1e-4, 0, 0, 0], [2e-4, 0, 1e-4, 0, 0, 0]]
+    tracks = track_particles(madx, initial_coordinates, nturns=10, aperture=True)
+
+    assert tracks.survived.tolist() == [True, False, True]
+    assert tracks.lost_turn[1] == 1
+    assert np.isnan(tracks.coordinates[0, 1, 1:]).all()  # nothing after the loss
+    assert not np.isnan(tracks.coordinates[0, [0, 2]]).any()
+
+
+@pytest.mark.parametrize("obs_points", [[], ["qf", "msf"]])
+def test_parallel_particles_tracking_matches_in_process(_matched_base_lattice, obs_points):
+    madx = _matched_base_lattice
+    madx.select(flag="error", pattern="^qf")
+    madx.command.ealign(dx=1e-4)
+    initial_coordinates = np.zeros((5, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 5e-4, 5)
+    initial_coordinates[2, 0] = 0.5  # lost on the first turn
+    tracks = track_particles_parallel(
+        madx, initial_coordinates, nturns=20, processes=2, observation_points=obs_points, aperture=True
+    )
+    expected = track_particles(madx, initial_coordinates, nturns=20, observation_points=obs_points, aperture=True)
+
+    assert tracks.coordinates.shape == expected.coordinates.shape
+    assert_allclose(tracks.coordinates, expected.coordinates, atol=1e-15)
+    assert (tracks.lost_turn == expected.lost_turn).all()
+
+
+def test_particles_tracking_invalid_coordinates_raises(_matched_base_lattice, caplog):
+    with pytest.raises(ValueError, match="Invalid 'initial_coordinates' shape"):
+        track_particles(_matched_base_lattice, np.zeros((10, 4)), nturns=10)
+
+    for record in caplog.records:
+        assert record.levelname == "ERROR"
+
+
+def test_particles_tracking_duplicate_observation_points_raises(_matched_base_lattice):
+    with pytest.raises(ValueError, match="Duplicate observation points"):
+        track_particles(_matched_base_lattice, np.zeros((10, 6)), nturns=10, observation_points=["qf", "QF"])
+
+
+def test_tracked_particles_unknown_observation_point_raises(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    track_module._run_track_block(madx, np.full((2, 6), 1e-4), 5, observation_points=["qf", "qd"])
+    with pytest.raises(ValueError, match="Tracking data does not match the observation points"):
+        track_module._tracked_particles_from_tables(madx, 2, 5, ["qf"])  # no slot for the qd rows
+
+
+@pytest.mark.parametrize("chunk_turns", [7, 30, 100])
+def test_particles_tracking_to_disk_matches_in_memory(_matched_base_lattice, tmp_path, chunk_turns):
+    madx = _matched_base_lattice
+    initial_coordinates = np.zeros((4, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 4)
+    initial_coordinates[:, 2] = 2e-4
+    expected = track_particles(madx, initial_coordinates, nturns=30, observation_points=["qf"], onepass=True)
+    tracks = track_particles_to_disk(
+        madx,
+        initial_coordinates,
+        nturns=30,
+        file_name=tmp_path / "tracks.npy",
+        chunk_turns=chunk_turns,
+        observation_points=["qf"],
+        onepass=True,
+    )
+
+    assert isinstance(tracks.coordinates, np.memmap)
+    assert tracks.coordinates.shape == expected.coordinates.shape == (2, 4, 31, 6)
+    assert_allclose(tracks.coordinates, expected.coordinates, atol=1e-15)
+    assert tracks.survived.all()
+    assert (tmp_path / "tracks.lost.npy").is_file()
+
+
+def test_particles_tracking_to_disk_losses(_matched_base_lattice, tmp_path):
+    madx = _matched_base_lattice
+    initial_coordinates = [[1e-4, 0, 1e-4, 0, 0, 0], [0.5, 0, 1e-4, 0, 0, 0], [2e-4, 0, 1e-4, 0, 0, 0]]
+    track_particles_to_disk(
+        madx, initial_coordinates, nturns=10, file_name=tmp_path / "lossy.npy", chunk_turns=3, aperture=True
+    )
+    tracks = load_tracked_particles(tmp_path / "lossy.npy")
+
+    assert tracks.survived.tolist() == [True, False, True]
+    assert tracks.lost_turn[1] == 1
+    assert np.isnan(tracks.coordinates[0, 1, 1:]).all()
+    assert not np.isnan(tracks.coordinates[0, [0, 2]]).any()
+
+
+def test_particles_tracking_to_disk_invalid_chunk_turns_raises(_matched_base_lattice, tmp_path):
+    with pytest.raises(ValueError, match="Invalid 'chunk_turns' value"):
+        track_particles_to_disk(
+            _matched_base_lattice, np.zeros((2, 6)), nturns=10, file_name=tmp_path / "tracks.npy", chunk_turns=0
+        )
+
+
+def test_particles_tracking_to_disk_resumes_from_checkpoint(_matched_base_lattice, tmp_path, monkeypatch):
+    madx = _matched_base_lattice
+    file_path = tmp_path / "tracks.npy"
+    initial_coordinates = np.zeros((3, 6))
+    initial_coordinates[:, 0] = np.linspace(1e-4, 1e-3, 3)
+    expected = track_particles(madx, initial_coordinates, nturns=25, onepass=True)
+
+    # Record the blocks tracked, and interrupt the first run after the second block of 10 turns
+    original_run_block = track_module._run_track_block
+    blocks_turns = []
+    interrupt_after = [2]
+
+    def recording_run_block(madx, initial_coordinates, nturns, *args, **kwargs):
+        if len(blocks_turns) == interrupt_after[0]:
+            raise KeyboardInterrupt
+        blocks_turns.append(nturns)
+        return original_run_block(madx, initial_coordinates, nturns, *args, **kwargs)
+
+    monkeypatch.setattr(track_module, "_run_track_block", recording_run_block)
+    with pytest.raises(KeyboardInterrupt):
+        track_particles_to_disk(madx, initial_coordinates, nturns=25, file_name=file_path, chunk_turns=10, onepass=True)
+    assert (tmp_path / "tracks.checkpoint.npz").is_file()
+
+    blocks_turns.clear()
+    interrupt_after[0] = None
+    tracks = track_particles_to_disk(
+        madx, initial_coordinates, nturns=25, file_name=file_path, chunk_turns=10, resume=True, onepass=True
+    )
+    assert blocks_turns == [5]  # only the last block was tracked
+    assert_allclose(tracks.coordinates, expected.coordinates, atol=1e-15)
+
+
+def test_particles_tracking_to_disk_checkpoint_mismatch_raises(_matched_base_lattice, tmp_path):
+    madx = _matched_base_lattice
+    file_path = tmp_path / "tracks.npy"
+    track_particles_to_disk(madx, np.zeros((2, 6)), nturns=10, file_name=file_path, chunk_turns=5)
+
+    madx.globals["kqf"] = madx.globals["kqf"] * 1.001
+    with pytest.raises(ValueError, match="Tracking checkpoint does not match the current run"):
+        track_particles_to_disk(madx, np.zeros((2, 6)), nturns=10, file_name=file_path, chunk_turns=5, resume=True)
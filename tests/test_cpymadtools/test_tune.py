@@ -9,7 +9,13 @@ from matplotlib.collections import PatchCollection
 
 from pyhdtoolkit.cpymadtools.lhc import make_lhc_thin, re_cycle_sequence, setup_lhc_orbit
 from pyhdtoolkit.cpymadtools.matching import match_tunes_and_chromaticities
-from pyhdtoolkit.cpymadtools.tune import get_footprint_lines, get_footprint_patches, make_footprint_table
+from pyhdtoolkit.cpymadtools.ptc import get_amplitude_detuning
+from pyhdtoolkit.cpymadtools.tune import (
+    get_footprint_lines,
+    get_footprint_patches,
+    make_detuning_footprint_table,
+    make_footprint_table,
+)
 
 # Forcing non-interactive Agg backend so rendering is done similarly across platforms during tests
 mpl.use("Agg")
@@ -67,6 +73,119 @@ def test_make_footprint_table_crashes_without_slicing(_non_matched_lhc_madx, cap
         assert record.levelname == "ERROR"
 
 
+@pytest.mark.parametrize(
+    ("grid_kwargs", "nparticles", "nangles"),
+    [
+        ({"sigma": 3}, 1 + 3 * 7, 7),
+        ({"sigma": 3, "dense": True, "spacing": "log"}, 1 + 6 * 7, 7),
+        ({"amplitudes": np.geomspace(0.5, 4, 6), "n_angles": 11}, 1 + 6 * 11, 11),
+        ({"sigma": 4, "grid": "cartesian"}, 1 + 4 * 4, 4),
+        ({"sigma": 5, "grid": "legacy"}, 1 + 6 * 14, 14),  # default grid before 1.9.0
+    ],
+)
+def test_make_footprint_table_grids(_matched_base_lattice, grid_kwargs, nparticles, nangles):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+
+    foot = make_footprint_table(madx, nturns=256, **grid_kwargs)
+    assert len(foot) == nparticles
+    assert foot.headers["ANGLE"] == nangles
+    assert foot.headers["NAMPLITUDES"] == 1 + (nparticles - 1) // nangles
+    assert foot[["tunx", "tuny"]].notna().all().all()
+
+    qxs, qys = get_footprint_lines(foot)
+    assert qxs.shape == qys.shape
+    assert isinstance(get_footprint_patches(foot), PatchCollection)
+
+
+@pytest.mark.parametrize(
+    ("grid_kwargs", "match"),
+    [
+        ({"grid": "hexagonal"}, "Invalid footprint grid"),
+        ({"spacing": "quadratic"}, "Invalid amplitudes spacing"),
+        ({"n_angles": 1}, "Invalid number of starting angles"),
+        ({"sigma": 0.3}, "should be at least half of the amplitudes increment"),
+    ],
+)
+def test_make_footprint_table_invalid_grid(_matched_base_lattice, grid_kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        make_footprint_table(_matched_base_lattice, **grid_kwargs)
+
+
+def test_make_footprint_table_tracking_engine(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=1e-8, ey=1e-8;")
+    madx.use(sequence="CAS3")
+
+    dynap = make_footprint_table(madx, sigma=3, nturns=512)
+    tracking = make_footprint_table(madx, sigma=3, nturns=512, engine="track", processes=2)
+    assert isinstance(tracking, tfs.TfsDataFrame)
+    assert tracking.headers.keys() == dynap.headers.keys()
+    assert tracking.columns.tolist() == ["x", "y", "tunx", "tuny", "dtune"]
+    assert np.allclose(tracking[["x", "y"]], dynap[["x", "y"]])
+    assert np.allclose(tracking[["tunx", "tuny"]], dynap[["tunx", "tuny"]], atol=1e-3)
+    assert (tracking.dtune >= 0).all()
+
+
+def test_make_footprint_table_invalid_engine(_matched_base_lattice):
+    with pytest.raises(ValueError, match="Invalid footprint engine"):
+        make_footprint_table(_matched_base_lattice, engine="ptc")
+
+
+def test_make_detuning_footprint_table(_ampdet_tfs_path, tmp_path):
+    ampdet = tfs.read(_ampdet_tfs_path)
+    coefficients = ampdet.set_index(["NAME", "ORDER1", "ORDER2"]).VALUE
+    footprint = make_detuning_footprint_table(ampdet, 1e-6, 2e-6, sigma=3, n_angles=5, file=tmp_path / "footprint.tfs")
+
+    assert (tmp_path / "footprint.tfs").is_file()
+    assert footprint.columns.tolist() == ["fx", "fy", "tunx", "tuny"]
+    assert len(footprint) == 1 + 3 * 5
+    assert footprint.headers["ANGLE"] == 5  # noqa: PLR2004
+    assert footprint.headers["NAMPLITUDES"] == 4  # noqa: PLR2004
+    qxs, qys = get_footprint_lines(footprint)
+    assert qxs.shape == qys.shape
+
+    ex, ey = 1e-6 * footprint.fx**2, 2e-6 * footprint.fy**2
+    expected_qx = (
+        coefficients["Q1", 0, 0]
+        + coefficients["ANHX", 1, 0] * ex
+        + coefficients["ANHX", 0, 1] * ey
+        + coefficients["ANHX", 2, 0] * ex**2 / 2
+        + coefficients["ANHX", 1, 1] * ex * ey
+        + coefficients["ANHX", 0, 2] * ey**2 / 2
+    )
+    expected_qy = (
+        coefficients["Q2", 0, 0]
+        + coefficients["ANHY", 1, 0] * ex
+        + coefficients["ANHY", 0, 1] * ey
+        + coefficients["ANHY", 2, 0] * ex**2 / 2
+        + coefficients["ANHY", 1, 1] * ex * ey
+        + coefficients["ANHY", 0, 2] * ey**2 / 2
+    )
+    assert np.allclose(footprint.tunx, expected_qx)
+    assert np.allclose(footprint.tuny, expected_qy)
+
+
+def test_make_detuning_footprint_table_matches_tracking(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.input("beam, particle=proton, sequence=CAS3, energy=20.0, ex=2e-7, ey=2e-7;")
+    madx.use(sequence="CAS3")
+
+    ampdet = get_amplitude_detuning(madx, order=2)
+    tracking = make_footprint_table(madx, sigma=2, nturns=2048, engine="track", processes=2)
+    footprint = make_detuning_footprint_table(ampdet, 2e-7, 2e-7, sigma=2)
+    assert footprint.headers.items() >= {key: tracking.headers[key] for key in ("ANGLE", "NAMPLITUDES")}.items()
+    assert np.ptp(footprint.tuny) > 1e-4  # noqa: PLR2004
+    assert np.allclose(footprint[["tunx", "tuny"]], tracking[["tunx", "tuny"]], atol=1e-5)
+
+
+def test_make_detuning_footprint_table_invalid_table(_ampdet_tfs_path):
+    ampdet = tfs.read(_ampdet_tfs_path)
+    with pytest.raises(ValueError, match="Invalid amplitude detuning table"):
+        make_detuning_footprint_table(ampdet[ampdet.NAME != "Q1"], 1e-6, 1e-6)
+
+
 def test_get_footprint_lines(_dynap_tfs_path, _plottable_footprint_path):
     dynap_tfs = tfs.read(_dynap_tfs_path)  # obtained from make_footprint_table and written to disk
     npzfile = np.load(_plottable_footprint_path)
@@ -78,6 +197,18 @@ def test_get_footprint_lines(_dynap_tfs_path, _plottable_footprint_path):
     assert np.allclose(qys, ref_qys)
 
 
+@pytest.mark.parametrize(("amplitude", "angle"), [(6, 7), (101, 100), (100, 101)])
+def test_get_footprint_lines_visits_whole_grid(amplitude, angle):
+    amplitudes, angles = np.meshgrid(np.arange(1, amplitude), np.arange(angle), indexing="ij")
+    dynap_dframe = tfs.TfsDataFrame(
+        {"tunx": np.concatenate([[0], amplitudes.ravel()]), "tuny": np.concatenate([[0], angles.ravel()])},
+        headers={"AMPLITUDE": amplitude, "ANGLE": angle, "DSIGMA": 1},
+    )
+    qxs, qys = get_footprint_lines(dynap_dframe)
+    visited = set(zip(qxs.tolist(), qys.tolist()))
+    assert visited - {(0, j) for j in range(angle)} == set(zip(amplitudes.ravel().tolist(), angles.ravel().tolist()))
+
+
 @pytest.mark.mpl_image_compare(tolerance=20, style="default", savefig_kwargs={"dpi": 200})
 def test_get_footprint_patches(_dynap_tfs_path):
     dynap_dframe = tfs.read(_dynap_tfs_path)
@@ -112,6 +243,11 @@ def _plottable_footprint_path() -> pathlib.Path:
     return INPUTS_DIR / "cpymadtools" / "plottable_footprint.npz"
 
 
+@pytest.fixture
+def _ampdet_tfs_path() -> pathlib.Path:
+    return INPUTS_DIR / "cpymadtools" / "ampdet.tfs"
+
+
 @pytest.fixture
 def _dynap_tfs_path() -> pathlib.Path:
     return INPUTS_DIR / "cpymadtools" / "dynap.tfs"
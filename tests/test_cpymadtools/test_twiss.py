@@ -5,7 +5,7 @@ import tfs
 from pandas.testing import assert_frame_equal
 
 from pyhdtoolkit.cpymadtools.constants import DEFAULT_TWISS_COLUMNS  # noqa: F401  |  for coverage
-from pyhdtoolkit.cpymadtools.twiss import get_twiss_tfs
+from pyhdtoolkit.cpymadtools.twiss import get_pattern_twiss, get_twiss_tfs
 
 CURRENT_DIR = pathlib.Path(__file__).parent
 INPUTS_DIR = CURRENT_DIR.parent / "inputs"
@@ -18,6 +18,32 @@ def test_twiss_tfs(_twiss_export, _matched_base_lattice):
     assert_frame_equal(twiss_tfs, from_disk)
 
 
+@pytest.mark.parametrize("columns", [["s", "betx", "bety"], ["NAME", "S", "DX", "MUX"], ["keyword"]])
+def test_twiss_tfs_with_columns(_matched_base_lattice, columns):
+    madx = _matched_base_lattice
+    full_twiss = get_twiss_tfs(madx)
+    expected_columns = [column.upper() for column in columns if column.upper() != "NAME"]
+
+    twiss_tfs = get_twiss_tfs(madx, columns=columns)
+    assert twiss_tfs.columns.tolist() == expected_columns
+    assert twiss_tfs.headers == full_twiss.headers
+    assert_frame_equal(twiss_tfs, full_twiss[expected_columns])
+
+
+def test_pattern_twiss(_matched_base_lattice):
+    madx = _matched_base_lattice
+    twiss_tfs = get_twiss_tfs(madx)
+    pattern_twiss = get_pattern_twiss(madx, columns=["name", "s", "betx", "bety"], patterns=["^QF", "^QD"])
+
+    assert pattern_twiss.columns.tolist() == ["name", "s", "betx", "bety"]
+    assert pattern_twiss.headers == twiss_tfs.headers
+    assert pattern_twiss.name.str.upper().str[:2].isin(["QF", "QD"]).all()
+    assert len(pattern_twiss) == twiss_tfs.index.str.match("^Q[FD]").sum()
+    assert pattern_twiss.betx.to_numpy() == pytest.approx(
+        twiss_tfs.BETX[twiss_tfs.index.str.match("^Q[FD]")].to_numpy()
+    )
+
+
 # ---------------------- Private Utilities ---------------------- #
 
 
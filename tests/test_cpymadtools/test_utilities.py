@@ -1,8 +1,19 @@
+import numpy as np
+import pandas as pd
 import pytest
 import tfs
+from cpymad.madx import Madx
 from pandas.testing import assert_frame_equal
 
-from pyhdtoolkit.cpymadtools.utils import _get_k_strings, export_madx_table, get_table_tfs
+from pyhdtoolkit.cpymadtools.utils import (
+    _get_k_strings,
+    export_madx_table,
+    get_table_tfs,
+    load_madx_machine,
+    load_npz_table,
+    save_madx_errors,
+    save_madx_machine,
+)
 
 
 @pytest.mark.parametrize(
@@ -40,3 +51,123 @@ def test_table_export(_matched_base_lattice, regex, tmp_path):
     assert "TYPE" in new.headers  # should be added by default
     # Dropping 'COMMENTS' column as I have no clue what it's doing here and it shouldn't be here
     assert_frame_equal(twiss_df.drop(columns=["COMMENTS"]), new.drop(columns=["COMMENTS"]))
+
+
+def test_table_tfs_conversion(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.twiss()
+    twiss_df = get_table_tfs(madx, "twiss")
+
+    assert twiss_df.columns.tolist() == [column.upper() for column in madx.table.twiss]
+    assert twiss_df.NAME.tolist() == [name.upper() for name in madx.table.twiss.name]
+    assert twiss_df.KEYWORD.tolist() == list(madx.table.twiss.keyword)
+    assert twiss_df.headers["Q1"] == madx.table.summ.q1[0]
+    assert twiss_df.BETX.to_numpy().tolist() == madx.table.twiss.betx.tolist()
+
+
+def test_table_tfs_downcast_and_categorical(_matched_base_lattice):
+    madx = _matched_base_lattice
+    madx.command.twiss()
+    twiss_df = get_table_tfs(madx, "twiss")
+    light_df = get_table_tfs(madx, "twiss", downcast=True, categorical=True)
+
+    assert isinstance(light_df.NAME.dtype, pd.CategoricalDtype)
+    assert isinstance(light_df.KEYWORD.dtype, pd.CategoricalDtype)
+    assert light_df.BETX.dtype == np.float32
+    assert light_df.memory_usage(deep=True).sum() < twiss_df.memory_usage(deep=True).sum()
+
+    assert light_df.NAME.astype(str).tolist() == twiss_df.NAME.tolist()
+    assert light_df.KEYWORD.astype(str).tolist() == twiss_df.KEYWORD.tolist()
+    np.testing.assert_allclose(light_df.BETX, twiss_df.BETX, rtol=1e-6)
+
+
+@pytest.mark.parametrize("regex", [None, "^QF*"])
+@pytest.mark.parametrize("chunk_size", [1_000, 10_000])
+def test_streamed_table_export(_matched_base_lattice, regex, chunk_size, tmp_path):
+    madx = _matched_base_lattice
+    madx.command.twiss()
+
+    export_madx_table(madx, table_name="twiss", file_name=tmp_path / "full.tfs", pattern=regex)
+    export_madx_table(
+        madx, table_name="twiss", file_name=tmp_path / "streamed.tfs", pattern=regex, chunk_size=chunk_size
+    )
+    assert (tmp_path / "full.tfs").read_text() == (tmp_path / "streamed.tfs").read_text()
+
+
+@pytest.mark.parametrize("chunk_size", [None, 500])
+def test_table_export_npz_sidecar(_matched_base_lattice, chunk_size, tmp_path):
+    madx = _matched_base_lattice
+    madx.command.twiss()
+    export_madx_table(
+        madx, table_name="twiss", file_name=tmp_path / "twiss.tfs", chunk_size=chunk_size, sidecars=["npz"]
+    )
+    assert (tmp_path / "twiss.npz").is_file()
+
+    from_tfs = tfs.read(tmp_path / "twiss.tfs")
+    columns = load_npz_table(tmp_path / "twiss.npz")
+    assert list(columns) == from_tfs.columns.tolist()
+    assert isinstance(columns["BETX"], np.memmap)
+    assert columns["NAME"].tolist() == from_tfs.NAME.tolist()
+    np.testing.assert_array_equal(columns["BETX"], get_table_tfs(madx, "twiss").BETX.to_numpy())
+
+
+@pytest.mark.parametrize("chunk_size", [None, 500])
+def test_table_export_parquet_sidecar(_matched_base_lattice, chunk_size, tmp_path):
+    pytest.importorskip("pyarrow")
+    madx = _matched_base_lattice
+    madx.command.twiss()
+    export_madx_table(
+        madx, table_name="twiss", file_name=tmp_path / "twiss.tfs", chunk_size=chunk_size, sidecars=["parquet"]
+    )
+
+    from_parquet = pd.read_parquet(tmp_path / "twiss.parquet")
+    assert_frame_equal(
+        from_parquet, pd.DataFrame(get_table_tfs(madx, "twiss")), check_dtype=False, check_column_type=False
+    )
+
+
+def test_table_export_wrong_sidecar_raises(_matched_base_lattice, tmp_path):
+    with pytest.raises(ValueError, match="Invalid 'sidecars' parameter"):
+        export_madx_table(_matched_base_lattice, table_name="summ", file_name=tmp_path / "summ.tfs", sidecars=["csv"])
+
+
+def test_table_export_wrong_chunk_size_raises(_matched_base_lattice, tmp_path):
+    with pytest.raises(ValueError, match="Invalid 'chunk_size' parameter"):
+        export_madx_table(_matched_base_lattice, table_name="summ", file_name=tmp_path / "summ.tfs", chunk_size=0)
+
+
+def test_save_and_load_machine(_matched_base_lattice, tmp_path):
+    machine_file = tmp_path / "machine.madx"
+    madx = _matched_base_lattice
+    madx.input("unused_knob = 1.5; deferred_knob := 2 * kqf;")
+    madx.select(flag="interpolate", clear=True)  # SELECT statements are not saved
+    reference = madx.twiss().dframe()
+    save_madx_machine(madx, machine_file)
+
+    with Madx(stdout=False) as loaded:
+        load_madx_machine(loaded, machine_file)
+        loaded.command.use(sequence="CAS3")
+        assert_frame_equal(loaded.twiss().dframe(), reference)
+        assert loaded.globals["unused_knob"] == madx.globals["unused_knob"]
+        assert loaded.globals.defs["deferred_knob"] == madx.globals.defs["deferred_knob"]
+
+
+def test_save_and_load_errors(_matched_base_lattice, tmp_path):
+    machine_file, errors_file = tmp_path / "machine.madx", tmp_path / "errors.madx"
+    madx = _matched_base_lattice
+    madx.command.use(sequence="CAS3")
+    madx.select(flag="error", pattern="^qf")
+    madx.command.ealign(dx=1e-4, dpsi=2e-5)
+    madx.select(flag="error", clear=True)
+    madx.input("select, flag=error, range=mb[2]; efcomp, dkn={0, 0, 1e-3}, dks={0, 2e-5};")
+    madx.select(flag="error", clear=True)
+    madx.select(flag="interpolate", clear=True)
+    reference = madx.twiss().dframe()
+    save_madx_machine(madx, machine_file)
+    save_madx_errors(madx, errors_file)
+
+    with Madx(stdout=False) as loaded:
+        load_madx_machine(loaded, machine_file)
+        loaded.command.use(sequence="CAS3")
+        loaded.call(str(errors_file))
+        assert_frame_equal(loaded.twiss().dframe(), reference)
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+import pyhdtoolkit
+from pyhdtoolkit import cpymadtools
+from pyhdtoolkit.cpymadtools import lhc
+
+# Modules a worker only doing twiss / table exports imports, and heavy dependencies it should not load
+LIGHT_IMPORTS: list[str] = [
+    "pyhdtoolkit",
+    "pyhdtoolkit.cpymadtools",
+    "pyhdtoolkit.cpymadtools.twiss",
+    "pyhdtoolkit.plotting",
+    "pyhdtoolkit.utils",
+]
+HEAVY_DEPENDENCIES: list[str] = ["matplotlib", "scipy.stats", "optics_functions"]
+
+
+def test_lazy_submodule_access():
+    assert cpymadtools.twiss.__name__ == "pyhdtoolkit.cpymadtools.twiss"
+    assert pyhdtoolkit.maths.stats_fitting.__name__ == "pyhdtoolkit.maths.stats_fitting"
+
+
+def test_lazy_attribute_access():
+    from pyhdtoolkit.cpymadtools.lhc._setup import LHCSetup  # noqa: PLC0415
+
+    assert lhc.LHCSetup is LHCSetup
+    assert "LHCSetup" in vars(lhc)  # cached after first access
+
+
+def test_lazy_from_import():
+    from pyhdtoolkit.cpymadtools.lhc import make_lhc_beams  # noqa: PLC0415
+    from pyhdtoolkit.cpymadtools.lhc._setup import make_lhc_beams as original  # noqa: PLC0415
+
+    assert make_lhc_beams is original
+
+
+def test_dir_lists_lazy_names():
+    assert set(cpymadtools.__all__) <= set(dir(cpymadtools))
+    assert set(lhc.__all__) <= set(dir(lhc))
+
+
+@pytest.mark.parametrize("module", [pyhdtoolkit, cpymadtools, lhc])
+def test_unknown_attribute_raises(module):
+    with pytest.raises(AttributeError, match="has no attribute 'not_there'"):
+        _ = module.not_there
+
+
+def test_package_import_loads_no_submodules():
+    code = "import sys, pyhdtoolkit.cpymadtools; print(*sys.modules, sep=' ')"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    assert "pyhdtoolkit.cpymadtools.lhc" not in loaded
+    assert "pyhdtoolkit.plotting" not in loaded
+    assert "matplotlib" not in loaded
+
+
+@pytest.mark.parametrize("module", LIGHT_IMPORTS)
+def test_import_does_not_load_heavy_dependencies(module):
+    code = f"import sys, {module}; print(*sys.modules, sep=' ')"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    assert not loaded.intersection(HEAVY_DEPENDENCIES)
@@ -5,7 +5,7 @@ import numpy as np
 import pytest
 import scipy.stats as st
 
-from pyhdtoolkit.maths import stats_fitting
+from pyhdtoolkit.maths import frequency, stats_fitting
 from pyhdtoolkit.maths import utils as mutils
 
 CURRENT_DIR = pathlib.Path(__file__).parent
@@ -107,6 +107,68 @@ def test_mag_and_string_forced_scale(_to_scale, _force_scaled):
     assert mag_str == "{-2}"
 
 
+def test_interpolated_fft_tunes():
+    tunes = np.array([0.08, 0.27, 0.31, 0.42])
+    signals = 2 * np.cos(2 * np.pi * np.outer(tunes, np.arange(1024)) + 0.5) + 1e-3
+    assert np.allclose(frequency.interpolated_fft(signals), tunes, atol=1e-7)
+
+
+def test_interpolated_fft_spectrum_edges():
+    turns = np.arange(1024)
+    assert np.isclose(frequency.interpolated_fft(np.cos(np.pi * turns)), 0.5)
+    assert np.isclose(frequency.interpolated_fft(np.cos(2 * np.pi * 0.4975 * turns)), 0.4975, atol=1e-5)
+    # The bin after the last one of a complex spectrum is the DC bin
+    assert np.isclose(frequency.interpolated_fft(np.exp(2j * np.pi * 0.9985 * turns)), 0.9985, atol=1e-4)
+
+
+def test_naff_lines():
+    turns = np.arange(2048)
+    tunes = np.array([[0.27, 0.31], [0.19, 0.23]])
+    signals = np.cos(2 * np.pi * tunes[..., np.newaxis] * turns) + 0.1 * np.sin(2 * np.pi * 0.05 * turns)
+    frequencies, amplitudes = frequency.naff(signals, n_lines=2)
+    assert frequencies.shape == amplitudes.shape == (2, 2, 2)
+    assert np.allclose(frequencies[..., 0], tunes, atol=1e-10)
+    assert np.allclose(frequencies[..., 1], 0.05, atol=1e-8)
+    assert np.allclose(amplitudes, [1, 0.1], atol=1e-6)
+
+
+def test_naff_complex_signal():
+    signals = np.exp(2j * np.pi * np.outer([0.73, 0.2], np.arange(1000)))
+    frequencies, amplitudes = frequency.naff(signals)
+    assert np.allclose(frequencies[:, 0], [0.73, 0.2], atol=1e-12)
+    assert np.allclose(amplitudes, 1)
+
+
+def test_frequency_analysis_nan_signals():
+    signals = np.cos(2 * np.pi * 0.27 * np.arange(500)) * np.ones((3, 1))
+    signals[1, 100:] = np.nan
+    assert np.isnan(frequency.interpolated_fft(signals)).tolist() == [False, True, False]
+    assert np.isnan(frequency.naff(signals)[0][:, 0]).tolist() == [False, True, False]
+
+
+def test_naff_invalid_inputs():
+    with pytest.raises(ValueError, match="Invalid number of lines"):
+        frequency.naff(np.ones(100), n_lines=0)
+    with pytest.raises(ValueError, match="too short"):
+        frequency.naff(np.ones(2))
+
+
+@pytest.mark.parametrize("method", ["naff", "fft"])
+def test_tunes_from_tracking(method):
+    turns = np.arange(1024)
+    coordinates = np.zeros((4, len(turns), 6))
+    coordinates[..., 0] = np.cos(2 * np.pi * np.outer([0.28, 0.29, 0.3, 0.31], turns))
+    coordinates[..., 2] = 1e-3 * np.cos(2 * np.pi * 0.32 * turns)
+    qx, qy = frequency.get_tunes_from_tracking(coordinates, method=method)
+    assert np.allclose(qx, [0.28, 0.29, 0.3, 0.31], atol=1e-6)
+    assert np.allclose(qy, 0.32, atol=1e-6)
+
+
+def test_tunes_from_tracking_invalid_method():
+    with pytest.raises(ValueError, match="Invalid tunes determination method"):
+        frequency.get_tunes_from_tracking(np.zeros((10, 6)), method="dynap")
+
+
 # ---------------------- Utilities ---------------------- #
 
 
@@ -1,17 +1,19 @@
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+import numpy as np
 import pytest
+from matplotlib.collections import LineCollection
 from matplotlib.text import Text
 
-from pyhdtoolkit.plotting.tune import plot_tune_diagram
+from pyhdtoolkit.plotting.tune import get_nearest_resonances, plot_tune_diagram
 
 # Forcing non-interactive Agg backend so rendering is done similarly across platforms during tests
 mpl.use("Agg")
 
 
-@pytest.mark.parametrize("max_order", [0, 10, -5])
+@pytest.mark.parametrize("max_order", [0, 16, -5])
 def test_plot_tune_diagram_fails_on_too_high_order(max_order, caplog):
-    with pytest.raises(ValueError, match="The 'max_order' argument should be between 1 and 6 included"):
+    with pytest.raises(ValueError, match="The 'max_order' argument should be between 1 and 15 included"):
         plot_tune_diagram(max_order=max_order)
 
     for record in caplog.records:
@@ -47,3 +49,48 @@ def test_plot_tune_diagram_arguments(figure_title, legend_title, max_order, diff
     )
     assert ax.get_title() == figure_title
     assert isinstance(ax.legend().get_title(), Text)
+
+
+@pytest.mark.parametrize("max_order", [6, 12, 15])
+def test_plot_tune_diagram_one_collection_per_order(max_order):
+    _figure, ax = plt.subplots(figsize=(10, 10))
+    plot_tune_diagram(ax=ax, max_order=max_order, differentiate_orders=True)
+    collections = [collection for collection in ax.collections if isinstance(collection, LineCollection)]
+    assert len(collections) == max_order
+    segments = np.concatenate([np.asarray(segment) for segment in collections[-1].get_segments()])
+    assert (segments >= 0).all()
+    assert (segments <= 1).all()
+    plt.close("all")
+
+
+def test_get_nearest_resonances():
+    qx = np.array([[0.31, 62.31], [1 / 3, np.nan]])
+    qy = np.array([[0.32, 60.32], [0.2, 0.2]])
+    distances, resonances = get_nearest_resonances(qx, qy, max_order=3)
+    assert distances.shape == (2, 2, 3)
+    assert resonances.shape == (2, 2, 3, 3)
+
+    # Working point of the LHC, close to the coupling resonance, and its integer parts
+    assert np.allclose(distances[0, 0], distances[0, 1])
+    assert np.allclose(distances[0, 0, 1], 0.01 / np.sqrt(2))
+    assert resonances[0, 0, 1].tolist() == [1, -1, 0]
+    assert resonances[0, 1, 1].tolist() == [1, -1, 2]
+    # On the third order resonance 3 Qx = 1, and NaN tunes are flagged
+    assert np.isclose(distances[1, 0, 2], 0)
+    assert resonances[1, 0, 2].tolist() == [3, 0, 1]
+    assert np.isnan(distances[1, 1]).all()
+    assert (resonances[1, 1] == 0).all()
+
+    # Brute force check of the distances to all lines of each order
+    for order in range(1, 4):
+        m = np.arange(-order, order + 1)
+        n = order - np.abs(m)
+        lines = np.concatenate([np.stack([m, n], axis=-1), np.stack([m, -n], axis=-1)])
+        values = lines @ np.array([0.31, 0.32])
+        expected = np.min(np.abs(values - np.rint(values)) / np.hypot(*lines.T))
+        assert np.isclose(distances[0, 0, order - 1], expected)
+
+
+def test_get_nearest_resonances_invalid_order():
+    with pytest.raises(ValueError, match="should be at least 1"):
+        get_nearest_resonances(0.31, 0.32, max_order=0)
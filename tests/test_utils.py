@@ -1,4 +1,5 @@
 import errno
+import json
 import os
 import pathlib
 import pickle
@@ -17,6 +18,7 @@ from loguru import logger
 from numpy.testing import assert_array_equal
 from rich.table import Table
 
+from pyhdtoolkit.cpymadtools.twiss import get_twiss_tfs
 from pyhdtoolkit.utils import _misc, logging
 from pyhdtoolkit.utils.cmdline import CommandLine
 from pyhdtoolkit.utils.decorators import deprecated, maybe_jit
@@ -27,6 +29,7 @@ from pyhdtoolkit.utils.htcondor import (
     _make_tasks_table,
     read_condor_q,
 )
+from pyhdtoolkit.utils.profiling import SpanProfiler
 
 CURRENT_DIR = pathlib.Path(__file__).parent
 INPUTS_DIR = CURRENT_DIR / "inputs"
@@ -227,6 +230,86 @@ class TestJIT:
         assert time2 < time1
 
 
+class TestSpanProfiler:
+    def test_records_nested_spans(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        with SpanProfiler() as profiler, profiler.span("study"):
+            get_twiss_tfs(madx)
+            _ = _misc.split_complex_columns(pd.DataFrame({"A": [1j]}))  # utils functions are not recorded
+
+        assert [span.name for span in profiler.spans] == ["study"]
+        study = profiler.spans[0]
+        assert [child.name for child in study.children] == ["pyhdtoolkit.cpymadtools.twiss.get_twiss_tfs"]
+        twiss_span = study.children[0]
+        assert twiss_span.madx_commands >= 1  # at least the TWISS itself
+        assert 0 < twiss_span.madx_time < twiss_span.duration
+        assert twiss_span.python_time == pytest.approx(twiss_span.duration - twiss_span.madx_time)
+        assert study.madx_commands == twiss_span.madx_commands == profiler.madx_commands
+        assert study.start <= twiss_span.start <= twiss_span.end <= study.end
+
+    def test_private_functions_and_other_code_not_recorded(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        with SpanProfiler() as profiler:
+            madx.command.twiss()
+            [x**2 for x in range(10)]
+
+        assert profiler.spans == []
+        assert profiler.madx_commands == 1
+        assert profiler.madx_time > 0
+
+    def test_summary(self, _matched_base_lattice):
+        madx = _matched_base_lattice
+        with SpanProfiler() as profiler:
+            for _ in range(3):
+                get_twiss_tfs(madx)
+
+        summary = profiler.summary()
+        assert summary.loc["pyhdtoolkit.cpymadtools.twiss.get_twiss_tfs", "CALLS"] == 3  # noqa: PLR2004
+        assert summary.loc["pyhdtoolkit.cpymadtools.twiss.get_twiss_tfs", "MADX_COMMANDS"] == profiler.madx_commands
+        assert SpanProfiler().summary().empty
+
+    def test_exports(self, _matched_base_lattice, tmp_path):
+        madx = _matched_base_lattice
+        with SpanProfiler() as profiler, profiler.span("study"):
+            get_twiss_tfs(madx)
+
+        profiler.to_json(tmp_path / "spans.json")
+        spans = json.loads((tmp_path / "spans.json").read_text())
+        assert spans["madx_commands"] == profiler.madx_commands
+        assert spans["spans"][0]["name"] == "study"
+        assert spans["spans"][0]["children"][0]["name"] == "pyhdtoolkit.cpymadtools.twiss.get_twiss_tfs"
+
+        profiler.to_chrome_trace(tmp_path / "trace.json")
+        events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+        assert [event["name"] for event in events] == ["study", "pyhdtoolkit.cpymadtools.twiss.get_twiss_tfs"]
+        assert all(event["ph"] == "X" for event in events)
+        assert events[0]["dur"] >= events[1]["dur"]
+
+    def test_span_closed_on_exception(self):
+        with SpanProfiler() as profiler:
+            with pytest.raises(ZeroDivisionError), profiler.span("failing"):
+                _ = 1 / 0
+            with profiler.span("after"):
+                pass
+
+        assert [span.name for span in profiler.spans] == ["failing", "after"]
+        assert all(span.duration >= 0 for span in profiler.spans)
+
+    def test_restores_state(self):
+        from cpymad.madx import Madx  # noqa: PLC0415
+
+        original_input = Madx.input
+        original_profile = sys.getprofile()
+        with SpanProfiler():
+            assert Madx.input is not original_input
+        assert Madx.input is original_input
+        assert sys.getprofile() is original_profile
+
+    def test_only_one_active_profiler(self):
+        with SpanProfiler(), pytest.raises(RuntimeError, match="already active"):
+            SpanProfiler().start()
+
+
 # ----- Fixtures ----- #
 
 